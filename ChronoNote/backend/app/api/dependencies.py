@@ -0,0 +1,53 @@
+"""
+Shared FastAPI dependencies.
+Selects the session store backend configured in Settings.
+"""
+from fastapi import Depends, Request
+from app.config import settings
+from app.middleware.session import get_session_id
+from app.services.metrics import current_route
+from app.services.session_accessor import SessionAccessor, session_touch_debouncer
+from app.services.session_store import SessionStore
+from app.services.memory_store import memory_session_store
+from app.services.redis_service import redis_service
+
+
+# Configured session store backend
+session_store: SessionStore = (
+    memory_session_store if settings.session_store_backend == "memory" else redis_service
+)
+
+
+def get_session_store() -> SessionStore:
+    """
+    Dependency returning the configured session store.
+    
+    Returns:
+        The active SessionStore backend
+    """
+    return session_store
+
+
+def get_session(
+    session_id: str = Depends(get_session_id),
+    store: SessionStore = Depends(get_session_store)
+) -> SessionAccessor:
+    """
+    Dependency returning the current request's session accessor.
+    
+    Returns:
+        SessionAccessor bound to the request's session ID
+    """
+    return SessionAccessor(store, session_id, session_touch_debouncer)
+
+
+async def label_route(request: Request) -> None:
+    """
+    Dependency labeling metrics and logs of this request with its route template.
+    
+    Must stay async: it sets a context variable that the endpoint, which
+    runs in the same task, reads.
+    """
+    route = request.scope.get("route")
+    if route is not None:
+        current_route.set(route.path)
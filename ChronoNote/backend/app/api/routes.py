@@ -2,120 +2,235 @@
 API routes for ChronoNote application.
 Handles file upload, timeline data, chronology test, and date quiz.
 """
+import json
 import random
-import traceback
-from typing import List
+import time
+from typing import Dict, List, Literal, Optional, Tuple, Union
 from uuid import UUID
-from fastapi import APIRouter, UploadFile, File, HTTPException, Depends, Request
+from fastapi import APIRouter, UploadFile, File, HTTPException, Depends, Request, Response, Query, Header
+from fastapi.responses import StreamingResponse
 from app.models.schemas import (
-    UploadResponse, TimelineResponse, ChronoTestResponse, ChronoTestWork,
+    AIExtractedWork, SourceDocument, UploadResponse, TimelineResponse, ChronoTestResponse, ChronoTestWork,
     ChronoCheckRequest, ChronoCheckResponse, QuizQuestion,
-    QuizAnswerRequest, QuizAnswerResponse, StoredWorkItem
+    QuizAnswerRequest, QuizAnswerResponse, StoredWorkItem,
+    ChronoCheckBatchRequest, ChronoCheckBatchResponse, QuizBatchResponse,
+    QuizAnswerBatchRequest, QuizAnswerBatchResponse, QuizAnswerResult,
+    JobAcceptedResponse, JobStatusResponse,
+    DocumentListResponse, DocumentRemovedResponse, DocumentSummary
 )
-from app.services.ai_service import ai_service
+from app.services.ai_service import ai_service, AIServiceBusyError
+from app.services.session_store import InvalidCursorError, SessionStore
+from app.services.session_accessor import SessionAccessor
 from app.services.redis_service import redis_service
+from app.api.dependencies import get_session, get_session_store, label_route
+from app.services.chunking import chunked_extractor
+from app.services.prefilter import PrefilterResult, StreamingPrefilter
+from app.services.session_documents import (
+    BASE_DOCUMENT, DocumentMerge, content_hash, merge_document, remove_document
+)
+from app.services.chrono_scoring import score_chronology
+from app.services.upload_reader import UploadEncodingError, UploadTextReader, UploadTooLargeError
+from app.services.job_queue import job_queue
 from app.middleware.session import get_session_id
+from app.services.metrics import observe_stage, observe_stage_seconds
 from app.config import settings
+from app.log import get_logger
+
 
+router = APIRouter(prefix="/api", tags=["api"], dependencies=[Depends(label_route)])
+logger = get_logger("upload")
 
-router = APIRouter(prefix="/api", tags=["api"])
+
+async def read_markdown_upload(file: UploadFile) -> PrefilterResult:
+    """
+    Validate an uploaded markdown file and return its pre-filtered text.
+    
+    The file is read in bounded chunks, decoded incrementally and fed
+    straight into the pre-filter, so neither the raw bytes nor (with the
+    pre-filter enabled) the whole decoded document are held at once.
+    
+    Raises:
+        HTTPException: 400 for a bad type or encoding, 413 when too large,
+            500 on read errors
+    """
+    # Validate file type
+    if not file.filename.endswith(('.md', '.txt', '.markdown')):
+        raise HTTPException(
+            status_code=400,
+            detail="Invalid file type. Only .md, .txt, or .markdown files are accepted."
+        )
+    
+    reader = UploadTextReader(settings.upload_max_size_kb * 1024)
+    prefilter = StreamingPrefilter(settings.prefilter_context_paragraphs) if settings.prefilter_enabled else None
+    parts: List[str] = []
+    prefilter_seconds = 0.0
+    
+    # Read, decode and pre-filter chunk by chunk
+    try:
+        async for text in reader.iter_text(file):
+            if prefilter is None:
+                parts.append(text)
+                continue
+            start = time.perf_counter()
+            prefilter.feed(text)
+            prefilter_seconds += time.perf_counter() - start
+    except UploadTooLargeError:
+        raise HTTPException(
+            status_code=413,
+            detail=f"File too large. Maximum size is {settings.upload_max_size_kb}KB."
+        )
+    except UploadEncodingError as e:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Invalid file encoding. File must be UTF-8 encoded (invalid byte at offset {e.offset})."
+        )
+    except Exception as e:
+        logger.error("upload.file_read_failed", exc_info=True, error=str(e))
+        raise HTTPException(
+            status_code=500,
+            detail=f"Error reading file: {str(e)}"
+        )
+    
+    observe_stage_seconds("file_read", reader.read_seconds)
+    observe_stage_seconds("decode", reader.decode_seconds)
+    logger.info("upload.file_decoded", size_kb=round(reader.size_bytes / 1024, 2))
+    
+    if prefilter is None:
+        return PrefilterResult.unfiltered("".join(parts), reader.size_bytes)
+    
+    start = time.perf_counter()
+    result = prefilter.finish(reader.size_bytes)
+    observe_stage_seconds("prefilter", prefilter_seconds + time.perf_counter() - start)
+    logger.info(
+        "upload.prefiltered",
+        original_bytes=result.original_bytes,
+        filtered_bytes=result.filtered_bytes,
+        paragraphs_kept=result.paragraphs_kept,
+        paragraphs_total=result.paragraphs_total
+    )
+    return result
 
 
-@router.post("/upload", response_model=UploadResponse)
+@router.post("/upload", response_model=Union[UploadResponse, JobAcceptedResponse])
 async def upload_markdown(
+    response: Response,
     file: UploadFile = File(...),
-    request: Request = None
+    mode: Literal["sync", "async"] = Query("sync"),
+    append: bool = Query(False, description="Add the file to the session instead of replacing it"),
+    request: Request = None,
+    store: SessionStore = Depends(get_session_store)
 ):
     """
     Upload a markdown file and extract historical references using AI.
     
-    - Accepts .md or .txt files (max 50KB)
-    - Extracts historical works using Gemini AI
+    - Accepts .md or .txt files (max upload_max_size_kb, 2MB by default);
+      larger bodies are refused with 413 while they upload
+    - Sends only year-bearing passages to Gemini AI, chunking large documents
+    - Returns 429 with Retry-After when too many extractions are in flight
     - Stores data in Redis with session cookie
     - Returns count of extracted items
+    - With mode=async, queues the extraction for a worker and returns
+      202 with a job ID to poll at /jobs/{job_id}
+    - With append=true, adds the file to the session as a document named
+      after the file: an unchanged document is not extracted again, a
+      changed one replaces its earlier version, and works already in the
+      session are not duplicated (sync mode only)
     """
     try:
         session_id = request.state.session_id
-        print(f"[UPLOAD] Session ID: {session_id}")
+        logger.info("upload.started", session_id=session_id, mode=mode, append=append)
         
-        # Validate file type
-        if not file.filename.endswith(('.md', '.txt', '.markdown')):
+        if append and mode == "async":
             raise HTTPException(
                 status_code=400,
-                detail="Invalid file type. Only .md, .txt, or .markdown files are accepted."
+                detail="Appending documents is only supported for sync uploads."
             )
         
-        # Read file content
-        try:
-            content = await file.read()
-            
-            # Check file size
-            file_size_kb = len(content) / 1024
-            print(f"[UPLOAD] File size: {file_size_kb:.2f} KB")
-            
-            if file_size_kb > settings.upload_max_size_kb:
+        prefiltered = await read_markdown_upload(file)
+        
+        if append:
+            document_hash = content_hash(prefiltered.text)
+            try:
+                documents = await store.get_session_documents(session_id)
+            except Exception as e:
+                logger.error("upload.load_failed", exc_info=True, session_id=session_id, error=str(e))
+                raise HTTPException(
+                    status_code=500,
+                    detail=f"Failed to load session: {str(e)}"
+                )
+            previous = documents.get(file.filename)
+            if previous is not None and previous.content_hash == document_hash:
+                logger.info("upload.unchanged", session_id=session_id, document=file.filename)
+                return UploadResponse(
+                    success=True,
+                    message=f"{file.filename} is unchanged; kept its {len(previous.work_ids)} historical references.",
+                    works_count=len(previous.work_ids),
+                    session_id=session_id
+                )
+        
+        if mode == "async":
+            if store is not redis_service:
                 raise HTTPException(
                     status_code=400,
-                    detail=f"File too large. Maximum size is {settings.upload_max_size_kb}KB."
+                    detail="Async uploads require the redis session store backend."
                 )
-            
-            # Decode content
-            markdown_text = content.decode('utf-8')
-            print(f"[UPLOAD] File decoded successfully, length: {len(markdown_text)} chars")
-            
-        except UnicodeDecodeError:
-            raise HTTPException(
-                status_code=400,
-                detail="Invalid file encoding. File must be UTF-8 encoded."
-            )
-        except Exception as e:
-            print(f"[UPLOAD ERROR] File reading error: {str(e)}")
-            traceback.print_exc()
-            raise HTTPException(
-                status_code=500,
-                detail=f"Error reading file: {str(e)}"
-            )
+            try:
+                job_id = await job_queue.enqueue(session_id, prefiltered.text)
+            except Exception as e:
+                logger.error("upload.enqueue_failed", exc_info=True, error=str(e))
+                raise HTTPException(
+                    status_code=500,
+                    detail=f"Failed to queue extraction: {str(e)}"
+                )
+            logger.info("upload.queued", session_id=session_id, job_id=job_id)
+            response.status_code = 202
+            return JobAcceptedResponse(job_id=job_id, status="queued", session_id=session_id)
         
         # Extract historical works using AI
         try:
-            print("[UPLOAD] Starting AI extraction...")
-            extracted_works = await ai_service.extract_historical_works(markdown_text)
-            print(f"[UPLOAD] AI extraction complete: {len(extracted_works)} works found")
+            with observe_stage("extraction"):
+                extracted_works = await chunked_extractor.extract(prefiltered.text)
+            logger.info("upload.extracted", works=len(extracted_works))
+        except AIServiceBusyError as e:
+            logger.warning("upload.rejected_busy", in_flight=ai_service.in_flight)
+            raise HTTPException(
+                status_code=429,
+                detail=str(e),
+                headers={"Retry-After": str(e.retry_after)}
+            )
         except Exception as e:
-            print(f"[UPLOAD ERROR] AI extraction failed: {str(e)}")
-            traceback.print_exc()
+            logger.error("upload.extraction_failed", exc_info=True, error=str(e))
             raise HTTPException(
                 status_code=500,
                 detail=f"AI extraction failed: {str(e)}"
             )
         
+        if append:
+            return await append_document(store, session_id, file.filename, document_hash, extracted_works)
+        
         # Convert to StoredWorkItem (adds UUIDs)
         try:
-            print("[UPLOAD] Converting to StoredWorkItem...")
-            stored_works = [StoredWorkItem(**work.model_dump()) for work in extracted_works]
-            print(f"[UPLOAD] Conversion complete: {len(stored_works)} items")
+            with observe_stage("model_conversion"):
+                stored_works = [StoredWorkItem(**work.model_dump()) for work in extracted_works]
         except Exception as e:
-            print(f"[UPLOAD ERROR] Conversion failed: {str(e)}")
-            traceback.print_exc()
+            logger.error("upload.conversion_failed", exc_info=True, error=str(e))
             raise HTTPException(
                 status_code=500,
                 detail=f"Failed to convert data: {str(e)}"
             )
         
-        # Save to Redis
+        # Save to the session store
         try:
-            print(f"[UPLOAD] Saving to Redis (session: {session_id})...")
-            redis_service.save_session_data(session_id, stored_works)
-            print("[UPLOAD] Redis save complete")
+            with observe_stage("session_save"):
+                await store.save_session_data(session_id, stored_works)
         except Exception as e:
-            print(f"[UPLOAD ERROR] Redis save failed: {str(e)}")
-            traceback.print_exc()
+            logger.error("upload.save_failed", exc_info=True, session_id=session_id, error=str(e))
             raise HTTPException(
                 status_code=500,
                 detail=f"Failed to save data: {str(e)}"
             )
         
-        print(f"[UPLOAD] Success! Returning response")
+        logger.info("upload.completed", session_id=session_id, works=len(stored_works))
         return UploadResponse(
             success=True,
             message=f"Successfully extracted {len(stored_works)} historical references.",
@@ -126,51 +241,363 @@ async def upload_markdown(
     except HTTPException:
         raise
     except Exception as e:
-        print(f"[UPLOAD ERROR] Unexpected error: {str(e)}")
-        traceback.print_exc()
+        logger.error("upload.unexpected_error", exc_info=True, error=str(e))
         raise HTTPException(
             status_code=500,
             detail=f"Unexpected error: {str(e)}"
         )
 
 
+async def append_document(
+    store: SessionStore,
+    session_id: str,
+    name: str,
+    document_hash: str,
+    extracted_works: List[AIExtractedWork]
+) -> UploadResponse:
+    """
+    Merge one extracted document into the session and save it.
+    
+    The merge is applied to the session as it is when saved, not as it
+    was before extraction, so appends running at the same time all keep
+    their works.
+    
+    Raises:
+        HTTPException: 500 if the session cannot be loaded or saved
+    """
+    def merge(works: Optional[List[StoredWorkItem]], documents: Dict[str, SourceDocument]) -> DocumentMerge:
+        return merge_document(works or [], documents, name, document_hash, extracted_works)
+    
+    try:
+        with observe_stage("session_save"):
+            merged = await store.update_session_data(session_id, merge)
+    except Exception as e:
+        logger.error("upload.save_failed", exc_info=True, session_id=session_id, error=str(e))
+        raise HTTPException(
+            status_code=500,
+            detail=f"Failed to save data: {str(e)}"
+        )
+    
+    works_count = len(merged.documents[name].work_ids)
+    logger.info(
+        "upload.completed",
+        session_id=session_id,
+        document=name,
+        works=works_count,
+        works_added=merged.works_added,
+        works_removed=merged.works_removed,
+        works_updated=merged.works_updated
+    )
+    corrected = f", {merged.works_updated} with corrected years" if merged.works_updated else ""
+    return UploadResponse(
+        success=True,
+        message=(
+            f"Successfully extracted {works_count} historical references "
+            f"({merged.works_added} new to this session{corrected})."
+        ),
+        works_count=works_count,
+        session_id=session_id,
+        session_works_count=len(merged.works)
+    )
+
+
+def parse_if_none_match(header: Optional[str]) -> List[str]:
+    """Entity tags listed in an If-None-Match header, without quotes or W/ prefixes."""
+    if not header:
+        return []
+    tags = []
+    for tag in header.split(","):
+        tag = tag.strip()
+        if tag.startswith("W/"):
+            tag = tag[2:]
+        tags.append(tag.strip('"'))
+    return tags
+
+
+def ndjson_event(event: str, **data) -> bytes:
+    """Encode one streaming upload event as a newline-delimited JSON line."""
+    return (json.dumps({"event": event, **data}) + "\n").encode("utf-8")
+
+
+async def restore_session(
+    store: SessionStore,
+    session_id: str,
+    previous: Optional[Tuple[Optional[List[StoredWorkItem]], Dict[str, SourceDocument]]]
+) -> bool:
+    """
+    Undo the partial saves of a streaming upload that failed.
+    
+    Args:
+        store: The session store
+        session_id: Unique session identifier
+        previous: Works (None if there was no session) and documents read
+            before the first partial save, or None if nothing was saved
+    
+    Returns:
+        True if the session still holds the upload's partial results
+    """
+    if previous is None:
+        return False
+    works, documents = previous
+    try:
+        if works is None:
+            await store.delete_session_data(session_id)
+        else:
+            await store.save_session_data(session_id, works, documents or None)
+    except Exception as e:
+        logger.error("upload.restore_failed", exc_info=True, session_id=session_id, error=str(e))
+        return True
+    return False
+
+
+@router.post("/upload/stream")
+async def upload_markdown_stream(
+    file: UploadFile = File(...),
+    request: Request = None,
+    store: SessionStore = Depends(get_session_store)
+):
+    """
+    Upload a markdown file and stream extracted works as they are found.
+    
+    - Same validation as /upload
+    - Responds with NDJSON events: progress, work (one per StoredWorkItem),
+      done, or error
+    - Replaces the session's timeline once the first works arrive and
+      saves partial results while streaming, so /timeline can already
+      serve them; the timeline body and quiz deck are prepared once, when
+      extraction is done
+    - If extraction fails, the previous session is put back; the error
+      event's partial_data is true if that was not possible
+    """
+    session_id = request.state.session_id
+    logger.info("upload.started", session_id=session_id, mode="stream")
+    
+    prefiltered = await read_markdown_upload(file)
+    
+    # Fail fast while a proper status code can still be sent
+    if ai_service.at_capacity and settings.gemini_queue_timeout_seconds <= 0:
+        raise HTTPException(
+            status_code=429,
+            detail="Too many extractions in progress. Please retry shortly.",
+            headers={"Retry-After": str(settings.gemini_retry_after_seconds)}
+        )
+    
+    async def event_stream():
+        stored_works: List[StoredWorkItem] = []
+        yield ndjson_event(
+            "progress",
+            stage="extracting",
+            original_bytes=prefiltered.original_bytes,
+            filtered_bytes=prefiltered.filtered_bytes
+        )
+        
+        # The previous session, kept until this upload has works to replace
+        # it and restored if the upload then fails
+        previous = None
+        try:
+            last_flush = None
+            
+            async for work in chunked_extractor.stream(prefiltered.text):
+                stored_work = StoredWorkItem(**work.model_dump())
+                stored_works.append(stored_work)
+                yield ndjson_event("work", work=stored_work.model_dump(mode='json'))
+                
+                if last_flush is None or time.monotonic() - last_flush >= settings.upload_stream_flush_seconds:
+                    if previous is None:
+                        previous = (
+                            await store.get_session_data(session_id),
+                            await store.get_session_documents(session_id)
+                        )
+                    await store.save_partial_session_data(session_id, stored_works)
+                    last_flush = time.monotonic()
+                    yield ndjson_event("progress", stage="saved", works_count=len(stored_works))
+            
+            await store.save_session_data(session_id, stored_works)
+        except AIServiceBusyError as e:
+            partial_data = await restore_session(store, session_id, previous)
+            yield ndjson_event(
+                "error", status_code=429, detail=str(e), retry_after=e.retry_after, partial_data=partial_data
+            )
+            return
+        except Exception as e:
+            logger.error("upload.stream_failed", exc_info=True, session_id=session_id, error=str(e))
+            partial_data = await restore_session(store, session_id, previous)
+            yield ndjson_event(
+                "error", status_code=500, detail=f"AI extraction failed: {str(e)}", partial_data=partial_data
+            )
+            return
+        
+        logger.info("upload.completed", session_id=session_id, works=len(stored_works))
+        yield ndjson_event(
+            "done",
+            success=True,
+            message=f"Successfully extracted {len(stored_works)} historical references.",
+            works_count=len(stored_works),
+            session_id=session_id
+        )
+    
+    return StreamingResponse(event_stream(), media_type="application/x-ndjson")
+
+
+@router.get("/jobs/{job_id}", response_model=JobStatusResponse)
+async def get_job_status(job_id: str, session_id: str = Depends(get_session_id)):
+    """
+    Poll the status of a queued extraction.
+    
+    - Only jobs created by the current session are visible
+    - Status is one of queued, running, retrying, done or failed
+    """
+    status = await job_queue.get_status(job_id, session_id)
+    
+    if status is None:
+        raise HTTPException(
+            status_code=404,
+            detail="Job not found."
+        )
+    
+    return status
+
+
+@router.get("/jobs/{job_id}/events")
+async def stream_job_status(job_id: str, session_id: str = Depends(get_session_id)):
+    """
+    Subscribe to a queued extraction's status changes.
+    
+    - Responds with NDJSON, one JobStatusResponse per line
+    - Repeats the current status when it has not changed for
+      job_events_heartbeat_seconds
+    - Closes after the job reaches done or failed, or after
+      job_events_timeout_seconds; reconnect to keep following it
+    """
+    if await job_queue.get_status(job_id, session_id) is None:
+        raise HTTPException(
+            status_code=404,
+            detail="Job not found."
+        )
+    
+    async def event_stream():
+        async for status in job_queue.subscribe(job_id, session_id):
+            yield (status.model_dump_json() + "\n").encode("utf-8")
+    
+    return StreamingResponse(event_stream(), media_type="application/x-ndjson")
+
+
+@router.get("/documents", response_model=DocumentListResponse)
+async def list_documents(
+    session: SessionAccessor = Depends(get_session)
+):
+    """
+    List the documents appended to the session.
+    
+    - Sessions filled by a single (non-append) upload have none
+    """
+    documents = await session.get_documents()
+    return DocumentListResponse(documents=[
+        DocumentSummary(name=document.name, works_count=len(document.work_ids))
+        for document in documents.values() if document.name != BASE_DOCUMENT
+    ])
+
+
+@router.delete("/documents/{name}", response_model=DocumentRemovedResponse)
+async def delete_document(
+    name: str,
+    session: SessionAccessor = Depends(get_session)
+):
+    """
+    Remove an appended document from the session.
+    
+    - Drops the works only this document contributed; works another
+      document also mentions stay, as does the rest of the session,
+      including works it had before its first appended document
+    """
+    def remove(works: Optional[List[StoredWorkItem]], documents: Dict[str, SourceDocument]) -> Optional[DocumentMerge]:
+        return remove_document(works, documents, name) if works is not None else None
+    
+    removal = await session.update(remove)
+    
+    if removal is None:
+        raise HTTPException(
+            status_code=404,
+            detail=f"Document not found: {name}"
+        )
+    
+    return DocumentRemovedResponse(
+        success=True,
+        message=f"Removed {name} and {removal.works_removed} historical references.",
+        works_removed=removal.works_removed,
+        session_works_count=len(removal.works)
+    )
+
+
 @router.get("/timeline", response_model=TimelineResponse)
-async def get_timeline(session_id: str = Depends(get_session_id)):
+async def get_timeline(
+    from_year: Optional[int] = Query(None, description="Only works from this year on"),
+    to_year: Optional[int] = Query(None, description="Only works up to this year"),
+    cursor: Optional[str] = Query(None, description="next_cursor of the previous page"),
+    limit: Optional[int] = Query(None, ge=1, le=settings.timeline_max_page_size),
+    if_none_match: Optional[str] = Header(None),
+    session: SessionAccessor = Depends(get_session)
+):
     """
     Retrieve timeline data sorted by year (ascending).
     
     - Requires valid session cookie
-    - Returns all works sorted chronologically
+    - Optional from_year/to_year (inclusive) restrict the year range
+    - With limit, returns one page plus next_cursor for the following one;
+      without it, returns every matching work
+    - The order is kept by the session store, so nothing is sorted here
+    - The full timeline is served as the JSON body rendered at upload
+      time, with a strong ETag; a matching If-None-Match gets 304
     """
-    # Retrieve data from Redis
-    works = redis_service.get_session_data(session_id)
+    if from_year is not None and to_year is not None and from_year > to_year:
+        raise HTTPException(status_code=400, detail="from_year must not be after to_year")
     
-    if works is None:
+    if from_year is None and to_year is None and cursor is None and limit is None:
+        client_tags = parse_if_none_match(if_none_match)
+        timeline = await session.get_timeline_json([tag for tag in client_tags if tag != "*"])
+        if timeline is None:
+            raise HTTPException(
+                status_code=404,
+                detail="No timeline data found. Please upload a file first."
+            )
+        version, body = timeline
+        headers = {"ETag": f'"{version}"', "Cache-Control": "private, no-cache"}
+        if body is None or "*" in client_tags:
+            return Response(status_code=304, headers=headers)
+        return Response(content=body, media_type="application/json", headers=headers)
+    
+    try:
+        page = await session.get_timeline_page(from_year, to_year, cursor, limit)
+    except InvalidCursorError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    
+    if page is None:
         raise HTTPException(
             status_code=404,
             detail="No timeline data found. Please upload a file first."
         )
+    works, next_cursor = page
     
-    # Sort by year ascending
-    works_sorted = sorted(works, key=lambda w: w.year)
-    
-    # Refresh session TTL
-    redis_service.refresh_session_ttl(session_id)
-    
-    return TimelineResponse(works=works_sorted)
+    return TimelineResponse(works=works, next_cursor=next_cursor)
 
 
 @router.get("/chrono-test", response_model=ChronoTestResponse)
-async def get_chrono_test(session_id: str = Depends(get_session_id)):
+async def get_chrono_test(
+    count: Optional[int] = Query(
+        None, ge=2, le=settings.chrono_test_max_items,
+        description="Works to order; the session's size for a full timeline challenge"
+    ),
+    session: SessionAccessor = Depends(get_session)
+):
     """
     Generate chronology test data.
     
-    - Selects 5-7 random items from timeline
+    - Selects 5-7 random items from timeline, or `count` of them
     - Removes year field from response
     - Shuffles order randomly
     """
-    # Retrieve data from Redis
-    works = redis_service.get_session_data(session_id)
+    # Retrieve data from the session store
+    works = await session.get_data()
     
     if works is None:
         raise HTTPException(
@@ -178,8 +605,8 @@ async def get_chrono_test(session_id: str = Depends(get_session_id)):
             detail="No timeline data found. Please upload a file first."
         )
     
-    # Select random subset (5-7 items, or all if less than 5)
-    num_items = min(len(works), random.randint(5, 7))
+    # Select random subset (5-7 items or count, or all if fewer)
+    num_items = min(len(works), count or random.randint(5, 7))
     selected_works = random.sample(works, num_items)
     
     # Convert to ChronoTestWork (removes year field)
@@ -195,119 +622,183 @@ async def get_chrono_test(session_id: str = Depends(get_session_id)):
     # Shuffle randomly
     random.shuffle(test_works)
     
-    # Refresh session TTL
-    redis_service.refresh_session_ttl(session_id)
-    
     return ChronoTestResponse(works=test_works)
 
 
-@router.post("/chrono-check", response_model=ChronoCheckResponse)
-async def check_chronology(
-    request: ChronoCheckRequest,
-    session_id: str = Depends(get_session_id)
-):
+def require_batch_size(items: List, label: str) -> None:
     """
-    Validate user's proposed chronological order.
+    Reject empty batches and batches above game_batch_max_items.
     
-    - Accepts list of work IDs in user's proposed order
-    - Checks if years are in non-decreasing order
-    - Returns correct order
+    Raises:
+        HTTPException: 400 if the batch size is out of range
+    """
+    if not 1 <= len(items) <= settings.game_batch_max_items:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Send between 1 and {settings.game_batch_max_items} {label}."
+        )
+
+
+def require_works(works_map: Optional[Dict[UUID, StoredWorkItem]], work_ids: List[UUID]) -> Dict[UUID, StoredWorkItem]:
     """
-    # Retrieve data from Redis
-    works = redis_service.get_session_data(session_id)
+    Check that the session exists and holds every requested work.
     
-    if works is None:
+    Raises:
+        HTTPException: 404 without session data, 400 for an unknown work ID
+    """
+    if works_map is None:
         raise HTTPException(
             status_code=404,
             detail="No timeline data found. Please upload a file first."
         )
     
-    # Create lookup map
-    works_map = {work.id: work for work in works}
-    
     # Validate all IDs exist
-    for work_id in request.ordered_ids:
+    for work_id in work_ids:
         if work_id not in works_map:
             raise HTTPException(
                 status_code=400,
                 detail=f"Invalid work ID: {work_id}"
             )
-    
+    return works_map
+
+
+def grade_chronology(ordered_ids: List[UUID], works_map: Dict[UUID, StoredWorkItem]) -> ChronoCheckResponse:
+    """Score one proposed order against the works' years, with partial credit."""
     # Get the works in user's proposed order
-    user_works = [works_map[work_id] for work_id in request.ordered_ids]
-    
-    # Check if years are in non-decreasing order
-    is_correct = all(
-        user_works[i].year <= user_works[i + 1].year
-        for i in range(len(user_works) - 1)
-    )
+    user_works = [works_map[work_id] for work_id in ordered_ids]
+    result = score_chronology([work.year for work in user_works])
     
     # Get correct order
     correct_works = sorted(user_works, key=lambda w: w.year)
     correct_order = [work.id for work in correct_works]
     
-    # Refresh session TTL
-    redis_service.refresh_session_ttl(session_id)
-    
+    if result.correct:
+        message = "Correct order!"
+    else:
+        message = f"Incorrect order: {len(result.out_of_place)} of {len(user_works)} works are out of place. Try again!"
     return ChronoCheckResponse(
         success=True,
-        correct=is_correct,
+        correct=result.correct,
         correct_order=correct_order,
-        message="Correct order!" if is_correct else "Incorrect order. Try again!"
+        message=message,
+        score=result.score,
+        inversions=result.inversions,
+        max_inversions=result.max_inversions,
+        longest_in_order=len(result.in_order),
+        out_of_place=[user_works[position].id for position in result.out_of_place]
+    )
+
+
+def grade_quiz_answer(answer: QuizAnswerRequest, target_work: StoredWorkItem) -> QuizAnswerResult:
+    """Check one selected year against the work's actual year."""
+    is_correct = answer.selected_year == target_work.year
+    
+    return QuizAnswerResult(
+        work_id=target_work.id,
+        correct=is_correct,
+        actual_year=target_work.year,
+        message="Correct!" if is_correct else f"Incorrect. The correct year is {target_work.year}."
+    )
+
+
+@router.post("/chrono-check", response_model=ChronoCheckResponse)
+async def check_chronology(
+    request: ChronoCheckRequest,
+    session: SessionAccessor = Depends(get_session)
+):
+    """
+    Validate user's proposed chronological order.
+    
+    - Accepts list of work IDs in user's proposed order
+    - Checks if years are in non-decreasing order
+    - Returns correct order and partial credit: the share of pairs in the
+      right order, and the works outside the longest run already in order
+    """
+    # Fetch only the requested works from the session store
+    works_map = require_works(await session.get_works(request.ordered_ids), request.ordered_ids)
+    
+    return grade_chronology(request.ordered_ids, works_map)
+
+
+@router.post("/chrono-check-batch", response_model=ChronoCheckBatchResponse)
+async def check_chronology_batch(
+    request: ChronoCheckBatchRequest,
+    session: SessionAccessor = Depends(get_session)
+):
+    """
+    Validate several proposed orders in one request.
+    
+    - Each ordering is checked like /chrono-check
+    - The works of all orderings are fetched in a single session read
+    - Returns one result per ordering plus the share that was correct and
+      the mean partial score
+    """
+    require_batch_size(request.orderings, "orderings")
+    
+    # One read for the works of every ordering
+    work_ids = list({work_id: None for ordering in request.orderings for work_id in ordering.ordered_ids})
+    works_map = require_works(await session.get_works(work_ids), work_ids)
+    
+    results = [grade_chronology(ordering.ordered_ids, works_map) for ordering in request.orderings]
+    correct_count = sum(result.correct for result in results)
+    return ChronoCheckBatchResponse(
+        results=results,
+        correct_count=correct_count,
+        total=len(results),
+        score=correct_count / len(results),
+        partial_score=sum(result.score for result in results) / len(results)
     )
 
 
 @router.get("/date-quiz/next", response_model=QuizQuestion)
-async def get_next_quiz_question(session_id: str = Depends(get_session_id)):
+async def get_next_quiz_question(
+    session: SessionAccessor = Depends(get_session)
+):
     """
-    Generate next quiz question.
+    Serve the next quiz question.
     
-    - Picks 1 random work as target
-    - Generates 3 plausible decoy years
+    - Questions come from a deck dealt when the session was saved: every
+      work is asked once, in shuffled order, before any question repeats
+    - Decoy years are drawn from the session's own years near the target
     - Returns target work (without year shown) and 4 shuffled year options
     """
-    # Retrieve data from Redis
-    works = redis_service.get_session_data(session_id)
+    # Take the next question from the session's deck
+    questions = await session.next_quiz_questions()
     
-    if works is None:
+    if questions is None:
         raise HTTPException(
             status_code=404,
             detail="No timeline data found. Please upload a file first."
         )
     
-    # Pick random target work
-    target_work = random.choice(works)
-    
-    # Generate 3 decoy years
-    decoys = set()
-    while len(decoys) < 3:
-        # Generate decoy within +/- 5 to 20 years
-        offset = random.randint(5, 20) * random.choice([-1, 1])
-        decoy_year = target_work.year + offset
-        
-        # Ensure decoy is reasonable (not negative, not in far future)
-        if 1 <= decoy_year <= 2100 and decoy_year != target_work.year:
-            decoys.add(decoy_year)
+    return questions[0]
+
+
+@router.get("/date-quiz/batch", response_model=QuizBatchResponse)
+async def get_quiz_batch(
+    count: int = Query(10, ge=1, le=settings.game_batch_max_items),
+    session: SessionAccessor = Depends(get_session)
+):
+    """
+    Serve the next `count` quiz questions at once.
     
-    # Combine correct year with decoys and shuffle
-    year_options = [target_work.year] + list(decoys)
-    random.shuffle(year_options)
+    - Taken from the same deck as /date-quiz/next, in a single session read
+    """
+    questions = await session.next_quiz_questions(count)
     
-    # Refresh session TTL
-    redis_service.refresh_session_ttl(session_id)
+    if questions is None:
+        raise HTTPException(
+            status_code=404,
+            detail="No timeline data found. Please upload a file first."
+        )
     
-    return QuizQuestion(
-        work_id=target_work.id,
-        title=target_work.title,
-        author_or_source=target_work.author_or_source,
-        year_options=year_options
-    )
+    return QuizBatchResponse(questions=questions)
 
 
 @router.post("/date-quiz/check", response_model=QuizAnswerResponse)
 async def check_quiz_answer(
     request: QuizAnswerRequest,
-    session_id: str = Depends(get_session_id)
+    session: SessionAccessor = Depends(get_session)
 ):
     """
     Validate quiz answer.
@@ -315,32 +806,35 @@ async def check_quiz_answer(
     - Checks if selected year matches the work's actual year
     - Returns correct/incorrect status and actual year
     """
-    # Retrieve data from Redis
-    works = redis_service.get_session_data(session_id)
-    
-    if works is None:
-        raise HTTPException(
-            status_code=404,
-            detail="No timeline data found. Please upload a file first."
-        )
+    # Fetch only the target work from the session store
+    works_map = require_works(await session.get_works([request.work_id]), [request.work_id])
     
-    # Find the target work
-    target_work = next((w for w in works if w.id == request.work_id), None)
-    
-    if target_work is None:
-        raise HTTPException(
-            status_code=400,
-            detail=f"Invalid work ID: {request.work_id}"
-        )
-    
-    # Check if answer is correct
-    is_correct = request.selected_year == target_work.year
-    
-    # Refresh session TTL
-    redis_service.refresh_session_ttl(session_id)
+    result = grade_quiz_answer(request, works_map[request.work_id])
+    return QuizAnswerResponse(**result.model_dump(exclude={"work_id"}))
+
+
+@router.post("/date-quiz/check-batch", response_model=QuizAnswerBatchResponse)
+async def check_quiz_answers(
+    request: QuizAnswerBatchRequest,
+    session: SessionAccessor = Depends(get_session)
+):
+    """
+    Grade a whole round of quiz answers in one request.
     
-    return QuizAnswerResponse(
-        correct=is_correct,
-        actual_year=target_work.year,
-        message="Correct!" if is_correct else f"Incorrect. The correct year is {target_work.year}."
+    - Each answer is checked like /date-quiz/check
+    - The works of all answers are fetched in a single session read
+    - Returns one result per answer plus the share that was correct
+    """
+    require_batch_size(request.answers, "answers")
+    
+    work_ids = list({answer.work_id: None for answer in request.answers})
+    works_map = require_works(await session.get_works(work_ids), work_ids)
+    
+    results = [grade_quiz_answer(answer, works_map[answer.work_id]) for answer in request.answers]
+    correct_count = sum(result.correct for result in results)
+    return QuizAnswerBatchResponse(
+        results=results,
+        correct_count=correct_count,
+        total=len(results),
+        score=correct_count / len(results)
     )
@@ -3,7 +3,7 @@ Configuration management using Pydantic Settings.
 Loads environment variables and provides application configuration.
 """
 from pydantic_settings import BaseSettings
-from typing import List
+from typing import List, Literal
 
 
 class Settings(BaseSettings):
@@ -11,25 +11,88 @@ class Settings(BaseSettings):
     
     # Gemini AI Configuration
     gemini_api_key: str
+    gemini_max_concurrent_requests: int = 8  # Global cap on in-flight calls per worker
+    gemini_queue_timeout_seconds: float = 0  # How long an upload may wait for a slot
+    gemini_retry_after_seconds: int = 5  # Retry-After sent with 429 responses
+    gemini_batch_enabled: bool = False  # Combine concurrent small extractions into one call
+    gemini_batch_window_ms: int = 50  # How long a small extraction waits for others
+    gemini_batch_max_documents: int = 8
+    gemini_batch_max_document_chars: int = 4000  # Larger extractions are never batched
+    gemini_structured_output: bool = True  # Enforce the response schema via Gemini's JSON mode
+    gemini_repair_max_retries: int = 1  # Follow-up calls for the unrecovered part of a damaged response
     
     # Redis Configuration
     redis_host: str = "localhost"
     redis_port: int = 6379
     redis_db: int = 0
     redis_password: str = ""
+    redis_max_connections: int = 50  # Per-worker connection pool bound
+    redis_pool_timeout_seconds: float = 5.0  # Wait for a free pooled connection
+    redis_stats_header: bool = False  # Report per-request Redis round trips in response headers
     
     # Session Configuration
+    session_store_backend: Literal["redis", "memory"] = "redis"
+    session_memory_max_sessions: int = 10000  # Capacity of the in-memory backend
+    session_decode_cache_max_works: int = 200000  # Decoded works cached per worker; 0 disables
     session_ttl_seconds: int = 7200  # 2 hours
+    session_compact_encoding: bool = True  # Binary session values; false writes JSON that older workers can read
+    session_compress_min_bytes: int = 1024  # zstd-compress stored values at least this large; 0 disables
+    session_compress_level: int = 3
+    session_ttl_refresh_interval_seconds: int = 60  # Reads skip the TTL refresh within this window
+    timeline_max_page_size: int = 1000  # Upper bound for /api/timeline?limit=
+    game_batch_max_items: int = 50  # Questions, answers or orderings per batch request
+    chrono_test_max_items: int = 1000  # Upper bound for /api/chrono-test?count=
     session_cookie_name: str = "chrononote_session"
     session_cookie_secure: bool = False
     session_cookie_httponly: bool = True
     session_cookie_samesite: str = "lax"
+    session_secret_key: str = ""  # When set, session cookies are HMAC-signed and verified
+    
+    # Extraction Cache Configuration
+    extraction_cache_enabled: bool = True
+    extraction_cache_ttl_seconds: int = 604800  # 7 days
+    extraction_cache_partial_ttl_seconds: int = 600  # Salvaged or retried results; 0 to never cache them
+    extraction_cache_max_entries: int = 10000
+    
+    # Knowledge Index Configuration
+    knowledge_enabled: bool = True
+    knowledge_min_confirmations: int = 3  # Observations before a cached year is trusted
+    knowledge_min_agreement: float = 0.9  # Share of observations that must agree on the year
+    knowledge_max_title_words: int = 8
+    knowledge_max_titles: int = 100000  # Most recently seen titles kept for lookup
+    knowledge_ttl_seconds: int = 7776000  # 90 days
+    
+    # Background Job Configuration
+    job_worker_concurrency: int = 4  # Keep at or below gemini_max_concurrent_requests
+    job_max_attempts: int = 3
+    job_ttl_seconds: int = 86400  # How long job status stays queryable
+    job_stream_max_len: int = 10000
+    job_claim_idle_seconds: int = 300  # Reclaim jobs from workers that died mid-job
+    job_gemini_queue_timeout_seconds: float = 60  # Workers wait this long for a Gemini slot before backing off
+    job_max_busy_requeues: int = 20  # Jobs still finding no Gemini slot after this many backoffs are dead-lettered
+    job_events_max_connections: int = 200  # Dedicated pool for /api/jobs/{id}/events subscriptions
+    job_events_heartbeat_seconds: float = 15  # Idle subscriptions re-send the current status this often
+    job_events_timeout_seconds: int = 900  # Subscriptions are closed after this long
     
     # CORS Configuration
     cors_origins: str = "http://localhost:3000,http://localhost:5173"
     
     # Application Settings
-    upload_max_size_kb: int = 50
+    upload_max_size_kb: int = 2048
+    
+    # Chunked Extraction Configuration
+    extraction_chunk_max_chars: int = 12000  # Keeps each response well under max_output_tokens
+    extraction_chunk_overlap_chars: int = 500
+    extraction_chunk_concurrency: int = 4  # Concurrent chunk extractions per upload
+    extraction_chunk_queue_timeout_seconds: float = 30  # Later chunks of an upload wait this long for a Gemini slot
+    prefilter_enabled: bool = True  # Send Gemini only year-bearing paragraphs
+    prefilter_context_paragraphs: int = 0  # Neighbouring paragraphs kept around a match
+    upload_stream_flush_seconds: float = 0.5  # Partial-result save interval for /upload/stream
+    
+    # Observability Configuration
+    log_level: str = "INFO"
+    log_format: Literal["json", "text"] = "json"  # JSON lines for aggregation, text for development
+    metrics_enabled: bool = True  # Prometheus histograms and the /metrics endpoint
     
     @property
     def cors_origins_list(self) -> List[str]:
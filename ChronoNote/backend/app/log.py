@@ -0,0 +1,129 @@
+"""
+Structured, non-blocking logging.
+Log calls only put a record on an in-memory queue; a background thread
+formats and writes them, so a slow stdout never stalls the event loop.
+"""
+import copy
+import json
+import logging
+import logging.handlers
+import queue
+import sys
+from datetime import datetime, timezone
+from typing import Any, Optional
+from app.config import settings
+from app.services.metrics import current_route
+
+
+ROOT_LOGGER = "chrononote"
+
+_listener: Optional[logging.handlers.QueueListener] = None
+_handler: Optional[logging.Handler] = None
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per line: timestamp, level, logger, event and fields."""
+    
+    def format(self, record: logging.LogRecord) -> str:
+        """Render a record prepared by StructuredQueueHandler."""
+        entry = {
+            "ts": datetime.fromtimestamp(record.created, timezone.utc).isoformat(),
+            "level": record.levelname,
+            "logger": record.name,
+            "event": record.getMessage(),
+            **getattr(record, "fields", {}),
+        }
+        if record.exc_text:
+            entry["exc"] = record.exc_text
+        return json.dumps(entry, default=str)
+
+
+class TextFormatter(logging.Formatter):
+    """Human-readable "LEVEL logger event key=value" lines for development."""
+    
+    def format(self, record: logging.LogRecord) -> str:
+        """Render a record prepared by StructuredQueueHandler."""
+        fields = " ".join(f"{key}={value}" for key, value in getattr(record, "fields", {}).items())
+        line = f"{record.levelname:<7} {record.name} {record.getMessage()} {fields}".rstrip()
+        if record.exc_text:
+            line = f"{line}\n{record.exc_text}"
+        return line
+
+
+class StructuredQueueHandler(logging.handlers.QueueHandler):
+    """Queue handler that keeps structured fields and renders tracebacks up front."""
+    
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        """Make the record safe to format later on the listener thread."""
+        record = copy.copy(record)
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+        record.msg = record.getMessage()
+        record.args = None
+        record.exc_info = None
+        return record
+
+
+class StructuredLogger:
+    """Logger taking an event name plus keyword fields instead of a format string."""
+    
+    def __init__(self, name: str):
+        """Wrap the stdlib logger of the given name."""
+        self._logger = logging.getLogger(name)
+    
+    def info(self, event: str, **fields: Any) -> None:
+        """Log a routine event."""
+        self._log(logging.INFO, event, False, fields)
+    
+    def warning(self, event: str, **fields: Any) -> None:
+        """Log an event that needs attention but was handled."""
+        self._log(logging.WARNING, event, False, fields)
+    
+    def error(self, event: str, exc_info: bool = False, **fields: Any) -> None:
+        """Log a failure, optionally with the current exception's traceback."""
+        self._log(logging.ERROR, event, exc_info, fields)
+    
+    def _log(self, level: int, event: str, exc_info: bool, fields: dict) -> None:
+        """Attach the current route and hand the record to the queue."""
+        if self._logger.isEnabledFor(level):
+            fields.setdefault("route", current_route.get())
+            self._logger.log(level, event, exc_info=exc_info, extra={"fields": fields})
+
+
+def get_logger(name: str) -> StructuredLogger:
+    """
+    Return a structured logger below the application's root logger.
+    
+    Args:
+        name: Component name, e.g. "upload" or "worker"
+    """
+    return StructuredLogger(f"{ROOT_LOGGER}.{name}")
+
+
+def setup_logging() -> None:
+    """Install the queue handler and start the writer thread (idempotent)."""
+    global _listener, _handler
+    if _listener is not None:
+        return
+    
+    output = logging.StreamHandler(sys.stdout)
+    output.setFormatter(JsonFormatter() if settings.log_format == "json" else TextFormatter())
+    
+    log_queue: queue.SimpleQueue = queue.SimpleQueue()
+    root = logging.getLogger(ROOT_LOGGER)
+    root.setLevel(settings.log_level.upper())
+    _handler = StructuredQueueHandler(log_queue)
+    root.addHandler(_handler)
+    root.propagate = False
+    
+    _listener = logging.handlers.QueueListener(log_queue, output)
+    _listener.start()
+
+
+def shutdown_logging() -> None:
+    """Flush queued records and stop the writer thread."""
+    global _listener, _handler
+    if _listener is not None:
+        logging.getLogger(ROOT_LOGGER).removeHandler(_handler)
+        _listener.stop()
+        _listener = _handler = None
@@ -2,21 +2,55 @@
 ChronoNote - Retro-Futuristic Time Machine Application
 Main FastAPI application entry point.
 """
-from fastapi import FastAPI
+import os
+from contextlib import asynccontextmanager
+from fastapi import FastAPI, Response
+from fastapi.responses import ORJSONResponse
 from fastapi.middleware.cors import CORSMiddleware
+from prometheus_client import CONTENT_TYPE_LATEST, CollectorRegistry, REGISTRY, generate_latest, multiprocess
 from app.config import settings
+from app.log import setup_logging, shutdown_logging
+from app.middleware.metrics import MetricsMiddleware
 from app.middleware.session import SessionMiddleware
+from app.middleware.redis_stats import RedisStatsMiddleware
+from app.middleware.upload_limit import UploadLimitMiddleware
 from app.api.routes import router
+from app.services.ai_service import ai_service
 from app.services.redis_service import redis_service
+from app.api.dependencies import session_store
+from app.services.extraction_cache import extraction_cache
+from app.services.job_queue import job_queue
+from app.services.knowledge_index import knowledge_index
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Open shared resources on startup and release them on shutdown."""
+    setup_logging()
+    # Redis also backs the extraction cache, knowledge index and job queue
+    await redis_service.connect()
+    if session_store is not redis_service:
+        await session_store.connect()
+    yield
+    if session_store is not redis_service:
+        await session_store.close()
+    await job_queue.close()
+    await redis_service.close()
+    shutdown_logging()
 
 
 # Create FastAPI application
 app = FastAPI(
     title="ChronoNote API",
     description="AI-powered historical timeline extraction and interactive learning",
-    version="1.0.0"
+    version="1.0.0",
+    lifespan=lifespan,
+    default_response_class=ORJSONResponse  # orjson instead of the stdlib encoder
 )
 
+# Reject oversized uploads while they stream in (inside CORS, so the 413 is readable)
+app.add_middleware(UploadLimitMiddleware)
+
 # Add CORS middleware
 app.add_middleware(
     CORSMiddleware,
@@ -29,6 +63,14 @@ app.add_middleware(
 # Add session middleware
 app.add_middleware(SessionMiddleware)
 
+# Report per-request Redis traffic (testing only)
+if settings.redis_stats_header:
+    app.add_middleware(RedisStatsMiddleware)
+
+# Label metrics and logs with the route template (outermost, so it times everything)
+if settings.metrics_enabled:
+    app.add_middleware(MetricsMiddleware)
+
 # Include API router
 app.include_router(router)
 
@@ -43,17 +85,44 @@ async def root():
     }
 
 
+@app.get("/metrics", include_in_schema=False)
+async def metrics():
+    """
+    Prometheus scrape endpoint.
+    With several uvicorn workers, set PROMETHEUS_MULTIPROC_DIR so every
+    worker's samples are aggregated here.
+    """
+    if not settings.metrics_enabled:
+        return Response(status_code=404)
+    registry = REGISTRY
+    if "PROMETHEUS_MULTIPROC_DIR" in os.environ:
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+    return Response(generate_latest(registry), media_type=CONTENT_TYPE_LATEST)
+
+
 @app.get("/health")
 async def health_check():
     """
     Health check endpoint.
-    Verifies API and Redis connectivity.
+    Verifies API and Redis connectivity and reports extraction cache,
+    Gemini batching and output recovery, and knowledge index counters.
     """
-    redis_status = "connected" if redis_service.ping() else "disconnected"
+    redis_status = "connected" if await redis_service.ping() else "disconnected"
+    store_status = "connected" if await session_store.ping() else "disconnected"
     
     return {
         "status": "healthy",
-        "redis": redis_status
+        "redis": redis_status,
+        "session_store": store_status,
+        "decoded_session_cache": redis_service.decoded_cache.stats(),
+        "extraction_cache": extraction_cache.stats(),
+        "gemini_batching": ai_service.batching_stats,
+        "gemini_output": ai_service.output_stats,
+        "knowledge_index": {
+            "paragraphs_resolved": knowledge_index.resolved,
+            "paragraphs_unresolved": knowledge_index.unresolved
+        }
     }
 
 
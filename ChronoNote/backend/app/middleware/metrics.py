@@ -0,0 +1,54 @@
+"""
+Request metrics middleware.
+Records the request latency histogram, labeled with the route template the
+router matched.
+"""
+import time
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+from app.services.metrics import HTTP_REQUEST_SECONDS, current_route
+
+
+class MetricsMiddleware:
+    """
+    Pure ASGI middleware timing each request under its route template.
+    
+    Templates such as /api/jobs/{job_id} keep the label cardinality bounded;
+    requests matching no route are labeled "unmatched". The label_route
+    dependency exposes the same template to metrics and logs recorded
+    while the endpoint runs.
+    """
+    
+    def __init__(self, app: ASGIApp):
+        """
+        Wrap an ASGI application.
+        
+        Args:
+            app: The next ASGI application in the stack
+        """
+        self.app = app
+    
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        """Time the request under its route label."""
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        
+        token = current_route.set("unmatched")
+        status = 500
+        start = time.perf_counter()
+        
+        async def send_with_status(message: Message) -> None:
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+        
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            # The router records the matched route in the shared scope
+            route = getattr(scope.get("route"), "path", "unmatched")
+            HTTP_REQUEST_SECONDS.labels(route, scope["method"], str(status)).observe(
+                time.perf_counter() - start
+            )
+            current_route.reset(token)
@@ -0,0 +1,43 @@
+"""
+Middleware reporting Redis traffic per request.
+Enabled with REDIS_STATS_HEADER so tests can check how many round trips an
+endpoint makes without instrumenting the application.
+"""
+from starlette.datastructures import MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+from app.services.redis_stats import count_commands
+
+
+class RedisStatsMiddleware:
+    """
+    Pure ASGI middleware adding X-Redis-Round-Trips and X-Redis-Commands headers.
+    
+    The counts cover the Redis traffic up to the response start message.
+    Streaming response bodies are produced after the headers are sent, so
+    their Redis traffic is not included.
+    """
+    
+    def __init__(self, app: ASGIApp):
+        """
+        Wrap an ASGI application.
+        
+        Args:
+            app: The next ASGI application in the stack
+        """
+        self.app = app
+    
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        """Count Redis traffic while the request is handled."""
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        
+        with count_commands() as stats:
+            async def send_with_stats(message: Message) -> None:
+                if message["type"] == "http.response.start":
+                    headers = MutableHeaders(scope=message)
+                    headers.append("X-Redis-Round-Trips", str(stats.round_trips))
+                    headers.append("X-Redis-Commands", str(stats.commands))
+                await send(message)
+            
+            await self.app(scope, receive, send_with_stats)
@@ -2,48 +2,129 @@
 Session middleware for managing browser session cookies.
 Creates and validates session UUIDs for temporary data storage.
 """
+import base64
+import hashlib
+import hmac
+import http.cookies
 import uuid
-from fastapi import Request, Response
-from starlette.middleware.base import BaseHTTPMiddleware
+from typing import Optional
+from fastapi import Request
+from starlette.datastructures import MutableHeaders
+from starlette.requests import cookie_parser
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
 from app.config import settings
 
 
-class SessionMiddleware(BaseHTTPMiddleware):
+def sign_session_id(session_id: str, secret_key: str) -> str:
     """
-    Middleware to manage session cookies.
-    Creates a new session UUID if one doesn't exist.
+    Append an HMAC-SHA256 signature to a session ID.
+    
+    Returns:
+        Cookie value of the form "{session_id}.{signature}"
+    """
+    digest = hmac.new(secret_key.encode("utf-8"), session_id.encode("utf-8"), hashlib.sha256).digest()
+    signature = base64.urlsafe_b64encode(digest).rstrip(b"=").decode("ascii")
+    return f"{session_id}.{signature}"
+
+
+def verify_session_cookie(value: str, secret_key: str = "") -> Optional[str]:
+    """
+    Extract the session ID from a cookie value.
+    
+    The ID must be a canonical UUID; when secret_key is set it must also
+    carry a valid signature. Both checks are local, so forged or garbage
+    cookies never reach the session store.
+    
+    Returns:
+        The session ID, or None if the cookie is not acceptable
+    """
+    session_id = value
+    if secret_key:
+        session_id, _, _ = value.partition(".")
+        if not hmac.compare_digest(sign_session_id(session_id, secret_key), value):
+            return None
+    try:
+        if str(uuid.UUID(session_id)) != session_id:
+            return None
+    except ValueError:
+        return None
+    return session_id
+
+
+class SessionMiddleware:
+    """
+    Pure ASGI middleware to manage session cookies.
+    Creates a new session UUID if the request carries no valid one.
+    
+    Unlike a BaseHTTPMiddleware it does not run the endpoint in a separate
+    task or re-wrap the response stream; it only edits the response start
+    message, so streaming responses pass through untouched.
     """
     
-    async def dispatch(self, request: Request, call_next):
+    def __init__(self, app: ASGIApp):
+        """
+        Wrap an ASGI application.
+        
+        Args:
+            app: The next ASGI application in the stack
+        """
+        self.app = app
+        self.secret_key = settings.session_secret_key
+    
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
         """Process request and inject session ID."""
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
         
-        # Check if session cookie exists
-        session_id = request.cookies.get(settings.session_cookie_name)
+        session_id = self._read_session_id(scope)
+        new_session = session_id is None
         
-        # If no session exists, create a new one
-        if not session_id:
+        # If no valid session exists, create a new one
+        if new_session:
             session_id = str(uuid.uuid4())
-            request.state.session_id = session_id
-            request.state.new_session = True
-        else:
-            request.state.session_id = session_id
-            request.state.new_session = False
         
-        # Process the request
-        response: Response = await call_next(request)
+        state = scope.setdefault("state", {})
+        state["session_id"] = session_id
+        state["new_session"] = new_session
+        
+        if not new_session:
+            await self.app(scope, receive, send)
+            return
         
-        # Set cookie if it's a new session
-        if request.state.new_session:
-            response.set_cookie(
-                key=settings.session_cookie_name,
-                value=session_id,
-                httponly=settings.session_cookie_httponly,
-                secure=settings.session_cookie_secure,
-                samesite=settings.session_cookie_samesite,
-                max_age=settings.session_ttl_seconds
-            )
+        set_cookie = self._cookie_header(session_id)
         
-        return response
+        async def send_with_cookie(message: Message) -> None:
+            # Set cookie on the new session's response
+            if message["type"] == "http.response.start":
+                MutableHeaders(scope=message).append("set-cookie", set_cookie)
+            await send(message)
+        
+        await self.app(scope, receive, send_with_cookie)
+    
+    def _read_session_id(self, scope: Scope) -> Optional[str]:
+        """Session ID from the request's cookie, or None if missing or invalid."""
+        for name, value in scope["headers"]:
+            if name == b"cookie":
+                cookie = cookie_parser(value.decode("latin-1")).get(settings.session_cookie_name)
+                if cookie:
+                    return verify_session_cookie(cookie, self.secret_key)
+        return None
+    
+    def _cookie_header(self, session_id: str) -> str:
+        """Set-Cookie value for a new session."""
+        value = sign_session_id(session_id, self.secret_key) if self.secret_key else session_id
+        cookie: http.cookies.SimpleCookie = http.cookies.SimpleCookie()
+        name = settings.session_cookie_name
+        cookie[name] = value
+        cookie[name]["max-age"] = settings.session_ttl_seconds
+        cookie[name]["path"] = "/"
+        cookie[name]["samesite"] = settings.session_cookie_samesite
+        if settings.session_cookie_secure:
+            cookie[name]["secure"] = True
+        if settings.session_cookie_httponly:
+            cookie[name]["httponly"] = True
+        return cookie.output(header="").strip()
 
 
 def get_session_id(request: Request) -> str:
@@ -52,7 +133,7 @@ def get_session_id(request: Request) -> str:
     
     Args:
         request: FastAPI request object
-        
+    
     Returns:
         Session ID string
     """
@@ -0,0 +1,94 @@
+"""
+Upload size limit middleware.
+Rejects oversized upload bodies while they arrive, before the multipart
+parser has buffered them.
+"""
+from typing import Optional
+from starlette.responses import JSONResponse
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+from app.config import settings
+
+
+# Endpoints accepting a file body
+UPLOAD_PATHS = frozenset({"/api/upload", "/api/upload/stream"})
+
+# Allowance for multipart boundaries and part headers around the file
+MULTIPART_OVERHEAD_BYTES = 16 * 1024
+
+
+class UploadLimitMiddleware:
+    """
+    Pure ASGI middleware enforcing upload_max_size_kb on the request body.
+    
+    A declared Content-Length above the limit is refused without reading
+    the body. Otherwise the body is counted as it streams in; once it
+    crosses the limit the application sees a disconnect, its response is
+    discarded and a 413 is sent instead.
+    """
+    
+    def __init__(self, app: ASGIApp):
+        """
+        Wrap an ASGI application.
+        
+        Args:
+            app: The next ASGI application in the stack
+        """
+        self.app = app
+        self.max_body_bytes = settings.upload_max_size_kb * 1024 + MULTIPART_OVERHEAD_BYTES
+    
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        """Count the body of upload requests and stop at the limit."""
+        if scope["type"] != "http" or scope["method"] != "POST" or scope["path"] not in UPLOAD_PATHS:
+            await self.app(scope, receive, send)
+            return
+        
+        content_length = self._content_length(scope)
+        if content_length is not None and content_length > self.max_body_bytes:
+            await self._reject(scope, receive, send)
+            return
+        
+        received = 0
+        exceeded = False
+        
+        async def limited_receive() -> Message:
+            nonlocal received, exceeded
+            if exceeded:
+                return {"type": "http.disconnect"}
+            message = await receive()
+            if message["type"] == "http.request":
+                received += len(message.get("body", b""))
+                if received > self.max_body_bytes:
+                    exceeded = True
+                    return {"type": "http.disconnect"}
+            return message
+        
+        async def guarded_send(message: Message) -> None:
+            # Whatever the application makes of the cut-off body is replaced by the 413
+            if not exceeded:
+                await send(message)
+        
+        try:
+            await self.app(scope, limited_receive, guarded_send)
+        except Exception:
+            if not exceeded:
+                raise
+        if exceeded:
+            await self._reject(scope, receive, send)
+    
+    def _content_length(self, scope: Scope) -> Optional[int]:
+        """Declared body size, or None for chunked or malformed requests."""
+        for name, value in scope["headers"]:
+            if name == b"content-length":
+                try:
+                    return int(value)
+                except ValueError:
+                    return None
+        return None
+    
+    async def _reject(self, scope: Scope, receive: Receive, send: Send) -> None:
+        """Send the 413 response."""
+        response = JSONResponse(
+            {"detail": f"File too large. Maximum size is {settings.upload_max_size_kb}KB."},
+            status_code=413
+        )
+        await response(scope, receive, send)
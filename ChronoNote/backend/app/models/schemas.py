@@ -29,6 +29,21 @@ class AIResponseEnvelope(BaseModel):
     works: List[AIExtractedWork]
 
 
+class AIBatchDocument(BaseModel):
+    """
+    Works extracted from one tagged document of a batched prompt.
+    """
+    id: int
+    works: List[AIExtractedWork]
+
+
+class AIBatchResponseEnvelope(BaseModel):
+    """
+    The wrapper for a batched AI response, one entry per document.
+    """
+    documents: List[AIBatchDocument]
+
+
 class StoredWorkItem(AIExtractedWork):
     """
     Internal model stored in Redis. Extends AIExtractedWork with a unique ID.
@@ -36,17 +51,63 @@ class StoredWorkItem(AIExtractedWork):
     id: UUID = Field(default_factory=uuid4)
 
 
+class SourceDocument(BaseModel):
+    """
+    A document appended to a session and the works it contributed.
+    """
+    name: str
+    content_hash: str
+    work_ids: List[UUID]
+
+
 class UploadResponse(BaseModel):
     """Response model for the upload endpoint."""
     success: bool
     message: str
     works_count: int
     session_id: str
+    session_works_count: Optional[int] = None  # Works in the whole session, for appended uploads
+
+
+class DocumentSummary(BaseModel):
+    """One source document of a multi-document session."""
+    name: str
+    works_count: int
+
+
+class DocumentListResponse(BaseModel):
+    """Response model for the documents endpoint."""
+    documents: List[DocumentSummary]
+
+
+class DocumentRemovedResponse(BaseModel):
+    """Response model for removing a document from a session."""
+    success: bool
+    message: str
+    works_removed: int
+    session_works_count: int
+
+
+class JobAcceptedResponse(BaseModel):
+    """Response model for an upload queued for background extraction."""
+    job_id: str
+    status: str
+    session_id: str
+
+
+class JobStatusResponse(BaseModel):
+    """Status of a background extraction job."""
+    job_id: str
+    status: str
+    attempts: int
+    works_count: Optional[int] = None
+    error: Optional[str] = None
 
 
 class TimelineResponse(BaseModel):
     """Response model for the timeline endpoint."""
     works: List[StoredWorkItem]
+    next_cursor: Optional[str] = None  # Pass back as ?cursor= to get the next page
 
 
 class ChronoTestWork(BaseModel):
@@ -72,6 +133,25 @@ class ChronoCheckResponse(BaseModel):
     correct: bool
     correct_order: List[UUID]
     message: str
+    score: float = Field(..., description="Partial credit from 0 to 1: share of work pairs in the right order")
+    inversions: int = Field(..., description="Pairs of works in the wrong order (Kendall tau distance)")
+    max_inversions: int = Field(..., description="Pairs of works with different years")
+    longest_in_order: int = Field(..., description="Length of the longest run of works already in order")
+    out_of_place: List[UUID] = Field(..., description="Works outside that run, in submitted order")
+
+
+class ChronoCheckBatchRequest(BaseModel):
+    """Request model for checking several orderings at once."""
+    orderings: List[ChronoCheckRequest]
+
+
+class ChronoCheckBatchResponse(BaseModel):
+    """Response model for a batch chronology check, one result per ordering."""
+    results: List[ChronoCheckResponse]
+    correct_count: int
+    total: int
+    score: float  # Share of correct orderings, 0 to 1
+    partial_score: float  # Mean partial credit of the orderings, 0 to 1
 
 
 class QuizQuestion(BaseModel):
@@ -93,3 +173,26 @@ class QuizAnswerResponse(BaseModel):
     correct: bool
     actual_year: int
     message: str
+
+
+class QuizBatchResponse(BaseModel):
+    """Response model for several quiz questions at once."""
+    questions: List[QuizQuestion]
+
+
+class QuizAnswerBatchRequest(BaseModel):
+    """Request model for grading a round of quiz answers."""
+    answers: List[QuizAnswerRequest]
+
+
+class QuizAnswerResult(QuizAnswerResponse):
+    """Validation of one answer of a round."""
+    work_id: UUID
+
+
+class QuizAnswerBatchResponse(BaseModel):
+    """Response model for a graded quiz round, one result per answer."""
+    results: List[QuizAnswerResult]
+    correct_count: int
+    total: int
+    score: float  # Share of correct answers, 0 to 1
@@ -2,17 +2,46 @@
 Gemini AI Service for extracting historical references from markdown text.
 Uses structured output with JSON validation via Pydantic models.
 """
+import asyncio
 import json
+import time
+from contextlib import asynccontextmanager
 import google.generativeai as genai
-from typing import List
+from pydantic import ValidationError
+from typing import Any, AsyncIterator, Callable, Dict, List, Optional, Tuple
 from app.config import settings
-from app.models.schemas import AIResponseEnvelope, AIExtractedWork
+from app.models.schemas import AIBatchResponseEnvelope, AIResponseEnvelope, AIExtractedWork
+from app.services.metrics import (
+    count_parse_outcome,
+    count_schema_failure,
+    observe_gemini_request,
+    observe_gemini_tokens
+)
+from app.services.micro_batch import BatchSplitError, MicroBatcher
+from app.services.normalization import work_key
+from app.services.prefilter import CHARS_PER_TOKEN, split_paragraphs, year_values
+from app.services.stream_parser import WorksStreamParser
+from app.services.structured_output import (
+    gemini_schema,
+    repair_object,
+    salvage_works,
+    strip_code_fences,
+    validate_work
+)
 
 
 # Configure Gemini AI
 genai.configure(api_key=settings.gemini_api_key)
 
 
+# Model used for extraction; part of the extraction cache key
+MODEL_NAME = "gemini-2.5-flash-lite"
+
+# Bump whenever SYSTEM_PROMPT or response handling changes so cached
+# extractions produced by the old prompt are no longer reused
+PROMPT_VERSION = "2"
+
+
 # System prompt for historical data extraction
 SYSTEM_PROMPT = """You are a precise historical data extraction engine. Your task is to analyze text and extract ONLY historical references with specific years.
 
@@ -36,80 +65,415 @@ SYSTEM_PROMPT = """You are a precise historical data extraction engine. Your tas
 **OUTPUT FORMAT:** Return ONLY the JSON object. No explanations, no markdown formatting, no extra text."""
 
 
+# Appended to SYSTEM_PROMPT when several small documents share one call
+BATCH_INSTRUCTIONS = """**BATCHED INPUT:** The text below contains several independent documents, each wrapped in <document id="N"> and </document> tags. Apply the rules above to each document separately and never move a work from one document to another. Instead of the structure in rule 5, return ONLY:
+   {
+     "documents": [
+       {"id": 1, "works": [{"title": "Example Work", "author_or_source": "Author Name", "year": 1984}]},
+       {"id": 2, "works": []}
+     ]
+   }
+Include exactly one entry for every document id, even when it has no works."""
+
+
+class AIServiceBusyError(Exception):
+    """Raised when every Gemini slot is taken and the caller should retry later."""
+    
+    def __init__(self, retry_after: int):
+        super().__init__("Too many extractions in progress. Please retry shortly.")
+        self.retry_after = retry_after
+
+
+class PartialWorks(list):
+    """Works salvaged from a damaged response, which a clean response may complete."""
+
+
 class AIService:
     """Service for interacting with Gemini AI."""
     
     def __init__(self):
-        """Initialize the AI service with Gemini model."""
+        """Initialize the AI service with Gemini model and concurrency cap."""
+        self._slots = asyncio.Semaphore(settings.gemini_max_concurrent_requests)
+        self._in_flight = 0
+        self._batcher: Optional[MicroBatcher[List[AIExtractedWork]]] = None
+        if settings.gemini_batch_enabled:
+            self._batcher = MicroBatcher(
+                self._extract_single,
+                self._extract_batch,
+                window_seconds=settings.gemini_batch_window_ms / 1000,
+                max_items=settings.gemini_batch_max_documents,
+                max_chars=settings.extraction_chunk_max_chars  # Keeps batched responses under max_output_tokens
+            )
+        generation_config = {
+            "temperature": 0,
+            "top_p": 0.95,
+            "top_k": 40,
+            "max_output_tokens": 8192,
+        }
+        # Per-call override of the response schema for batched prompts
+        self._batch_generation_config: Optional[Dict[str, Any]] = None
+        if settings.gemini_structured_output:
+            generation_config["response_mime_type"] = "application/json"
+            generation_config["response_schema"] = gemini_schema(AIResponseEnvelope)
+            self._batch_generation_config = {"response_schema": gemini_schema(AIBatchResponseEnvelope)}
+        self._outcomes = {"ok": 0, "repaired": 0, "retried": 0, "failed": 0}
         self.model = genai.GenerativeModel(
-            model_name="gemini-2.5-flash-lite",
-            generation_config={
-                "temperature": 0,
-                "top_p": 0.95,
-                "top_k": 40,
-                "max_output_tokens": 8192,
-            }
+            model_name=MODEL_NAME,
+            generation_config=generation_config
         )
     
-    async def extract_historical_works(self, markdown_content: str) -> List[AIExtractedWork]:
+    @property
+    def in_flight(self) -> int:
+        """Number of Gemini calls currently in progress."""
+        return self._in_flight
+    
+    @property
+    def batching_stats(self) -> Optional[Dict[str, int]]:
+        """Micro-batching counters, or None when batching is disabled."""
+        return self._batcher.stats() if self._batcher is not None else None
+    
+    @property
+    def output_stats(self) -> Dict[str, int]:
+        """Extractions by how their output was used: ok, repaired, retried or failed."""
+        return dict(self._outcomes)
+    
+    @property
+    def at_capacity(self) -> bool:
+        """True when a new call would have to wait for a Gemini slot."""
+        return self._slots.locked()
+    
+    @asynccontextmanager
+    async def gemini_slot(self, queue_timeout: Optional[float] = None) -> AsyncIterator[None]:
+        """
+        Hold one of the globally capped Gemini slots.
+        
+        Waits up to queue_timeout seconds for a free slot, then gives up so
+        callers can shed load instead of queueing without bound.
+        
+        Args:
+            queue_timeout: How long to wait; gemini_queue_timeout_seconds
+                if None
+        
+        Raises:
+            AIServiceBusyError: If no slot became free in time
+        """
+        timeout = settings.gemini_queue_timeout_seconds if queue_timeout is None else queue_timeout
+        if self._slots.locked() and timeout <= 0:
+            raise AIServiceBusyError(settings.gemini_retry_after_seconds)
+        try:
+            await asyncio.wait_for(self._slots.acquire(), timeout=timeout or None)
+        except asyncio.TimeoutError:
+            raise AIServiceBusyError(settings.gemini_retry_after_seconds)
+        
+        self._in_flight += 1
+        try:
+            yield
+        finally:
+            self._in_flight -= 1
+            self._slots.release()
+    
+    async def extract_historical_works(
+        self,
+        markdown_content: str,
+        queue_timeout: Optional[float] = None
+    ) -> List[AIExtractedWork]:
         """
         Extract historical works from markdown content using Gemini AI.
         
+        With gemini_batch_enabled, documents of up to
+        gemini_batch_max_document_chars wait briefly for concurrent ones and
+        share a single Gemini call with them. Batches wait for a slot as
+        long as gemini_queue_timeout_seconds, so a call with its own
+        queue_timeout is never batched.
+        
         Args:
             markdown_content: The raw markdown text to analyze
-            
+            queue_timeout: How long to wait for a Gemini slot;
+                gemini_queue_timeout_seconds if None
+        
         Returns:
             List of AIExtractedWork objects
-            
+        
         Raises:
+            AIServiceBusyError: If the Gemini concurrency cap is reached
             ValueError: If AI response is invalid or cannot be parsed
             Exception: If Gemini API fails
         """
+        if (
+            self._batcher is not None and queue_timeout is None
+            and len(markdown_content) <= settings.gemini_batch_max_document_chars
+        ):
+            return await self._batcher.submit(markdown_content)
+        return await self._extract_single(markdown_content, queue_timeout)
+    
+    async def _extract_single(self, markdown_content: str, queue_timeout: Optional[float] = None) -> List[AIExtractedWork]:
+        """Extract one document with its own Gemini call."""
+        async with self.gemini_slot(queue_timeout):
+            return await self._extract(markdown_content)
+    
+    async def _extract(self, markdown_content: str) -> List[AIExtractedWork]:
+        """
+        Run one Gemini extraction; the caller must hold a Gemini slot.
+        
+        A response that is malformed or fails validation is salvaged rather
+        than discarded: valid works are kept, and when the works array was
+        cut off only the text after the last recovered work is extracted
+        again, up to gemini_repair_max_retries times. Salvaged works are
+        returned as PartialWorks.
+        """
         try:
-            # Combine system prompt and user content
-            prompt = f"{SYSTEM_PROMPT}\n\n**TEXT TO ANALYZE:**\n{markdown_content}"
-            
-            # Generate response from Gemini
-            response = self.model.generate_content(prompt)
-            
-            # Extract the JSON response
-            response_text = response.text.strip()
-            
-            # Remove markdown code fences if present (```json ... ```)
-            if response_text.startswith('```'):
-                # Find the end of the opening fence
-                first_newline = response_text.find('\n')
-                if first_newline != -1:
-                    response_text = response_text[first_newline + 1:]
-                
-                # Remove the closing fence
-                if response_text.endswith('```'):
-                    response_text = response_text[:-3].strip()
-            
-            # Parse JSON response
-            try:
-                response_data = json.loads(response_text)
-            except json.JSONDecodeError as e:
-                raise ValueError(f"AI returned invalid JSON: {str(e)}\nResponse: {response_text[:200]}")
-            
+            works, outcome = await self._extract_recovering(
+                markdown_content, settings.gemini_repair_max_retries
+            )
+        except Exception as e:
+            self._count_outcome("failed")
+            # Re-raise with more context
+            raise Exception(f"Gemini AI extraction failed: {str(e)}")
+        self._count_outcome(outcome)
+        return works if outcome == "ok" else PartialWorks(works)
+    
+    async def _extract_recovering(self, markdown_content: str, retries_left: int) -> Tuple[List[AIExtractedWork], str]:
+        """Extract works and report how the output was recovered."""
+        # Combine system prompt and user content
+        prompt = self._build_prompt(markdown_content)
+        response_text = strip_code_fences(await self._generate(prompt, "unary"))
+        
+        works = self._parse_response(response_text)
+        if works is not None:
+            return works, "ok"
+        
+        salvage = salvage_works(response_text)
+        for reason, count in salvage.dropped.items():
+            count_schema_failure(reason, count)
+        if salvage.complete:
+            return salvage.works, "repaired"
+        
+        count_schema_failure("incomplete")
+        if retries_left <= 0:
+            raise ValueError(f"AI response ended before the works array was complete\nResponse: {response_text[:200]}")
+        remainder = self._unextracted_text(markdown_content, salvage.works)
+        retried_works, _ = await self._extract_recovering(remainder, retries_left - 1)
+        return self._merge_works(salvage.works, retried_works), "retried"
+    
+    def _parse_response(self, response_text: str) -> Optional[List[AIExtractedWork]]:
+        """Parse a well-formed response, or return None if it needs salvaging."""
+        try:
+            works = json.loads(response_text)['works']
             # Filter out items with None/null years before validation
-            if 'works' in response_data and isinstance(response_data['works'], list):
-                response_data['works'] = [
-                    work for work in response_data['works'] 
-                    if work.get('year') is not None
-                ]
-            
-            # Validate against Pydantic model
+            kept = [work for work in works if not isinstance(work, dict) or work.get('year') is not None]
+            validated_response = AIResponseEnvelope(works=kept)
+        except (ValueError, TypeError, KeyError, ValidationError):
+            return None
+        count_schema_failure("missing_year", len(works) - len(kept))
+        return validated_response.works
+    
+    def _unextracted_text(self, markdown_content: str, works: List[AIExtractedWork]) -> str:
+        """
+        The part of a document that a cut-off response did not reach.
+        
+        Works come back in document order, so the recovered works are
+        walked through the paragraphs in turn: each advances the position
+        to the next paragraph mentioning its year. Years are matched rather
+        than titles, which the model cleans up and rephrases. The remainder
+        starts at the paragraph of the last recovered work, so a work cut
+        off right after it is extracted again; it is the whole document
+        when no recovered year is found.
+        """
+        paragraphs = split_paragraphs(markdown_content)
+        position = 0
+        for work in works:
+            for index in range(position, len(paragraphs)):
+                if work.year in year_values(paragraphs[index]):
+                    position = index
+                    break
+        return "\n\n".join(paragraphs[position:])
+    
+    def _merge_works(self, first: List[AIExtractedWork], second: List[AIExtractedWork]) -> List[AIExtractedWork]:
+        """Concatenate two extractions, dropping works the second repeats."""
+        seen = {work_key(work) for work in first}
+        return first + [work for work in second if work_key(work) not in seen]
+    
+    def _count_outcome(self, outcome: str) -> None:
+        """Record how one extraction's output was used."""
+        self._outcomes[outcome] += 1
+        count_parse_outcome(outcome)
+    
+    async def _extract_batch(self, documents: List[str]) -> List[List[AIExtractedWork]]:
+        """
+        Extract several small documents with one Gemini call.
+        
+        Returns:
+            One list of works per document, in input order
+        
+        Raises:
+            BatchSplitError: If the response cannot be attributed to each document
+            AIServiceBusyError: If the Gemini concurrency cap is reached
+            Exception: If Gemini API fails
+        """
+        async with self.gemini_slot():
+            prompt = self._build_batch_prompt(documents)
+            try:
+                response_text = strip_code_fences(
+                    await self._generate(prompt, "batch", self._batch_generation_config)
+                )
+            except Exception as e:
+                raise Exception(f"Gemini AI extraction failed: {str(e)}")
+        
+        try:
+            response_data = json.loads(response_text)
+        except json.JSONDecodeError as e:
+            raise BatchSplitError("invalid_json", f"AI returned invalid JSON: {str(e)}")
+        
+        if isinstance(response_data, dict) and isinstance(response_data.get('documents'), list):
+            for document in response_data['documents']:
+                self._drop_missing_years(document)
+        try:
+            envelope = AIBatchResponseEnvelope(**response_data)
+        except Exception as e:
+            raise BatchSplitError("schema_mismatch", f"AI response does not match expected schema: {str(e)}")
+        
+        works_by_id = {document.id: document.works for document in envelope.documents}
+        expected_ids = list(range(1, len(documents) + 1))
+        if sorted(works_by_id) != expected_ids or len(envelope.documents) != len(documents):
+            raise BatchSplitError("document_mismatch", f"AI returned documents {sorted(works_by_id)}, expected {expected_ids}")
+        return [works_by_id[document_id] for document_id in expected_ids]
+    
+    async def stream_historical_works(
+        self,
+        markdown_content: str,
+        on_outcome: Optional[Callable[[str], None]] = None,
+        queue_timeout: Optional[float] = None
+    ) -> AsyncIterator[AIExtractedWork]:
+        """
+        Stream historical works as Gemini generates them.
+        
+        Uses Gemini streaming output and yields each work as soon as its
+        JSON object is complete, instead of waiting for the full response.
+        Damaged output is salvaged as in extract_historical_works: invalid
+        items are skipped, and when the stream is cut off the text after the
+        last work received is extracted again.
+        
+        Args:
+            markdown_content: The raw markdown text to analyze
+            on_outcome: Called once the stream is complete with how its
+                output was used: ok, repaired or retried
+            queue_timeout: How long to wait for a Gemini slot;
+                gemini_queue_timeout_seconds if None
+        
+        Yields:
+            Validated AIExtractedWork objects in response order
+        
+        Raises:
+            AIServiceBusyError: If the Gemini concurrency cap is reached
+            Exception: If Gemini API fails or the response cannot be recovered
+        """
+        async with self.gemini_slot(queue_timeout):
+            parser = WorksStreamParser(repair=repair_object)
+            prompt = self._build_prompt(markdown_content)
+            streamed: List[AIExtractedWork] = []
+            outcome = "ok"
+            output_chars = 0
+            usage = None
+            start = time.perf_counter()
             try:
-                validated_response = AIResponseEnvelope(**response_data)
+                response = await self.model.generate_content_async(prompt, stream=True)
+                async for chunk in response:
+                    text = self._chunk_text(chunk)
+                    output_chars += len(text)
+                    usage = getattr(chunk, "usage_metadata", None) or usage
+                    for work_data in parser.feed(text):
+                        work, reason = validate_work(work_data)
+                        if work is None:
+                            count_schema_failure(reason)
+                            # Works without a year are dropped by design, not salvaged
+                            if reason != "missing_year":
+                                outcome = "repaired"
+                            continue
+                        streamed.append(work)
+                        yield work
             except Exception as e:
-                raise ValueError(f"AI response does not match expected schema: {str(e)}\nResponse: {response_data}")
+                observe_gemini_request("stream", "error", time.perf_counter() - start)
+                self._count_outcome("failed")
+                raise Exception(f"Gemini AI extraction failed: {str(e)}")
+            observe_gemini_request("stream", "success", time.perf_counter() - start)
+            self._observe_tokens(usage, prompt, output_chars)
             
-            return validated_response.works
+            if parser.skipped:
+                count_schema_failure("invalid_json", parser.skipped)
+                outcome = "repaired"
             
-        except Exception as e:
-            # Re-raise with more context
-            raise Exception(f"Gemini AI extraction failed: {str(e)}")
+            if not parser.finished:
+                count_schema_failure("incomplete")
+                retries = settings.gemini_repair_max_retries
+                try:
+                    if retries <= 0:
+                        raise ValueError("AI response ended before the works array was complete")
+                    remainder = self._unextracted_text(markdown_content, streamed)
+                    retried_works, _ = await self._extract_recovering(remainder, retries - 1)
+                except Exception as e:
+                    self._count_outcome("failed")
+                    raise Exception(f"Gemini AI extraction failed: {str(e)}")
+                for work in self._merge_works(streamed, retried_works)[len(streamed):]:
+                    yield work
+                outcome = "retried"
+            
+            self._count_outcome(outcome)
+            if on_outcome is not None:
+                on_outcome(outcome)
+    
+    def _chunk_text(self, chunk: Any) -> str:
+        """Text of a stream chunk; empty for chunks without parts, e.g. one carrying only the finish reason."""
+        try:
+            return chunk.text
+        except ValueError:
+            return ""
+    
+    async def _generate(self, prompt: str, mode: str, generation_config: Optional[Dict[str, Any]] = None) -> str:
+        """Send a prompt to Gemini and return the response text, recording latency and tokens."""
+        # Only pass overrides, so the model's own config applies unchanged otherwise
+        kwargs = {"generation_config": generation_config} if generation_config else {}
+        
+        # Generate response from Gemini without blocking the event loop
+        start = time.perf_counter()
+        try:
+            response = await self.model.generate_content_async(prompt, **kwargs)
+            
+            # Extract the JSON response
+            response_text = response.text.strip()
+        except Exception:
+            observe_gemini_request(mode, "error", time.perf_counter() - start)
+            raise
+        observe_gemini_request(mode, "success", time.perf_counter() - start)
+        self._observe_tokens(getattr(response, "usage_metadata", None), prompt, len(response_text))
+        return response_text
+    
+    def _drop_missing_years(self, response_data: Any) -> None:
+        """Filter out items with None/null years before validation."""
+        if isinstance(response_data, dict) and isinstance(response_data.get('works'), list):
+            works = response_data['works']
+            response_data['works'] = [
+                work for work in works
+                if not isinstance(work, dict) or work.get('year') is not None
+            ]
+            count_schema_failure("missing_year", len(works) - len(response_data['works']))
+    
+    def _observe_tokens(self, usage: Any, prompt: str, output_chars: int) -> None:
+        """Record token counts, estimating them from text length if Gemini did not report them."""
+        prompt_tokens = getattr(usage, "prompt_token_count", None) or len(prompt) // CHARS_PER_TOKEN
+        output_tokens = getattr(usage, "candidates_token_count", None) or output_chars // CHARS_PER_TOKEN
+        observe_gemini_tokens(prompt_tokens, output_tokens)
+    
+    def _build_prompt(self, markdown_content: str) -> str:
+        """Combine the system prompt with the text to analyze."""
+        return f"{SYSTEM_PROMPT}\n\n**TEXT TO ANALYZE:**\n{markdown_content}"
+    
+    def _build_batch_prompt(self, documents: List[str]) -> str:
+        """Combine the system prompt with several documents in numbered tags."""
+        sections = "\n\n".join(
+            f'<document id="{index}">\n{text.replace("</document>", "</ document>")}\n</document>'
+            for index, text in enumerate(documents, start=1)
+        )
+        return f"{SYSTEM_PROMPT}\n\n{BATCH_INSTRUCTIONS}\n\n**TEXT TO ANALYZE:**\n{sections}"
 
 
 # Global AI service instance
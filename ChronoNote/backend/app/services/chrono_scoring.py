@@ -0,0 +1,108 @@
+"""
+Partial-credit scoring of chronology answers.
+Measures how far a proposed order is from the chronological one with the
+Kendall tau distance (pairs in the wrong order) and finds the longest run
+of works that is already in order, both in O(n log n), so tests covering a
+whole timeline stay cheap to grade.
+"""
+import bisect
+from collections import Counter
+from typing import List, Sequence
+from pydantic import BaseModel
+
+
+class ChronologyScore(BaseModel):
+    """How close a proposed order of years is to the chronological one."""
+    correct: bool
+    inversions: int  # Kendall tau distance: pairs placed in the wrong order
+    max_inversions: int  # Pairs with different years, i.e. the worst possible distance
+    score: float  # 1 - inversions / max_inversions; 1.0 for a correct order
+    in_order: List[int]  # Positions of a longest subsequence already in order
+    out_of_place: List[int]  # All other positions, ascending
+
+
+def count_inversions(values: Sequence[int]) -> int:
+    """
+    Count pairs i < j with values[i] > values[j].
+    
+    Bottom-up merge sort: whenever an element of the right run is merged
+    before the rest of the left run, it is inverted with all of them.
+    Equal values are not inversions.
+    """
+    items = list(values)
+    buffer = items[:]
+    size = len(items)
+    inversions = 0
+    width = 1
+    while width < size:
+        for low in range(0, size, 2 * width):
+            middle = min(low + width, size)
+            high = min(low + 2 * width, size)
+            left, right, out = low, middle, low
+            while left < middle and right < high:
+                if items[left] <= items[right]:
+                    buffer[out] = items[left]
+                    left += 1
+                else:
+                    buffer[out] = items[right]
+                    right += 1
+                    inversions += middle - left
+                out += 1
+            buffer[out:out + middle - left] = items[left:middle]
+            out += middle - left
+            buffer[out:high] = items[right:high]
+        items, buffer = buffer, items
+        width *= 2
+    return inversions
+
+
+def longest_ordered_subsequence(values: Sequence[int]) -> List[int]:
+    """
+    Positions of a longest non-decreasing subsequence.
+    
+    Patience sorting: tails[k] is the smallest value ending an ordered
+    subsequence of length k + 1, found by binary search for each value.
+    """
+    tails: List[int] = []
+    tail_positions: List[int] = []
+    previous = [-1] * len(values)
+    for position, value in enumerate(values):
+        length = bisect.bisect_right(tails, value)
+        if length == len(tails):
+            tails.append(value)
+            tail_positions.append(position)
+        else:
+            tails[length] = value
+            tail_positions[length] = position
+        previous[position] = tail_positions[length - 1] if length else -1
+    
+    subsequence = []
+    position = tail_positions[-1] if tail_positions else -1
+    while position != -1:
+        subsequence.append(position)
+        position = previous[position]
+    subsequence.reverse()
+    return subsequence
+
+
+def score_chronology(years: Sequence[int]) -> ChronologyScore:
+    """
+    Score a proposed order, given the years of the works in that order.
+    
+    Works sharing a year may appear in either order.
+    """
+    size = len(years)
+    tied_pairs = sum(count * (count - 1) // 2 for count in Counter(years).values())
+    max_inversions = size * (size - 1) // 2 - tied_pairs
+    inversions = count_inversions(years)
+    
+    in_order = longest_ordered_subsequence(years)
+    kept = set(in_order)
+    return ChronologyScore(
+        correct=inversions == 0,
+        inversions=inversions,
+        max_inversions=max_inversions,
+        score=1.0 - inversions / max_inversions if max_inversions else 1.0,
+        in_order=in_order,
+        out_of_place=[position for position in range(size) if position not in kept]
+    )
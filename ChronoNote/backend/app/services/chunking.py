@@ -0,0 +1,354 @@
+"""
+Chunked extraction for large markdown documents.
+Splits documents on heading and paragraph boundaries, extracts the chunks
+concurrently and merges the de-duplicated results.
+"""
+import asyncio
+import re
+from functools import partial
+from typing import AsyncIterator, Dict, List, Optional, Tuple
+from app.config import settings
+from app.models.schemas import AIExtractedWork
+from app.services.ai_service import AIServiceBusyError, PartialWorks, ai_service
+from app.services.extraction_cache import extraction_cache
+from app.services.knowledge_index import knowledge_index
+from app.services.normalization import work_key
+
+
+HEADING_PATTERN = re.compile(r"^#{1,6}\s")
+
+
+def split_blocks(markdown_content: str) -> List[str]:
+    """
+    Split markdown into blocks at headings and blank lines.
+    
+    A heading always starts a new block and stays attached to the
+    paragraph that follows it.
+    """
+    blocks: List[str] = []
+    current: List[str] = []
+    
+    for line in markdown_content.replace("\r\n", "\n").split("\n"):
+        if HEADING_PATTERN.match(line) or not line.strip():
+            if current and not (len(current) == 1 and HEADING_PATTERN.match(current[0])):
+                blocks.append("\n".join(current))
+                current = []
+            if not line.strip():
+                continue
+        current.append(line)
+    
+    if current:
+        blocks.append("\n".join(current))
+    return blocks
+
+
+def _split_oversized(block: str, max_chars: int) -> List[str]:
+    """Break a single block longer than max_chars on line, then character, boundaries."""
+    pieces: List[str] = []
+    current = ""
+    for line in block.split("\n"):
+        while len(line) > max_chars:
+            if current:
+                pieces.append(current)
+                current = ""
+            pieces.append(line[:max_chars])
+            line = line[max_chars:]
+        candidate = f"{current}\n{line}" if current else line
+        if len(candidate) > max_chars:
+            pieces.append(current)
+            current = line
+        else:
+            current = candidate
+    if current:
+        pieces.append(current)
+    return pieces
+
+
+def split_markdown(
+    markdown_content: str,
+    max_chars: int,
+    overlap_chars: int = 0
+) -> List[str]:
+    """
+    Pack markdown blocks into chunks of at most roughly max_chars.
+    
+    Each chunk after the first is prefixed with trailing blocks of the
+    previous chunk (up to overlap_chars) so references spanning a
+    boundary keep their context.
+    
+    Args:
+        markdown_content: The raw markdown text
+        max_chars: Target upper bound for the new content of each chunk
+        overlap_chars: How much trailing context to repeat in the next chunk
+    
+    Returns:
+        List of chunk strings; a short document yields a single chunk
+    """
+    if len(markdown_content) <= max_chars:
+        return [markdown_content]
+    
+    blocks: List[str] = []
+    for block in split_blocks(markdown_content):
+        if len(block) > max_chars:
+            blocks.extend(_split_oversized(block, max_chars))
+        else:
+            blocks.append(block)
+    
+    groups: List[List[str]] = []
+    current: List[str] = []
+    size = 0
+    for block in blocks:
+        if current and size + len(block) + 2 > max_chars:
+            groups.append(current)
+            current, size = [], 0
+        current.append(block)
+        size += len(block) + 2
+    if current:
+        groups.append(current)
+    
+    chunks: List[str] = []
+    previous: List[str] = []
+    for group in groups:
+        overlap: List[str] = []
+        overlap_size = 0
+        for block in reversed(previous):
+            if overlap_size + len(block) > overlap_chars:
+                break
+            overlap.insert(0, block)
+            overlap_size += len(block) + 2
+        chunks.append("\n\n".join(overlap + group))
+        previous = group
+    return chunks
+
+
+def merge_works(results: List[List[AIExtractedWork]]) -> List[AIExtractedWork]:
+    """
+    Merge per-chunk results, dropping duplicates from overlapping chunks.
+    
+    Works are identical when their normalized titles and years match;
+    the first occurrence wins, but a missing author is filled in from a
+    later duplicate.
+    """
+    merged: Dict[Tuple[str, int], AIExtractedWork] = {}
+    for works in results:
+        for work in works:
+            key = work_key(work)
+            existing = merged.get(key)
+            if existing is None:
+                merged[key] = work
+            elif existing.author_or_source is None and work.author_or_source:
+                merged[key] = existing.model_copy(update={"author_or_source": work.author_or_source})
+    return list(merged.values())
+
+
+class _UploadAdmission:
+    """
+    Decides how long each chunk of one upload waits for a Gemini slot.
+    
+    The upload is admitted or turned away once, by its first request for a
+    slot, which uses the caller's queue timeout and so fails fast by
+    default. Later chunks wait up to extraction_chunk_queue_timeout_seconds
+    instead: a 429 at that point would throw away chunks already paid for.
+    Once any chunk is refused a slot, the chunks that have not asked for
+    one yet are refused too.
+    """
+    
+    def __init__(self, queue_timeout: Optional[float] = None):
+        self.queue_timeout = queue_timeout
+        self.admitted = False
+        self.refusal: Optional[AIServiceBusyError] = None
+    
+    def next_timeout(self) -> Optional[float]:
+        """
+        Queue timeout for the next chunk that needs Gemini.
+        
+        Raises:
+            AIServiceBusyError: If the upload has already been refused a slot
+        """
+        if self.refusal is not None:
+            raise self.refusal
+        if self.queue_timeout is not None or not self.admitted:
+            self.admitted = True
+            return self.queue_timeout
+        return max(settings.gemini_queue_timeout_seconds, settings.extraction_chunk_queue_timeout_seconds)
+    
+    def refuse(self, error: AIServiceBusyError) -> None:
+        """Refuse the upload's remaining chunks after one was refused a slot."""
+        self.refusal = error
+
+
+class ChunkedExtractor:
+    """Extracts large documents chunk by chunk under a per-upload concurrency limit."""
+    
+    async def extract(self, markdown_content: str, queue_timeout: Optional[float] = None) -> List[AIExtractedWork]:
+        """
+        Extract historical works from a document of any supported size.
+        
+        References already resolved by the knowledge index are not sent to
+        Gemini, and each remaining chunk goes through the extraction cache,
+        so unchanged sections of a re-uploaded document are not sent again.
+        
+        Only the upload's first request for a Gemini slot can fail fast;
+        later chunks wait for one (see _UploadAdmission). If a chunk still
+        finds no slot, no further chunks are sent, but those already running
+        are finished and cached before the busy error is raised, so a retry
+        of the upload does not pay for them again.
+        
+        Args:
+            markdown_content: The raw markdown text to analyze
+            queue_timeout: How long every chunk waits for a Gemini slot;
+                if None, gemini_queue_timeout_seconds for the first and
+                extraction_chunk_queue_timeout_seconds for the rest
+        
+        Returns:
+            De-duplicated list of AIExtractedWork objects in document order
+        
+        Raises:
+            AIServiceBusyError: If the Gemini concurrency cap is reached
+            Exception: If extraction of any chunk fails
+        """
+        resolution = await knowledge_index.resolve(markdown_content)
+        markdown_content = resolution.unresolved_text
+        
+        # Nothing left for Gemini, e.g. everything was pre-filtered or resolved
+        if not markdown_content.strip():
+            return resolution.known_works
+        
+        chunks = split_markdown(
+            markdown_content,
+            settings.extraction_chunk_max_chars,
+            settings.extraction_chunk_overlap_chars
+        )
+        admission = _UploadAdmission(queue_timeout)
+        if len(chunks) == 1:
+            return merge_works([resolution.known_works, await self._extract_chunk(chunks[0], admission)])
+        
+        limiter = asyncio.Semaphore(settings.extraction_chunk_concurrency)
+        
+        async def run(chunk: str) -> List[AIExtractedWork]:
+            async with limiter:
+                return await self._extract_chunk(chunk, admission)
+        
+        tasks = [asyncio.ensure_future(run(chunk)) for chunk in chunks]
+        try:
+            results = await asyncio.gather(*tasks)
+        except AIServiceBusyError:
+            # Let chunks already paid for reach the extraction cache for the retry
+            await asyncio.gather(*tasks, return_exceptions=True)
+            raise
+        except BaseException:
+            # One failed chunk fails the upload; stop paying for the rest
+            for task in tasks:
+                task.cancel()
+            raise
+        return merge_works([resolution.known_works, *results])
+    
+    async def stream(self, markdown_content: str) -> AsyncIterator[AIExtractedWork]:
+        """
+        Stream de-duplicated works from all chunks as soon as each is found.
+        
+        Works resolved by the knowledge index are yielded first. Chunks run
+        concurrently under the same per-upload limit and slot timeouts as
+        extract(); cached chunks are replayed immediately and streamed
+        chunks are cached once their response is complete.
+        
+        Args:
+            markdown_content: The raw markdown text to analyze
+        
+        Yields:
+            AIExtractedWork objects in arrival order
+        
+        Raises:
+            AIServiceBusyError: If the Gemini concurrency cap is reached
+            Exception: If extraction of any chunk fails
+        """
+        resolution = await knowledge_index.resolve(markdown_content)
+        seen = set()
+        for work in resolution.known_works:
+            seen.add(work_key(work))
+            yield work
+        
+        markdown_content = resolution.unresolved_text
+        if not markdown_content.strip():
+            return
+        
+        chunks = split_markdown(
+            markdown_content,
+            settings.extraction_chunk_max_chars,
+            settings.extraction_chunk_overlap_chars
+        )
+        limiter = asyncio.Semaphore(settings.extraction_chunk_concurrency)
+        admission = _UploadAdmission()
+        queue: asyncio.Queue = asyncio.Queue()
+        done = object()
+        
+        async def run(chunk: str) -> None:
+            async with limiter:
+                cached = await extraction_cache.get(chunk)
+                if cached is not None:
+                    for work in cached:
+                        queue.put_nowait(work)
+                    return
+                
+                works: List[AIExtractedWork] = []
+                outcomes: List[str] = []
+                try:
+                    async for work in ai_service.stream_historical_works(
+                        chunk, outcomes.append, admission.next_timeout()
+                    ):
+                        works.append(work)
+                        queue.put_nowait(work)
+                except AIServiceBusyError as e:
+                    admission.refuse(e)
+                    raise
+                if outcomes != ["ok"]:
+                    works = PartialWorks(works)
+                await extraction_cache.put(chunk, works)
+                await knowledge_index.record(works)
+        
+        tasks = [asyncio.ensure_future(run(chunk)) for chunk in chunks]
+        
+        async def run_all() -> None:
+            try:
+                await asyncio.gather(*tasks)
+            except AIServiceBusyError:
+                # Let chunks already paid for reach the extraction cache for the retry
+                await asyncio.gather(*tasks, return_exceptions=True)
+                raise
+            finally:
+                queue.put_nowait(done)
+        
+        runner = asyncio.ensure_future(run_all())
+        try:
+            while True:
+                work = await queue.get()
+                if work is done:
+                    break
+                key = work_key(work)
+                if key not in seen:
+                    seen.add(key)
+                    yield work
+            # Surface the first chunk failure, if any
+            await runner
+        finally:
+            for task in tasks:
+                task.cancel()
+            runner.cancel()
+    
+    async def _extract_chunk(self, chunk: str, admission: _UploadAdmission) -> List[AIExtractedWork]:
+        """Extract a single chunk through the content-addressed cache."""
+        return await extraction_cache.get_or_extract(chunk, partial(self._extract_and_record, admission=admission))
+    
+    async def _extract_and_record(self, chunk: str, admission: _UploadAdmission) -> List[AIExtractedWork]:
+        """Call Gemini and feed the fresh results into the knowledge index."""
+        try:
+            works = await ai_service.extract_historical_works(chunk, admission.next_timeout())
+        except AIServiceBusyError as e:
+            admission.refuse(e)
+            raise
+        await knowledge_index.record(works)
+        return works
+
+
+# Global chunked extractor instance
+chunked_extractor = ChunkedExtractor()
@@ -0,0 +1,75 @@
+"""
+Per-worker cache of decoded session data.
+Lets hot read endpoints skip JSON decoding and Pydantic model construction
+for sessions whose stored version stamp has not changed.
+"""
+from collections import OrderedDict
+from typing import Dict, List, Optional, Tuple
+from app.models.schemas import StoredWorkItem
+
+
+class DecodedSessionCache:
+    """
+    LRU cache of decoded StoredWorkItem lists keyed by session ID.
+    
+    Each entry remembers the version stamp it was decoded from; a lookup
+    only hits when the caller's current stamp matches. Memory is bounded
+    by the total number of cached works, so a few huge timelines evict
+    many small ones rather than growing without limit.
+    """
+    
+    def __init__(self, max_works: int):
+        """
+        Initialize an empty cache.
+        
+        Args:
+            max_works: Upper bound on cached works across all sessions;
+                0 disables the cache
+        """
+        self.max_works = max_works
+        self._entries: "OrderedDict[str, Tuple[str, List[StoredWorkItem]]]" = OrderedDict()
+        self._size = 0
+        self.hits = 0
+        self.misses = 0
+    
+    def stats(self) -> Dict[str, int]:
+        """Snapshot of the cache counters for this worker."""
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "sessions": len(self._entries),
+            "works": self._size,
+        }
+    
+    def get(self, session_id: str, version: str) -> Optional[List[StoredWorkItem]]:
+        """
+        Return the decoded works if they were decoded from this version.
+        
+        Returns:
+            A new list of the cached works, or None on a miss
+        """
+        entry = self._entries.get(session_id)
+        if entry is None or entry[0] != version:
+            self.misses += 1
+            return None
+        self._entries.move_to_end(session_id)
+        self.hits += 1
+        return list(entry[1])
+    
+    def put(self, session_id: str, version: str, works: List[StoredWorkItem]) -> None:
+        """Cache decoded works for a version, evicting least recently used sessions."""
+        if len(works) > self.max_works:
+            self.evict(session_id)
+            return
+        self.evict(session_id)
+        self._entries[session_id] = (version, list(works))
+        self._size += len(works)
+        while self._size > self.max_works:
+            _, (_, evicted) = self._entries.popitem(last=False)
+            self._size -= len(evicted)
+    
+    def evict(self, session_id: str) -> None:
+        """Drop a session's entry, if any."""
+        entry = self._entries.pop(session_id, None)
+        if entry is not None:
+            self._size -= len(entry[1])
@@ -0,0 +1,205 @@
+"""
+Content-addressed cache for AI extractions.
+Reuses validated Gemini results for identical uploads and coalesces
+concurrent extractions of the same content into a single call.
+"""
+import asyncio
+import hashlib
+import time
+from typing import Awaitable, Callable, Dict, List, Optional
+import redis.asyncio as redis
+from pydantic import ValidationError
+from app.config import settings
+from app.models.schemas import AIResponseEnvelope, AIExtractedWork
+from app.services.ai_service import MODEL_NAME, PROMPT_VERSION, PartialWorks
+from app.services.redis_service import redis_service
+
+
+Extractor = Callable[[str], Awaitable[List[AIExtractedWork]]]
+
+# Sorted set of cached keys scored by insertion time, used for eviction
+INDEX_KEY = "extraction:index"
+
+
+def normalize_markdown(markdown_content: str) -> str:
+    """
+    Normalize markdown so cosmetic differences share a cache entry.
+    
+    Unifies line endings, strips trailing whitespace on every line and
+    trims leading/trailing blank lines.
+    """
+    text = markdown_content.replace("\r\n", "\n").replace("\r", "\n")
+    lines = [line.rstrip() for line in text.split("\n")]
+    return "\n".join(lines).strip()
+
+
+def cache_key(markdown_content: str) -> str:
+    """Build the cache key from the normalized content, model and prompt version."""
+    digest = hashlib.sha256()
+    digest.update(MODEL_NAME.encode("utf-8"))
+    digest.update(b"\0")
+    digest.update(PROMPT_VERSION.encode("utf-8"))
+    digest.update(b"\0")
+    digest.update(normalize_markdown(markdown_content).encode("utf-8"))
+    return f"extraction:{digest.hexdigest()}"
+
+
+class ExtractionCache:
+    """Redis-backed extraction cache with per-worker single-flight coalescing."""
+    
+    def __init__(self):
+        """Initialize counters and the table of in-flight extractions."""
+        self._in_flight: Dict[str, asyncio.Task] = {}
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+    
+    def stats(self) -> Dict[str, int]:
+        """
+        Snapshot of the cache counters for this worker.
+        
+        Returns:
+            Dictionary with hit, miss, coalesce and in-flight counts
+        """
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "coalesced": self.coalesced,
+            "in_flight": len(self._in_flight),
+        }
+    
+    async def get(self, markdown_content: str) -> Optional[List[AIExtractedWork]]:
+        """
+        Look up cached works for this content without extracting.
+        
+        Returns:
+            Cached list of AIExtractedWork objects, or None on a miss
+        """
+        if not settings.extraction_cache_enabled:
+            return None
+        
+        cached = await self._load(cache_key(markdown_content))
+        if cached is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return cached
+    
+    async def put(self, markdown_content: str, works: List[AIExtractedWork]) -> None:
+        """
+        Cache works extracted outside get_or_extract, e.g. from a stream.
+        
+        Pass PartialWorks for works salvaged from a damaged response, so
+        they are kept only for extraction_cache_partial_ttl_seconds.
+        """
+        if settings.extraction_cache_enabled:
+            await self._store(cache_key(markdown_content), works)
+    
+    async def get_or_extract(
+        self,
+        markdown_content: str,
+        extract: Extractor
+    ) -> List[AIExtractedWork]:
+        """
+        Return cached works for this content, or extract and cache them.
+        
+        Args:
+            markdown_content: The raw markdown text to analyze
+            extract: Coroutine function performing the actual extraction
+        
+        Returns:
+            List of AIExtractedWork objects
+        
+        Raises:
+            Whatever `extract` raises; failures are never cached, and
+            PartialWorks only briefly
+        """
+        if not settings.extraction_cache_enabled:
+            return await extract(markdown_content)
+        
+        key = cache_key(markdown_content)
+        
+        # Join an extraction of the same content already running in this worker
+        task = self._in_flight.get(key)
+        if task is not None:
+            self.coalesced += 1
+            return await asyncio.shield(task)
+        
+        cached = await self._load(key)
+        if cached is not None:
+            self.hits += 1
+            return cached
+        
+        # Re-check: another request may have started while we hit Redis
+        task = self._in_flight.get(key)
+        if task is not None:
+            self.coalesced += 1
+            return await asyncio.shield(task)
+        
+        self.misses += 1
+        task = asyncio.ensure_future(self._extract_and_store(key, markdown_content, extract))
+        self._in_flight[key] = task
+        task.add_done_callback(lambda _: self._in_flight.pop(key, None))
+        return await asyncio.shield(task)
+    
+    async def _extract_and_store(
+        self,
+        key: str,
+        markdown_content: str,
+        extract: Extractor
+    ) -> List[AIExtractedWork]:
+        """Run the extraction and write the validated envelope to Redis."""
+        works = await extract(markdown_content)
+        await self._store(key, works)
+        return works
+    
+    async def _load(self, key: str) -> Optional[List[AIExtractedWork]]:
+        """Read a cached envelope; unreadable entries count as misses."""
+        try:
+            payload = await redis_service.redis_client.get(key)
+        except redis.RedisError:
+            return None
+        
+        if payload is None:
+            return None
+        
+        try:
+            return AIResponseEnvelope.model_validate_json(payload).works
+        except ValidationError:
+            return None
+    
+    async def _store(self, key: str, works: List[AIExtractedWork]) -> None:
+        """
+        Write works with their TTL and evict the oldest entries over the bound.
+        
+        Salvaged results expire after extraction_cache_partial_ttl_seconds,
+        so a later upload of the same content gets a fresh extraction.
+        """
+        ttl = settings.extraction_cache_ttl_seconds
+        if isinstance(works, PartialWorks):
+            ttl = settings.extraction_cache_partial_ttl_seconds
+            if ttl <= 0:
+                return
+        
+        now = time.time()
+        try:
+            async with redis_service.redis_client.pipeline(transaction=False) as pipe:
+                pipe.setex(key, ttl, AIResponseEnvelope(works=works).model_dump_json())
+                pipe.zadd(INDEX_KEY, {key: now})
+                # Forget index entries whose cache keys have already expired
+                pipe.zremrangebyscore(INDEX_KEY, "-inf", now - settings.extraction_cache_ttl_seconds)
+                pipe.zcard(INDEX_KEY)
+                results = await pipe.execute()
+            
+            overflow = results[-1] - settings.extraction_cache_max_entries
+            if overflow > 0:
+                evicted = await redis_service.redis_client.zpopmin(INDEX_KEY, overflow)
+                if evicted:
+                    await redis_service.redis_client.delete(*(member for member, _ in evicted))
+        except redis.RedisError:
+            # The cache is an optimization; a failed write must not fail the upload
+            pass
+
+
+# Global extraction cache instance
+extraction_cache = ExtractionCache()
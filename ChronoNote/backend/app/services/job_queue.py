@@ -0,0 +1,281 @@
+"""
+Redis Stream job queue for asynchronous extraction.
+The API enqueues decoded markdown and returns a job ID; standalone workers
+(app.worker) consume the stream, retry failures and dead-letter poison jobs.
+"""
+import time
+import uuid
+from typing import Any, AsyncIterator, Dict, List, Optional, Tuple
+import redis.asyncio as redis
+from app.config import settings
+from app.models.schemas import JobStatusResponse
+from app.services.redis_service import redis_service
+
+
+STREAM_KEY = "extraction:jobs"
+DEAD_LETTER_KEY = "extraction:jobs:dead"
+CONSUMER_GROUP = "extraction-workers"
+
+# Job states; the last two are terminal
+QUEUED = "queued"
+RUNNING = "running"
+RETRYING = "retrying"
+DONE = "done"
+FAILED = "failed"
+TERMINAL_STATES = (DONE, FAILED)
+
+
+def job_key(job_id: str) -> str:
+    """Redis hash holding the status of one job."""
+    return f"job:{job_id}"
+
+
+def job_channel(job_id: str) -> str:
+    """Pub/sub channel that receives every status change of one job."""
+    return f"job:{job_id}:events"
+
+
+class JobQueue:
+    """Producer and consumer operations on the extraction job stream."""
+    
+    def __init__(self):
+        """
+        Initialize the connection pool for status subscriptions.
+        
+        A subscription holds its connection for as long as the client
+        listens, so subscribers get a pool of their own and can never
+        exhaust the shared one that session reads depend on.
+        """
+        self.subscriber_pool = redis.BlockingConnectionPool(
+            host=settings.redis_host,
+            port=settings.redis_port,
+            db=settings.redis_db,
+            password=settings.redis_password if settings.redis_password else None,
+            decode_responses=True,
+            max_connections=settings.job_events_max_connections,
+            timeout=settings.redis_pool_timeout_seconds,
+            socket_connect_timeout=5
+        )
+        self.subscriber_client = redis.Redis(connection_pool=self.subscriber_pool)
+    
+    async def close(self) -> None:
+        """Close every pooled subscriber connection."""
+        await self.subscriber_client.aclose()
+        await self.subscriber_pool.disconnect()
+    
+    async def enqueue(self, session_id: str, markdown_content: str) -> str:
+        """
+        Queue a document for extraction into the given session.
+        
+        Args:
+            session_id: Session whose timeline receives the results
+            markdown_content: Decoded (and pre-filtered) markdown text
+        
+        Returns:
+            The new job ID
+        
+        Raises:
+            redis.RedisError: If the job cannot be queued
+        """
+        job_id = str(uuid.uuid4())
+        async with redis_service.redis_client.pipeline(transaction=True) as pipe:
+            pipe.hset(job_key(job_id), mapping={
+                "status": QUEUED,
+                "session_id": session_id,
+                "attempts": 0,
+                "created_at": time.time(),
+            })
+            pipe.expire(job_key(job_id), settings.job_ttl_seconds)
+            pipe.xadd(
+                STREAM_KEY,
+                {"job_id": job_id, "session_id": session_id, "markdown": markdown_content},
+                maxlen=settings.job_stream_max_len,
+                approximate=True
+            )
+            await pipe.execute()
+        return job_id
+    
+    async def get_status(
+        self,
+        job_id: str,
+        session_id: Optional[str] = None
+    ) -> Optional[JobStatusResponse]:
+        """
+        Read the current status of a job.
+        
+        Args:
+            job_id: Job identifier
+            session_id: If given, only return jobs owned by this session
+        
+        Returns:
+            JobStatusResponse, or None if the job is unknown, expired or
+            owned by another session
+        """
+        data = await redis_service.redis_client.hgetall(job_key(job_id))
+        if not data:
+            return None
+        if session_id is not None and data.get("session_id") != session_id:
+            return None
+        return self._to_response(job_id, data)
+    
+    async def set_status(self, job_id: str, status: str, **fields: Any) -> None:
+        """Update a job's status and notify subscribers."""
+        mapping = {"status": status, "updated_at": time.time(), **fields}
+        async with redis_service.redis_client.pipeline(transaction=True) as pipe:
+            pipe.hset(job_key(job_id), mapping=mapping)
+            pipe.expire(job_key(job_id), settings.job_ttl_seconds)
+            pipe.hgetall(job_key(job_id))
+            results = await pipe.execute()
+        event = self._to_response(job_id, results[-1])
+        await redis_service.redis_client.publish(job_channel(job_id), event.model_dump_json())
+    
+    async def subscribe(self, job_id: str, session_id: str) -> AsyncIterator[JobStatusResponse]:
+        """
+        Yield the job's current status, then every change until it finishes.
+        
+        Subscribes before reading the current status so no transition is
+        missed. When no change arrives for job_events_heartbeat_seconds,
+        the current status is read and yielded again; this keeps the
+        stream alive and lets a disconnected client's subscription be
+        noticed and released. Subscriptions end after
+        job_events_timeout_seconds, or when the job expires.
+        """
+        deadline = time.monotonic() + settings.job_events_timeout_seconds
+        pubsub = self.subscriber_client.pubsub()
+        await pubsub.subscribe(job_channel(job_id))
+        try:
+            current = await self.get_status(job_id, session_id)
+            while current is not None:
+                yield current
+                if current.status in TERMINAL_STATES:
+                    return
+                
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    return
+                message = await self._next_message(
+                    pubsub, min(remaining, settings.job_events_heartbeat_seconds)
+                )
+                if message is None:
+                    current = await self.get_status(job_id, session_id)
+                else:
+                    current = JobStatusResponse.model_validate_json(message["data"])
+        finally:
+            await pubsub.unsubscribe(job_channel(job_id))
+            await pubsub.aclose()
+    
+    async def _next_message(self, pubsub: redis.client.PubSub, timeout: float) -> Optional[Dict[str, Any]]:
+        """Wait up to timeout seconds for the next published message."""
+        deadline = time.monotonic() + timeout
+        while True:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return None
+            message = await pubsub.get_message(ignore_subscribe_messages=True, timeout=remaining)
+            if message is not None and message["type"] == "message":
+                return message
+    
+    async def ensure_group(self) -> None:
+        """Create the consumer group (and stream) if it does not exist yet."""
+        try:
+            await redis_service.redis_client.xgroup_create(
+                STREAM_KEY, CONSUMER_GROUP, id="0", mkstream=True
+            )
+        except redis.ResponseError as e:
+            if "BUSYGROUP" not in str(e):
+                raise
+    
+    async def read(self, consumer: str, block_ms: int) -> List[Tuple[str, Dict[str, str]]]:
+        """
+        Claim the next job for this consumer.
+        
+        Jobs left pending by a crashed worker for longer than
+        job_claim_idle_seconds are reclaimed before new ones are read.
+        
+        Returns:
+            List of (message ID, fields) pairs, empty if nothing arrived
+        """
+        _, claimed, *_ = await redis_service.redis_client.xautoclaim(
+            STREAM_KEY,
+            CONSUMER_GROUP,
+            consumer,
+            min_idle_time=settings.job_claim_idle_seconds * 1000,
+            count=1
+        )
+        # Entries trimmed from the stream while pending come back without fields
+        claimed = [(message_id, fields) for message_id, fields in claimed if fields]
+        if claimed:
+            return claimed
+        
+        response = await redis_service.redis_client.xreadgroup(
+            CONSUMER_GROUP, consumer, {STREAM_KEY: ">"}, count=1, block=block_ms
+        )
+        if not response:
+            return []
+        return response[0][1]
+    
+    async def ack(self, message_id: str) -> None:
+        """Acknowledge and drop a processed message."""
+        async with redis_service.redis_client.pipeline(transaction=True) as pipe:
+            pipe.xack(STREAM_KEY, CONSUMER_GROUP, message_id)
+            pipe.xdel(STREAM_KEY, message_id)
+            await pipe.execute()
+    
+    async def requeue(self, message_id: str, fields: Dict[str, str], reason: str) -> None:
+        """
+        Put a job back at the end of the stream without using up an attempt,
+        or dead-letter it once it has been requeued job_max_busy_requeues
+        times.
+        """
+        job_id = fields["job_id"]
+        requeues = await redis_service.redis_client.hincrby(job_key(job_id), "busy_requeues", 1)
+        
+        if requeues <= settings.job_max_busy_requeues:
+            await redis_service.redis_client.xadd(
+                STREAM_KEY, fields, maxlen=settings.job_stream_max_len, approximate=True
+            )
+            await self.set_status(job_id, RETRYING, error=reason)
+        else:
+            await self._dead_letter(fields, f"Gave up after {requeues - 1} requeues: {reason}")
+        await self.ack(message_id)
+    
+    async def fail(self, message_id: str, fields: Dict[str, str], error: str) -> None:
+        """
+        Handle a failed attempt: requeue it, or dead-letter it after
+        job_max_attempts attempts.
+        """
+        job_id = fields["job_id"]
+        attempts = await redis_service.redis_client.hincrby(job_key(job_id), "attempts", 1)
+        
+        if attempts < settings.job_max_attempts:
+            await redis_service.redis_client.xadd(
+                STREAM_KEY, fields, maxlen=settings.job_stream_max_len, approximate=True
+            )
+            await self.set_status(job_id, RETRYING, error=error)
+        else:
+            await self._dead_letter(fields, error)
+        await self.ack(message_id)
+    
+    async def _dead_letter(self, fields: Dict[str, str], error: str) -> None:
+        """Move a job to the dead-letter stream and mark it failed."""
+        await redis_service.redis_client.xadd(
+            DEAD_LETTER_KEY,
+            {"job_id": fields["job_id"], "session_id": fields["session_id"], "error": error},
+            maxlen=settings.job_stream_max_len,
+            approximate=True
+        )
+        await self.set_status(fields["job_id"], FAILED, error=error)
+    
+    def _to_response(self, job_id: str, data: Dict[str, str]) -> JobStatusResponse:
+        """Convert a raw job hash into the API model."""
+        return JobStatusResponse(
+            job_id=job_id,
+            status=data.get("status", QUEUED),
+            attempts=int(data.get("attempts", 0)),
+            works_count=int(data["works_count"]) if "works_count" in data else None,
+            error=data.get("error") or None
+        )
+
+
+# Global job queue instance
+job_queue = JobQueue()
@@ -0,0 +1,282 @@
+"""
+Cross-session knowledge index of canonical works.
+Learns normalized (title, author_or_source) -> year from validated Gemini
+extractions and resolves well-known references without calling the LLM.
+"""
+import json
+import time
+from typing import Dict, List, Optional, Set, Tuple
+import redis.asyncio as redis
+from pydantic import BaseModel
+from app.config import settings
+from app.models.schemas import AIExtractedWork
+from app.services.normalization import normalize_text
+from app.services.prefilter import split_paragraphs, year_values
+from app.services.redis_service import redis_service
+
+
+# Sorted set of normalized titles scored by when they were last observed,
+# trimmed to knowledge_max_titles (the former "knowledge:titles" set is not read)
+TITLES_KEY = "knowledge:titles:seen"
+
+# Words that may remain in a paragraph besides the titles, authors and years
+# of its known works for the paragraph still to count as fully resolved
+FILLER_WORDS = frozenset(
+    "a an and as at by c ca circa first from in is it s of on or published "
+    "released the to was were written wrote year ad bc bce ce".split()
+)
+
+
+def title_key(normalized_title: str) -> str:
+    """Redis hash holding the year counters of one normalized title."""
+    return f"knowledge:title:{normalized_title}"
+
+
+class Resolution(BaseModel):
+    """Outcome of resolving a document against the knowledge index."""
+    known_works: List[AIExtractedWork]
+    unresolved_text: str
+    paragraphs_resolved: int
+    paragraphs_unresolved: int
+
+
+class KnowledgeIndex:
+    """
+    Redis-backed index of observed (title, author) -> year counts.
+    
+    Each normalized title has a hash whose fields are "{author}\\t{year}"
+    counters plus "name:{author}" display names. A cached year is trusted
+    once it has knowledge_min_confirmations observations and accounts for
+    at least knowledge_min_agreement of all observations of that work.
+    """
+    
+    def __init__(self):
+        """Initialize the resolution counters."""
+        self.resolved = 0
+        self.unresolved = 0
+    
+    async def record(self, works: List[AIExtractedWork]) -> None:
+        """
+        Count one observation of each work extracted by Gemini.
+        
+        Only fresh model output should be recorded; replaying cached or
+        resolved works would inflate the confidence counters.
+        """
+        if not settings.knowledge_enabled or not works:
+            return
+        
+        now = time.time()
+        try:
+            async with redis_service.redis_client.pipeline(transaction=False) as pipe:
+                for work in works:
+                    title = normalize_text(work.title)
+                    if not title:
+                        continue
+                    author = normalize_text(work.author_or_source)
+                    key = title_key(title)
+                    pipe.hincrby(key, f"{author}\t{work.year}", 1)
+                    pipe.hsetnx(key, f"name:{author}", json.dumps([work.title, work.author_or_source]))
+                    pipe.expire(key, settings.knowledge_ttl_seconds)
+                    pipe.zadd(TITLES_KEY, {title: now})
+                # Forget titles not seen within the TTL, then keep only the most recent ones
+                pipe.zremrangebyscore(TITLES_KEY, "-inf", now - settings.knowledge_ttl_seconds)
+                pipe.zremrangebyrank(TITLES_KEY, 0, -settings.knowledge_max_titles - 1)
+                pipe.expire(TITLES_KEY, settings.knowledge_ttl_seconds)
+                await pipe.execute()
+        except redis.RedisError:
+            # The index is an optimization; losing an observation is harmless
+            pass
+    
+    async def resolve(self, markdown_content: str) -> Resolution:
+        """
+        Split a document into references resolved from the index and text
+        that still needs the LLM.
+        
+        A year-bearing paragraph is resolved only when every year in it
+        belongs to a trusted known work whose title (and author, if one
+        is recorded) appears in the paragraph, and nothing but filler
+        words is left once those titles, authors and years are taken
+        out. Any other paragraph is still sent, and the known works found
+        in it are returned as well, to be merged with Gemini's results.
+        Headings and other year-less paragraphs are kept only ahead of
+        unresolved ones.
+        
+        Args:
+            markdown_content: Pre-filtered markdown text
+        
+        Returns:
+            Resolution with known works and the text left to extract
+        """
+        paragraphs = split_paragraphs(markdown_content)
+        if not settings.knowledge_enabled or not paragraphs:
+            return Resolution(
+                known_works=[],
+                unresolved_text=markdown_content,
+                paragraphs_resolved=0,
+                paragraphs_unresolved=len(paragraphs)
+            )
+        
+        # Phrases of each year-bearing paragraph that could be titles
+        phrases: Dict[int, List[str]] = {}
+        for index, paragraph in enumerate(paragraphs):
+            if year_values(paragraph):
+                phrases[index] = self._title_phrases(normalize_text(paragraph))
+        
+        known_titles = await self._known_titles({p for found in phrases.values() for p in found})
+        candidates = {
+            index: [phrase for phrase in found if phrase in known_titles]
+            for index, found in phrases.items()
+        }
+        entries = await self._load_entries({t for titles in candidates.values() for t in titles})
+        
+        known_works: List[AIExtractedWork] = []
+        keep = [True] * len(paragraphs)
+        for index, titles in candidates.items():
+            works, resolved = self._resolve_paragraph(paragraphs[index], titles, entries)
+            keep[index] = not resolved
+            known_works.extend(works)
+        
+        # Keep year-less context only ahead of paragraphs still sent to Gemini
+        needed = False
+        for index in range(len(paragraphs) - 1, -1, -1):
+            if index in candidates:
+                needed = keep[index]
+            else:
+                keep[index] = needed
+        
+        resolved = sum(1 for index in candidates if not keep[index])
+        self.resolved += resolved
+        self.unresolved += len(candidates) - resolved
+        return Resolution(
+            known_works=known_works,
+            unresolved_text="\n\n".join(p for p, kept in zip(paragraphs, keep) if kept),
+            paragraphs_resolved=resolved,
+            paragraphs_unresolved=len(candidates) - resolved
+        )
+    
+    def _title_phrases(self, normalized_paragraph: str) -> List[str]:
+        """Whole-word n-grams of the paragraph short enough to be titles."""
+        words = normalized_paragraph.split()
+        max_words = settings.knowledge_max_title_words
+        return [
+            " ".join(words[start:start + length])
+            for start in range(len(words))
+            for length in range(1, min(max_words, len(words) - start) + 1)
+        ]
+    
+    def _resolve_paragraph(
+        self,
+        paragraph: str,
+        titles: List[str],
+        entries: Dict[str, Dict[str, str]]
+    ) -> Tuple[List[AIExtractedWork], bool]:
+        """
+        Known works of a paragraph, and whether they account for all of it.
+        
+        Returns:
+            Tuple of (trusted works whose year appears in the paragraph,
+            True if every year is theirs and nothing but filler words is
+            left once their titles, authors and years are removed)
+        """
+        years = year_values(paragraph)
+        words = normalize_text(paragraph).split()
+        padded = f" {' '.join(words)} "
+        works: List[AIExtractedWork] = []
+        covered: Set[int] = set()
+        spans: List[str] = []
+        
+        for title in dict.fromkeys(titles):
+            trusted = self._trusted_year(entries.get(title, {}), padded)
+            if trusted is None:
+                continue
+            year, name, author = trusted
+            if year in years:
+                works.append(AIExtractedWork(title=name[0], author_or_source=name[1], year=year))
+                covered.add(year)
+                spans.extend(span for span in (title, author) if span)
+        
+        if years - covered:
+            return works, False
+        
+        # Everything else in the paragraph may mention works Gemini must see
+        consumed = [False] * len(words)
+        for span in spans:
+            span_words = span.split()
+            for start in range(len(words) - len(span_words) + 1):
+                if words[start:start + len(span_words)] == span_words:
+                    consumed[start:start + len(span_words)] = [True] * len(span_words)
+        year_words = {str(abs(year)) for year in covered}
+        leftover = [
+            word for word, used in zip(words, consumed)
+            if not used and word not in year_words and word not in FILLER_WORDS
+        ]
+        return works, not leftover
+    
+    def _trusted_year(
+        self,
+        fields: Dict[str, str],
+        padded_paragraph: str
+    ) -> Optional[Tuple[int, list, str]]:
+        """Pick the best trusted (year, display name, normalized author) whose author appears in the paragraph."""
+        counts: Dict[str, Dict[int, int]] = {}
+        for field, value in fields.items():
+            if field.startswith("name:"):
+                continue
+            author, _, year = field.rpartition("\t")
+            if author and f" {author} " not in padded_paragraph:
+                continue
+            counts.setdefault(author, {})[int(year)] = int(value)
+        
+        best = None
+        for author, years in counts.items():
+            total = sum(years.values())
+            year, count = max(years.items(), key=lambda item: item[1])
+            if count < settings.knowledge_min_confirmations:
+                continue
+            if count / total < settings.knowledge_min_agreement:
+                continue
+            if best is None or count > best[0]:
+                name = json.loads(fields.get(f"name:{author}", "null")) or [None, None]
+                best = (count, year, name, author)
+        
+        if best is None or best[2][0] is None:
+            return None
+        return best[1], best[2], best[3]
+    
+    async def _load_entries(self, titles: Set[str]) -> Dict[str, Dict[str, str]]:
+        """Fetch the counter hashes of all candidate titles in one round trip."""
+        if not titles:
+            return {}
+        ordered = list(titles)
+        try:
+            async with redis_service.redis_client.pipeline(transaction=False) as pipe:
+                for title in ordered:
+                    pipe.hgetall(title_key(title))
+                results = await pipe.execute()
+        except redis.RedisError:
+            return {}
+        return dict(zip(ordered, results))
+    
+    async def _known_titles(self, phrases: Set[str]) -> Set[str]:
+        """The phrases that are known titles, looked up in one round trip."""
+        if not phrases:
+            return set()
+        ordered = list(phrases)
+        batches = [ordered[start:start + 1000] for start in range(0, len(ordered), 1000)]
+        try:
+            async with redis_service.redis_client.pipeline(transaction=False) as pipe:
+                for batch in batches:
+                    pipe.zmscore(TITLES_KEY, batch)
+                results = await pipe.execute()
+        except redis.RedisError:
+            return set()
+        return {
+            phrase
+            for batch, scores in zip(batches, results)
+            for phrase, score in zip(batch, scores)
+            if score is not None
+        }
+
+
+# Global knowledge index instance
+knowledge_index = KnowledgeIndex()
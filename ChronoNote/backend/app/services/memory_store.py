@@ -0,0 +1,274 @@
+"""
+In-process session store for single-node and edge deployments.
+Keeps decoded sessions in memory with a capacity bound, LRU eviction and
+heap-based TTL expiry, avoiding a network round trip on every request.
+"""
+import bisect
+import heapq
+import time
+from collections import OrderedDict, deque
+from typing import Collection, Deque, Dict, List, Optional, Tuple
+from uuid import UUID
+from app.config import settings
+from app.models.schemas import QuizQuestion, SourceDocument, StoredWorkItem
+from app.services.quiz_bank import deal_quiz_deck
+from app.services.session_documents import DocumentMerge
+from app.services.session_store import (
+    InvalidCursorError, SessionStore, SessionUpdate, partial_version, render_timeline, timeline_order
+)
+
+
+class MemorySessionStore(SessionStore):
+    """
+    LRU + TTL session store held in the worker's memory.
+    
+    Sessions live in an OrderedDict kept in least-recently-used order. Expiry
+    times go into a min-heap; refreshing a TTL pushes a new heap entry and
+    stale entries are skipped lazily when they reach the top, so every
+    operation is O(log n) amortized.
+    
+    Data is per process: with several uvicorn workers or separate
+    extraction workers (app.worker), use the Redis backend instead.
+    """
+    
+    def __init__(self, max_sessions: int, ttl_seconds: int):
+        """
+        Initialize an empty store.
+        
+        Args:
+            max_sessions: Capacity; the least recently used session is evicted beyond it
+            ttl_seconds: Sliding expiration applied on save and refresh
+        """
+        self.max_sessions = max_sessions
+        self.ttl_seconds = ttl_seconds
+        # session ID -> (year-sorted works, expiry time, (version, timeline JSON or None until rendered), documents, quiz deck)
+        self._sessions: "OrderedDict[str, Tuple[List[StoredWorkItem], float, Tuple[str, Optional[str]], Dict[str, SourceDocument], Deque[QuizQuestion]]]" = OrderedDict()
+        self._expiry_heap: List[Tuple[float, str]] = []
+    
+    def __len__(self) -> int:
+        """Number of live sessions."""
+        self._expire(time.monotonic())
+        return len(self._sessions)
+    
+    async def ping(self) -> bool:
+        """The in-process store is always reachable."""
+        return True
+    
+    async def save_session_data(
+        self,
+        session_id: str,
+        works: List[StoredWorkItem],
+        documents: Optional[Dict[str, SourceDocument]] = None
+    ) -> bool:
+        """
+        Save timeline data, evicting the least recently used session if full.
+        
+        Works are kept sorted by (year, ID) so timeline pages are slices,
+        and the full timeline body and a quiz deck are prepared once here.
+        """
+        ordered = sorted(works, key=timeline_order)
+        self._put(session_id, ordered, render_timeline(ordered), dict(documents or {}), deque(deal_quiz_deck(ordered)))
+        return True
+    
+    async def update_session_data(self, session_id: str, update: SessionUpdate) -> Optional[DocumentMerge]:
+        """Nothing is awaited between the read and the save, so the update is atomic."""
+        self._expire(time.monotonic())
+        
+        entry = self._sessions.get(session_id)
+        works = list(entry[0]) if entry is not None else None
+        documents = dict(entry[3]) if entry is not None else {}
+        merge = update(works, documents)
+        if merge is not None:
+            ordered = sorted(merge.works, key=timeline_order)
+            self._put(
+                session_id, ordered, render_timeline(ordered), dict(merge.documents), deque(deal_quiz_deck(ordered))
+            )
+        return merge
+    
+    async def save_partial_session_data(self, session_id: str, works: List[StoredWorkItem]) -> bool:
+        """Save sorted works only; the body is rendered on first read and the deck dealt on first use."""
+        self._put(session_id, sorted(works, key=timeline_order), (partial_version(), None), {}, deque())
+        return True
+    
+    def _put(
+        self,
+        session_id: str,
+        ordered: List[StoredWorkItem],
+        timeline: Tuple[str, Optional[str]],
+        documents: Dict[str, SourceDocument],
+        deck: Deque[QuizQuestion]
+    ) -> None:
+        """Store a session entry with a fresh TTL, evicting the least recently used session if full."""
+        now = time.monotonic()
+        self._expire(now)
+        
+        expires_at = now + self.ttl_seconds
+        self._sessions[session_id] = (ordered, expires_at, timeline, documents, deck)
+        self._sessions.move_to_end(session_id)
+        self._push_expiry(expires_at, session_id)
+        
+        while len(self._sessions) > self.max_sessions:
+            self._sessions.popitem(last=False)
+    
+    async def get_session_data(
+        self,
+        session_id: str,
+        touch: bool = False
+    ) -> Optional[List[StoredWorkItem]]:
+        """Retrieve timeline data and mark the session as recently used."""
+        self._expire(time.monotonic())
+        
+        entry = self._sessions.get(session_id)
+        if entry is None:
+            return None
+        self._sessions.move_to_end(session_id)
+        if touch:
+            await self.refresh_session_ttl(session_id)
+        return list(entry[0])
+    
+    async def get_session_works(
+        self,
+        session_id: str,
+        work_ids: List[UUID],
+        touch: bool = False
+    ) -> Optional[Dict[UUID, StoredWorkItem]]:
+        """Retrieve only the requested works of a session."""
+        works = await self.get_session_data(session_id, touch)
+        if works is None:
+            return None
+        wanted = set(work_ids)
+        return {work.id: work for work in works if work.id in wanted}
+    
+    async def get_session_documents(self, session_id: str) -> Dict[str, SourceDocument]:
+        """Retrieve the source documents of a session."""
+        self._expire(time.monotonic())
+        
+        entry = self._sessions.get(session_id)
+        return dict(entry[3]) if entry is not None else {}
+    
+    async def get_timeline_page(
+        self,
+        session_id: str,
+        from_year: Optional[int] = None,
+        to_year: Optional[int] = None,
+        cursor: Optional[str] = None,
+        limit: Optional[int] = None,
+        touch: bool = False
+    ) -> Optional[Tuple[List[StoredWorkItem], Optional[str]]]:
+        """
+        Slice the year-sorted works with binary search.
+        
+        The cursor is "{version}:{offset}", as with the Redis backend; a
+        cursor issued before the session was replaced is rejected.
+        """
+        cursor_version, offset = None, 0
+        if cursor is not None:
+            cursor_version, _, raw_offset = cursor.partition(":")
+            if not cursor_version or not raw_offset.isdigit():
+                raise InvalidCursorError("Invalid timeline cursor")
+            offset = int(raw_offset)
+        
+        self._expire(time.monotonic())
+        
+        entry = self._sessions.get(session_id)
+        if entry is None:
+            return None
+        self._sessions.move_to_end(session_id)
+        if touch:
+            await self.refresh_session_ttl(session_id)
+        works, version = entry[0], entry[2][0]
+        if cursor_version is not None and cursor_version != version:
+            raise InvalidCursorError("Timeline cursor is stale; the session data was replaced")
+        
+        start = 0 if from_year is None else bisect.bisect_left(works, from_year, key=lambda w: w.year)
+        end = len(works) if to_year is None else bisect.bisect_right(works, to_year, key=lambda w: w.year)
+        start += offset
+        stop = end if limit is None else min(end, start + limit)
+        next_cursor = f"{version}:{offset + limit}" if limit is not None and stop < end else None
+        return works[start:stop], next_cursor
+    
+    async def get_timeline_json(
+        self,
+        session_id: str,
+        known_versions: Collection[str] = (),
+        touch: bool = False
+    ) -> Optional[Tuple[str, Optional[str]]]:
+        """Return the timeline body rendered at save time, rendering it now after a partial save."""
+        self._expire(time.monotonic())
+        
+        entry = self._sessions.get(session_id)
+        if entry is None:
+            return None
+        self._sessions.move_to_end(session_id)
+        if touch:
+            await self.refresh_session_ttl(session_id)
+            entry = self._sessions[session_id]
+        version, body = entry[2]
+        if body is None:
+            _, body = render_timeline(entry[0])
+            self._sessions[session_id] = (entry[0], entry[1], (version, body), *entry[3:])
+        return version, None if version in known_versions else body
+    
+    async def next_quiz_questions(
+        self,
+        session_id: str,
+        count: int = 1,
+        touch: bool = False
+    ) -> Optional[List[QuizQuestion]]:
+        """Pop the next questions of the session's deck, dealing new decks as it empties."""
+        self._expire(time.monotonic())
+        
+        entry = self._sessions.get(session_id)
+        if entry is None or not entry[0]:
+            return None
+        self._sessions.move_to_end(session_id)
+        if touch:
+            await self.refresh_session_ttl(session_id)
+        deck = entry[4]
+        while len(deck) < count:
+            deck.extend(deal_quiz_deck(entry[0]))
+        return [deck.popleft() for _ in range(count)]
+    
+    async def delete_session_data(self, session_id: str) -> bool:
+        """Delete a session; stale heap entries are discarded lazily."""
+        self._sessions.pop(session_id, None)
+        return True
+    
+    async def refresh_session_ttl(self, session_id: str) -> bool:
+        """Extend a live session's expiry by the full TTL."""
+        now = time.monotonic()
+        self._expire(now)
+        
+        entry = self._sessions.get(session_id)
+        if entry is None:
+            return False
+        expires_at = now + self.ttl_seconds
+        self._sessions[session_id] = (entry[0], expires_at, *entry[2:])
+        self._push_expiry(expires_at, session_id)
+        return True
+    
+    def _push_expiry(self, expires_at: float, session_id: str) -> None:
+        """Record an expiry time, compacting the heap when stale entries pile up."""
+        heapq.heappush(self._expiry_heap, (expires_at, session_id))
+        if len(self._expiry_heap) > 2 * len(self._sessions) + 64:
+            self._expiry_heap = [
+                (entry[1], sid) for sid, entry in self._sessions.items()
+            ]
+            heapq.heapify(self._expiry_heap)
+    
+    def _expire(self, now: float) -> None:
+        """Drop every session whose current expiry has passed."""
+        heap = self._expiry_heap
+        while heap and heap[0][0] <= now:
+            expires_at, session_id = heapq.heappop(heap)
+            entry = self._sessions.get(session_id)
+            # Only act on the entry matching the session's latest expiry
+            if entry is not None and entry[1] == expires_at:
+                del self._sessions[session_id]
+
+
+# Global in-memory session store instance
+memory_session_store = MemorySessionStore(
+    max_sessions=settings.session_memory_max_sessions,
+    ttl_seconds=settings.session_ttl_seconds
+)
@@ -0,0 +1,136 @@
+"""
+Prometheus metrics for upload stages, Gemini calls and Redis commands.
+Every series is labeled with the API route that caused it; work done outside
+a request, such as by the extraction worker, is labeled "worker".
+"""
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Iterable, Iterator
+from prometheus_client import Counter, Histogram
+
+
+# Route template of the request being handled, set by MetricsMiddleware
+current_route: ContextVar[str] = ContextVar("metrics_route", default="none")
+
+LATENCY_BUCKETS = (
+    0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1,
+    0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0
+)
+TOKEN_BUCKETS = (64, 256, 1024, 4096, 16384, 65536, 262144)
+
+HTTP_REQUEST_SECONDS = Histogram(
+    "chrononote_http_request_seconds",
+    "Time to handle an HTTP request, until the response body is sent",
+    ["route", "method", "status"],
+    buckets=LATENCY_BUCKETS
+)
+STAGE_SECONDS = Histogram(
+    "chrononote_stage_seconds",
+    "Time spent in one stage of the upload pipeline",
+    ["route", "stage"],
+    buckets=LATENCY_BUCKETS
+)
+GEMINI_REQUEST_SECONDS = Histogram(
+    "chrononote_gemini_request_seconds",
+    "Gemini call latency, from request to the last response chunk",
+    ["route", "mode", "outcome"],
+    buckets=LATENCY_BUCKETS
+)
+GEMINI_TOKENS = Histogram(
+    "chrononote_gemini_tokens",
+    "Tokens per Gemini call (estimated from text length when not reported)",
+    ["route", "kind"],
+    buckets=TOKEN_BUCKETS
+)
+SCHEMA_VALIDATION_FAILURES = Counter(
+    "chrononote_schema_validation_failures_total",
+    "Gemini responses or items rejected while validating the AI output",
+    ["route", "reason"]
+)
+GEMINI_PARSE_OUTCOMES = Counter(
+    "chrononote_gemini_parse_outcomes_total",
+    "Gemini extractions by how their output was used: ok, repaired, retried or failed",
+    ["route", "outcome"]
+)
+GEMINI_BATCH_DOCUMENTS = Histogram(
+    "chrononote_gemini_batch_documents",
+    "Extraction requests combined into one Gemini call by the micro-batcher",
+    buckets=(1, 2, 3, 4, 6, 8, 12, 16)
+)
+GEMINI_BATCH_FALLBACKS = Counter(
+    "chrononote_gemini_batch_fallbacks_total",
+    "Batched Gemini calls re-run as individual calls",
+    ["reason"]
+)
+REDIS_COMMAND_SECONDS = Histogram(
+    "chrononote_redis_command_seconds",
+    "Redis round-trip latency per single command, or of any pipeline under \"pipeline\"",
+    ["route", "command"],
+    buckets=LATENCY_BUCKETS
+)
+REDIS_COMMANDS = Counter(
+    "chrononote_redis_commands_total",
+    "Redis commands sent, including each command inside a pipeline",
+    ["route", "command"]
+)
+
+
+@contextmanager
+def observe_stage(stage: str) -> Iterator[None]:
+    """Time the enclosed block as one upload pipeline stage."""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        STAGE_SECONDS.labels(current_route.get(), stage).observe(time.perf_counter() - start)
+
+
+def observe_stage_seconds(stage: str, seconds: float) -> None:
+    """Record time spent in a stage that was measured piecewise."""
+    STAGE_SECONDS.labels(current_route.get(), stage).observe(seconds)
+
+
+def observe_gemini_request(mode: str, outcome: str, seconds: float) -> None:
+    """Record the latency of one Gemini call."""
+    GEMINI_REQUEST_SECONDS.labels(current_route.get(), mode, outcome).observe(seconds)
+
+
+def observe_gemini_tokens(prompt_tokens: int, output_tokens: int) -> None:
+    """Record the prompt and output size of one Gemini call."""
+    route = current_route.get()
+    GEMINI_TOKENS.labels(route, "prompt").observe(prompt_tokens)
+    GEMINI_TOKENS.labels(route, "output").observe(output_tokens)
+
+
+def count_schema_failure(reason: str, count: int = 1) -> None:
+    """Count AI output rejected for the given reason."""
+    if count:
+        SCHEMA_VALIDATION_FAILURES.labels(current_route.get(), reason).inc(count)
+
+
+def count_parse_outcome(outcome: str) -> None:
+    """Count one extraction by how its output was recovered."""
+    GEMINI_PARSE_OUTCOMES.labels(current_route.get(), outcome).inc()
+
+
+def observe_batch_size(documents: int) -> None:
+    """Record how many requests one micro-batch combined."""
+    GEMINI_BATCH_DOCUMENTS.observe(documents)
+
+
+def count_batch_fallback(reason: str) -> None:
+    """Count a batch that had to be re-run request by request."""
+    GEMINI_BATCH_FALLBACKS.labels(reason).inc()
+
+
+def observe_redis_command(command: str, seconds: float) -> None:
+    """Record the latency of one Redis command or pipeline."""
+    REDIS_COMMAND_SECONDS.labels(current_route.get(), command).observe(seconds)
+
+
+def count_redis_commands(commands: Iterable[str]) -> None:
+    """Count Redis commands sent, one per name (repeats included)."""
+    route = current_route.get()
+    for command in commands:
+        REDIS_COMMANDS.labels(route, command).inc()
@@ -0,0 +1,134 @@
+"""
+Cross-request micro-batching of small extraction requests.
+Requests arriving within a short window are combined into one call; when
+the combined response cannot be split back per request, each request is
+re-run on its own.
+"""
+import asyncio
+from typing import Awaitable, Callable, Dict, Generic, List, Optional, Set, Tuple, TypeVar
+from app.services.metrics import count_batch_fallback, observe_batch_size
+
+
+T = TypeVar("T")
+
+
+class BatchSplitError(ValueError):
+    """Raised by a batch call whose response cannot be attributed to each request."""
+    
+    def __init__(self, reason: str, message: str):
+        super().__init__(message)
+        self.reason = reason
+
+
+class MicroBatcher(Generic[T]):
+    """
+    Collects concurrent requests for up to window_seconds and runs them together.
+    
+    A batch is sent early once it holds max_items requests or adding the
+    next request would exceed max_chars. Batches of one use run_single.
+    """
+    
+    def __init__(
+        self,
+        run_single: Callable[[str], Awaitable[T]],
+        run_batch: Callable[[List[str]], Awaitable[List[T]]],
+        window_seconds: float,
+        max_items: int,
+        max_chars: int
+    ):
+        """
+        Args:
+            run_single: Handles one request on its own
+            run_batch: Handles several requests, returning results in order;
+                raises BatchSplitError when its response cannot be split
+            window_seconds: How long the first request of a batch waits for others
+            max_items: Requests per batch
+            max_chars: Combined request size per batch
+        """
+        self._run_single = run_single
+        self._run_batch = run_batch
+        self.window_seconds = window_seconds
+        self.max_items = max_items
+        self.max_chars = max_chars
+        self._pending: List[Tuple[str, asyncio.Future]] = []
+        self._pending_chars = 0
+        self._timer: Optional[asyncio.TimerHandle] = None
+        self._tasks: Set[asyncio.Task] = set()
+        self._batches = 0
+        self._batched_requests = 0
+        self._fallbacks = 0
+    
+    async def submit(self, text: str) -> T:
+        """Queue one request and wait for its result."""
+        if self._pending and self._pending_chars + len(text) > self.max_chars:
+            self._flush()
+        
+        future = asyncio.get_running_loop().create_future()
+        self._pending.append((text, future))
+        self._pending_chars += len(text)
+        
+        if len(self._pending) >= self.max_items:
+            self._flush()
+        elif self._timer is None:
+            self._timer = asyncio.get_running_loop().call_later(self.window_seconds, self._flush)
+        return await future
+    
+    def stats(self) -> Dict[str, int]:
+        """Counters for the health endpoint."""
+        return {
+            "batches": self._batches,
+            "batched_requests": self._batched_requests,
+            "fallbacks": self._fallbacks
+        }
+    
+    def _flush(self) -> None:
+        """Send the pending requests as one batch."""
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        batch, self._pending, self._pending_chars = self._pending, [], 0
+        if batch:
+            task = asyncio.ensure_future(self._run(batch))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+    
+    async def _run(self, batch: List[Tuple[str, asyncio.Future]]) -> None:
+        """Run a batch and hand each caller its own result."""
+        # Callers that gave up while waiting are left out
+        batch = [(text, future) for text, future in batch if not future.done()]
+        if not batch:
+            return
+        observe_batch_size(len(batch))
+        if len(batch) == 1:
+            await self._resolve_single(*batch[0])
+            return
+        
+        self._batches += 1
+        self._batched_requests += len(batch)
+        try:
+            results = await self._run_batch([text for text, _ in batch])
+        except BatchSplitError as e:
+            self._fallbacks += 1
+            count_batch_fallback(e.reason)
+            await asyncio.gather(*(self._resolve_single(text, future) for text, future in batch))
+            return
+        except Exception as e:
+            for _, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+            return
+        
+        for (_, future), result in zip(batch, results):
+            if not future.done():
+                future.set_result(result)
+    
+    async def _resolve_single(self, text: str, future: asyncio.Future) -> None:
+        """Run one request on its own and settle its future."""
+        try:
+            result = await self._run_single(text)
+        except Exception as e:
+            if not future.done():
+                future.set_exception(e)
+            return
+        if not future.done():
+            future.set_result(result)
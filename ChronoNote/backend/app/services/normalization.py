@@ -0,0 +1,47 @@
+"""
+Normalization of titles and authors for comparison.
+The single definition of when two extracted works are the same, shared by
+chunk merging, retry merging, multi-document sessions and the knowledge
+index, so they never disagree.
+"""
+import re
+import unicodedata
+from typing import Optional, Tuple
+from app.models.schemas import AIExtractedWork
+
+
+# Runs of anything other than letters and digits, in any script
+NON_ALPHANUMERIC = re.compile(r"[\W_]+")
+
+
+def normalize_text(value: Optional[str]) -> str:
+    """
+    Normalize a title or author for comparison.
+    
+    Folds case, accents, punctuation and spacing, so '"The Great Gatsby"'
+    and 'the great gatsby', or 'Les Misérables' and 'les miserables',
+    compare equal. Letters of every script are kept.
+    """
+    if not value:
+        return ""
+    folded = value.casefold()
+    if not folded.isascii():
+        decomposed = unicodedata.normalize("NFKD", folded)
+        folded = "".join(char for char in decomposed if not unicodedata.combining(char))
+    return NON_ALPHANUMERIC.sub(" ", folded).strip()
+
+
+def title_identity(title: str) -> str:
+    """
+    Normalized title used to identify a work.
+    
+    Falls back to the raw title when nothing is left after normalizing
+    (a title of only punctuation or symbols), so distinct works never
+    share an empty key.
+    """
+    return normalize_text(title) or title
+
+
+def work_key(work: AIExtractedWork) -> Tuple[str, int]:
+    """Identity used to de-duplicate works: normalized title plus year."""
+    return title_identity(work.title), work.year
@@ -0,0 +1,210 @@
+"""
+Local pre-filter that keeps only the year-bearing passages of a document.
+SYSTEM_PROMPT tells Gemini to ignore text without a specific year, so
+commentary paragraphs can be dropped before the prompt is built.
+"""
+import re
+from collections import deque
+from typing import Deque, List, Optional, Set, Tuple
+from pydantic import BaseModel
+
+
+# Era suffixes; a year followed by one is BC/AD-qualified
+ERA = r"(?:BCE|BC|CE|AD|B\.C\.E?\.?|A\.D\.?|C\.E\.?)(?![A-Za-z])"
+
+# Year-like tokens: bare 1000-2199, parenthesized years, "in 1989",
+# and AD/BC/CE/BCE forms of any length ("44 BC", "AD 79", "1066 A.D.");
+# "around 2560 BC" is one token, so its era is not lost
+YEAR_PATTERN = re.compile(
+    r"(?<!\d)(?<!\d[.,])(?:1\d{3}|20\d{2}|21\d{2})(?!\d|[.,]\d)"
+    r"|\(\s*\d{3,4}\s*\)"
+    rf"|\b(?:in|year|circa|around|c\.)\s+\d{{3,4}}\b(?:\s*{ERA})?"
+    rf"|\b\d{{1,4}}\s*{ERA}"
+    r"|\b(?:AD|A\.D\.)\s*\d{1,4}\b",
+    re.IGNORECASE
+)
+
+DIGITS_PATTERN = re.compile(r"\d+")
+BC_PATTERN = re.compile(r"B\.?\s*C", re.IGNORECASE)
+
+PARAGRAPH_PATTERN = re.compile(r"\n\s*\n")
+HEADING_PATTERN = re.compile(r"^#{1,6}\s")
+
+# Rough characters-per-token ratio used for reporting only
+CHARS_PER_TOKEN = 4
+
+
+class PrefilterResult(BaseModel):
+    """Filtered text plus the size reduction it achieved."""
+    text: str
+    original_bytes: int
+    filtered_bytes: int
+    paragraphs_total: int
+    paragraphs_kept: int
+    
+    @classmethod
+    def unfiltered(cls, markdown_content: str, original_bytes: Optional[int] = None) -> "PrefilterResult":
+        """Result for a document passed through unchanged."""
+        size = len(markdown_content.encode("utf-8")) if original_bytes is None else original_bytes
+        return cls(
+            text=markdown_content,
+            original_bytes=size,
+            filtered_bytes=size,
+            paragraphs_total=1,
+            paragraphs_kept=1
+        )
+    
+    @property
+    def original_tokens(self) -> int:
+        """Estimated prompt tokens for the unfiltered document."""
+        return self.original_bytes // CHARS_PER_TOKEN
+    
+    @property
+    def filtered_tokens(self) -> int:
+        """Estimated prompt tokens for the filtered document."""
+        return self.filtered_bytes // CHARS_PER_TOKEN
+    
+    @property
+    def reduction(self) -> float:
+        """Fraction of bytes removed, between 0 and 1."""
+        if self.original_bytes == 0:
+            return 0.0
+        return 1 - self.filtered_bytes / self.original_bytes
+    
+    def summary(self) -> str:
+        """One-line human-readable report for logs."""
+        return (
+            f"{self.original_bytes} -> {self.filtered_bytes} bytes "
+            f"(-{self.reduction:.0%}), ~{self.original_tokens} -> ~{self.filtered_tokens} tokens, "
+            f"{self.paragraphs_kept}/{self.paragraphs_total} paragraphs kept"
+        )
+
+
+def has_year(text: str) -> bool:
+    """True if the text contains at least one year-like token."""
+    return YEAR_PATTERN.search(text) is not None
+
+
+def year_values(text: str) -> Set[int]:
+    """
+    Integer years mentioned in the text.
+    
+    BC/BCE years are returned as negative numbers.
+    """
+    years = set()
+    for match in YEAR_PATTERN.finditer(text):
+        token = match.group(0)
+        year = int(DIGITS_PATTERN.search(token).group(0))
+        years.add(-year if BC_PATTERN.search(token) else year)
+    return years
+
+
+def split_paragraphs(markdown_content: str) -> List[str]:
+    """Split markdown into stripped, non-empty paragraphs."""
+    text = markdown_content.replace("\r\n", "\n")
+    return [p.strip() for p in PARAGRAPH_PATTERN.split(text) if p.strip()]
+
+
+def is_heading(paragraph: str) -> bool:
+    """True if the paragraph starts with a markdown heading."""
+    return HEADING_PATTERN.match(paragraph) is not None
+
+
+class StreamingPrefilter:
+    """
+    Incremental form of prefilter_markdown, fed decoded text as it arrives.
+    
+    Only the current paragraph, a window of context_paragraphs candidates
+    and the paragraphs already kept are held, so the unfiltered document is
+    never materialized as a single string.
+    """
+    
+    def __init__(self, context_paragraphs: int = 0):
+        """
+        Args:
+            context_paragraphs: Paragraphs to keep on each side of a match
+        """
+        self.context_paragraphs = context_paragraphs
+        self._buffer = ""
+        self._index = 0
+        self._kept: List[str] = []
+        self._last_kept = -1
+        self._heading: Optional[Tuple[int, str]] = None
+        self._window: Deque[Tuple[int, str]] = deque(maxlen=context_paragraphs or 1)
+        self._keep_after = 0
+    
+    def feed(self, text: str) -> None:
+        """Process the complete paragraphs in the next piece of text, with LF line endings."""
+        pieces = PARAGRAPH_PATTERN.split(self._buffer + text)
+        # The last piece may continue in the next call
+        self._buffer = pieces.pop()
+        for piece in pieces:
+            self.add_paragraph(piece)
+    
+    def add_paragraph(self, paragraph: str) -> None:
+        """Process one paragraph, in document order."""
+        paragraph = paragraph.strip()
+        if not paragraph:
+            return
+        index = self._index
+        self._index += 1
+        
+        if is_heading(paragraph):
+            self._heading = (index, paragraph)
+        if has_year(paragraph):
+            # The heading and preceding context come first in document order
+            earlier = list(self._window) if self.context_paragraphs else []
+            if self._heading is not None:
+                earlier.append(self._heading)
+            for earlier_index, earlier_paragraph in sorted(earlier):
+                self._keep(earlier_index, earlier_paragraph)
+            self._keep(index, paragraph)
+            self._keep_after = self.context_paragraphs
+        elif self._keep_after > 0:
+            self._keep(index, paragraph)
+            self._keep_after -= 1
+        self._window.append((index, paragraph))
+    
+    def finish(self, original_bytes: int) -> PrefilterResult:
+        """
+        Flush the last paragraph and return the result.
+        
+        Args:
+            original_bytes: UTF-8 size of the whole document
+        """
+        self.add_paragraph(self._buffer)
+        self._buffer = ""
+        filtered = "\n\n".join(self._kept)
+        return PrefilterResult(
+            text=filtered,
+            original_bytes=original_bytes,
+            filtered_bytes=len(filtered.encode("utf-8")),
+            paragraphs_total=self._index,
+            paragraphs_kept=len(self._kept)
+        )
+    
+    def _keep(self, index: int, paragraph: str) -> None:
+        if index > self._last_kept:
+            self._kept.append(paragraph)
+            self._last_kept = index
+
+
+def prefilter_markdown(markdown_content: str, context_paragraphs: int = 0) -> PrefilterResult:
+    """
+    Keep year-bearing paragraphs plus a small window of context.
+    
+    The context is the nearest heading above each kept paragraph plus
+    context_paragraphs neighbours on either side.
+    
+    Args:
+        markdown_content: The raw markdown text
+        context_paragraphs: Paragraphs to keep on each side of a match
+    
+    Returns:
+        PrefilterResult with the compact text; text is empty when the
+        document contains no year-like tokens at all
+    """
+    prefilter = StreamingPrefilter(context_paragraphs)
+    for paragraph in split_paragraphs(markdown_content):
+        prefilter.add_paragraph(paragraph)
+    return prefilter.finish(len(markdown_content.encode("utf-8")))
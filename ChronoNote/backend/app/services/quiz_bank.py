@@ -0,0 +1,77 @@
+"""
+Precomputed date quiz questions.
+A session's quiz is dealt as a shuffled deck in which every work is asked
+once, so questions do not repeat until the deck is used up.
+"""
+import bisect
+import random
+from typing import List, Sequence
+from app.models.schemas import QuizQuestion, StoredWorkItem
+
+
+# Wrong year options shown next to the correct one
+DECOY_COUNT = 3
+
+# Decoys are other years of the session, at most this many on either side
+# of the correct year and no further than DECOY_MAX_DISTANCE from it
+DECOY_NEIGHBOURS = 6
+DECOY_MAX_DISTANCE = 50
+
+# Offsets used when the session has too few nearby years of its own
+FALLBACK_OFFSETS = tuple(offset for offset in range(-20, 21) if abs(offset) >= 5)
+
+MAX_YEAR = 2100
+
+
+def decoy_years(target_year: int, session_years: Sequence[int], rng: random.Random) -> List[int]:
+    """
+    Pick DECOY_COUNT distinct wrong years for a question.
+    
+    Args:
+        target_year: The correct year
+        session_years: Sorted distinct years of the session's works
+        rng: Source of randomness
+    """
+    position = bisect.bisect_left(session_years, target_year)
+    after = position + 1 if position < len(session_years) and session_years[position] == target_year else position
+    nearby = [
+        year for year in session_years[max(0, position - DECOY_NEIGHBOURS):position]
+        + list(session_years[after:after + DECOY_NEIGHBOURS])
+        if abs(year - target_year) <= DECOY_MAX_DISTANCE
+    ]
+    if len(nearby) >= DECOY_COUNT:
+        return rng.sample(nearby, DECOY_COUNT)
+    
+    # Keep fallback years positive and not far in the future, unless the correct one is
+    min_year = 1 if target_year >= 1 else target_year - 20
+    max_year = max(MAX_YEAR, target_year + 20)
+    taken = set(nearby) | {target_year}
+    fallback = [
+        target_year + offset for offset in FALLBACK_OFFSETS
+        if min_year <= target_year + offset <= max_year and target_year + offset not in taken
+    ]
+    return nearby + rng.sample(fallback, DECOY_COUNT - len(nearby))
+
+
+def deal_quiz_deck(works: List[StoredWorkItem], rng: random.Random = random) -> List[QuizQuestion]:
+    """
+    Shuffle a session's works into a deck of quiz questions.
+    
+    Every work is the target of exactly one question, with decoys drawn
+    from the years of the session's own works.
+    """
+    session_years = sorted({work.year for work in works})
+    targets = list(works)
+    rng.shuffle(targets)
+    
+    deck = []
+    for work in targets:
+        year_options = [work.year] + decoy_years(work.year, session_years, rng)
+        rng.shuffle(year_options)
+        deck.append(QuizQuestion(
+            work_id=work.id,
+            title=work.title,
+            author_or_source=work.author_or_source,
+            year_options=year_options
+        ))
+    return deck
@@ -3,29 +3,100 @@ Redis service for session-based data storage.
 Manages temporary storage of timeline data with automatic expiration.
 """
 import json
-import redis
-from typing import List, Optional
+import redis.asyncio as redis
+from typing import Collection, Dict, List, Optional, Tuple
 from uuid import UUID
 from app.config import settings
-from app.models.schemas import StoredWorkItem
+from app.models.schemas import QuizQuestion, SourceDocument, StoredWorkItem
+from app.services.decoded_cache import DecodedSessionCache
+from app.services.quiz_bank import deal_quiz_deck
+from app.services.redis_stats import CountingRedis
+from app.services.session_codec import REDIS_ENCODING_ERRORS, RawValue, SessionCodec
+from app.services.session_documents import DocumentMerge
+from app.services.session_store import (
+    InvalidCursorError, SessionStore, SessionUpdate, partial_version, render_timeline
+)
 
 
-class RedisService:
-    """Service for managing Redis operations."""
+def session_key(session_id: str) -> str:
+    """Legacy Redis key holding a session's works as one JSON blob."""
+    return f"session:{session_id}"
+
+
+def works_key(session_id: str) -> str:
+    """Redis hash of a session's works, keyed by work UUID, plus its author table."""
+    return f"session:{session_id}:works"
+
+
+# Field of the works hash holding the session's interned author table
+AUTHORS_FIELD = "authors"
+
+
+def years_key(session_id: str) -> str:
+    """Redis sorted set of a session's work UUIDs, scored by year."""
+    return f"session:{session_id}:years"
+
+
+def timeline_key(session_id: str) -> str:
+    """Redis key holding the precomputed /api/timeline JSON body."""
+    return f"session:{session_id}:timeline"
+
+
+def documents_key(session_id: str) -> str:
+    """Redis hash of an appended session's source documents, keyed by name."""
+    return f"session:{session_id}:documents"
+
+
+def quiz_key(session_id: str) -> str:
+    """Redis list of the questions left in a session's quiz deck."""
+    return f"session:{session_id}:quiz"
+
+
+def version_key(session_id: str) -> str:
+    """Redis key holding the version stamp of a session's current data."""
+    return f"session:{session_id}:version"
+
+
+# Tries of update_session_data before giving up on a session that keeps changing
+UPDATE_ATTEMPTS = 10
+
+
+class RedisService(SessionStore):
+    """Service for managing Redis operations; the default session store backend."""
     
     def __init__(self):
-        """Initialize Redis connection pool."""
-        self.redis_client = redis.Redis(
+        """
+        Initialize the shared, bounded Redis connection pool.
+        
+        No connection is opened here; connections are created lazily by the
+        pool and the first one is established in connect().
+        """
+        self.pool = redis.BlockingConnectionPool(
             host=settings.redis_host,
             port=settings.redis_port,
             db=settings.redis_db,
             password=settings.redis_password if settings.redis_password else None,
             decode_responses=True,  # Automatically decode bytes to strings
+            encoding_errors=REDIS_ENCODING_ERRORS,  # ...keeping binary session values recoverable
+            max_connections=settings.redis_max_connections,
+            timeout=settings.redis_pool_timeout_seconds,
             socket_connect_timeout=5,
             socket_timeout=5
         )
+        self.redis_client = CountingRedis(connection_pool=self.pool)
+        self.decoded_cache = DecodedSessionCache(settings.session_decode_cache_max_works)
+        self.codec = SessionCodec(
+            settings.session_compact_encoding,
+            settings.session_compress_min_bytes,
+            settings.session_compress_level
+        )
     
-    def ping(self) -> bool:
+    async def close(self) -> None:
+        """Release the client and close every pooled connection."""
+        await self.redis_client.aclose()
+        await self.pool.disconnect()
+    
+    async def ping(self) -> bool:
         """
         Test Redis connection.
         
@@ -33,115 +104,622 @@ class RedisService:
             True if connection is successful, False otherwise
         """
         try:
-            return self.redis_client.ping()
-        except redis.ConnectionError:
+            return await self.redis_client.ping()
+        except redis.RedisError:
             return False
     
-    def save_session_data(
+    async def save_session_data(
         self, 
         session_id: str, 
-        works: List[StoredWorkItem]
+        works: List[StoredWorkItem],
+        documents: Optional[Dict[str, SourceDocument]] = None
     ) -> bool:
         """
         Save timeline data to Redis with TTL.
         
+        Each work is stored as one field of the session's hash, keyed by
+        its UUID, so answer checks can fetch single works, and a sorted set
+        scored by year keeps the timeline order. Values use the compact
+        session encoding, with the authors interned in one more field of
+        the hash. The final JSON body of the full timeline is rendered once
+        here and stored as well, compressed when large.
+        
+        Its content hash is written as the version stamp; it marks the
+        session as existing (even with no works), lets every worker's
+        decoded-session cache notice the change, and is the timeline ETag.
+        Source documents, if given, go into a hash of their own, and a
+        fresh quiz deck is dealt into a list.
+        
         Args:
             session_id: Unique session identifier
             works: List of StoredWorkItem objects to save
-            
+            documents: Source documents by name, or None to drop them
+        
         Returns:
             True if save was successful
-            
+        
         Raises:
             redis.RedisError: If Redis operation fails
         """
         try:
-            # Serialize works to JSON
-            works_data = [work.model_dump(mode='json') for work in works]
-            json_data = json.dumps(works_data)
+            # Replace data and version stamp atomically, dropping any legacy blob
+            async with self.redis_client.pipeline(transaction=True) as pipe:
+                version = self._queue_save(pipe, session_id, works, documents)
+                await pipe.execute()
             
-            # Save to Redis with TTL
-            self.redis_client.setex(
-                name=f"session:{session_id}",
-                time=settings.session_ttl_seconds,
-                value=json_data
-            )
+            self.decoded_cache.put(session_id, version, works)
             return True
+        
+        except redis.RedisError as e:
+            raise redis.RedisError(f"Failed to save session data: {str(e)}")
+    
+    async def update_session_data(self, session_id: str, update: SessionUpdate) -> Optional[DocumentMerge]:
+        """
+        Apply an update under WATCH on the session's version stamp.
+        
+        Every save writes a new version stamp, so a save by another request
+        between the read and the write aborts the transaction; the update
+        is then applied again to the new data, up to UPDATE_ATTEMPTS times.
+        
+        Raises:
+            redis.RedisError: If Redis operation fails or the session kept
+                changing
+            ValueError: If stored data is corrupted
+        """
+        try:
+            for _ in range(UPDATE_ATTEMPTS):
+                async with self.redis_client.pipeline(transaction=True) as pipe:
+                    await pipe.watch(version_key(session_id), session_key(session_id))
+                    works = await self.get_session_data(session_id)
+                    documents = await self.get_session_documents(session_id)
+                    merge = update(works, documents)
+                    if merge is None:
+                        return None
+                    pipe.multi()
+                    version = self._queue_save(pipe, session_id, merge.works, merge.documents)
+                    try:
+                        await pipe.execute()
+                    except redis.WatchError:
+                        continue
+                self.decoded_cache.put(session_id, version, merge.works)
+                return merge
+        except redis.RedisError as e:
+            raise redis.RedisError(f"Failed to save session data: {str(e)}")
+        raise redis.RedisError(f"Failed to save session data: changed by {UPDATE_ATTEMPTS} concurrent updates")
+    
+    def _queue_save(
+        self,
+        pipe: redis.client.Pipeline,
+        session_id: str,
+        works: List[StoredWorkItem],
+        documents: Optional[Dict[str, SourceDocument]]
+    ) -> str:
+        """Queue replacing all of a session's keys; returns the new version stamp."""
+        version, timeline = render_timeline(works)
+        ttl = settings.session_ttl_seconds
+        pipe.delete(
+            works_key(session_id), years_key(session_id), documents_key(session_id),
+            quiz_key(session_id), session_key(session_id)
+        )
+        if documents:
+            pipe.hset(documents_key(session_id), mapping={
+                name: document.model_dump_json() for name, document in documents.items()
+            })
+            pipe.expire(documents_key(session_id), ttl)
+        if works:
+            self._queue_works(pipe, session_id, works)
+            pipe.rpush(quiz_key(session_id), *self._encode_deck(works))
+            pipe.expire(quiz_key(session_id), ttl)
+        pipe.setex(timeline_key(session_id), ttl, self.codec.encode_text(timeline))
+        pipe.setex(version_key(session_id), ttl, version)
+        return version
+    
+    async def save_partial_session_data(self, session_id: str, works: List[StoredWorkItem]) -> bool:
+        """
+        Save only the works of an upload in progress, under a random version.
+        
+        The timeline body and quiz deck keys are deleted rather than
+        written; get_timeline_json and next_quiz_questions prepare them on
+        first use, as for sessions saved before they existed.
+        
+        Raises:
+            redis.RedisError: If Redis operation fails
+        """
+        try:
+            version = partial_version()
+            async with self.redis_client.pipeline(transaction=True) as pipe:
+                pipe.delete(
+                    works_key(session_id), years_key(session_id), documents_key(session_id),
+                    quiz_key(session_id), timeline_key(session_id), session_key(session_id)
+                )
+                if works:
+                    self._queue_works(pipe, session_id, works)
+                pipe.setex(version_key(session_id), settings.session_ttl_seconds, version)
+                await pipe.execute()
             
+            self.decoded_cache.put(session_id, version, works)
+            return True
+        
         except redis.RedisError as e:
             raise redis.RedisError(f"Failed to save session data: {str(e)}")
     
-    def get_session_data(self, session_id: str) -> Optional[List[StoredWorkItem]]:
+    def _queue_works(self, pipe: redis.client.Pipeline, session_id: str, works: List[StoredWorkItem]) -> None:
+        """Queue writing the works hash and year index of a session, with their TTL."""
+        values, authors = self.codec.encode_works(works)
+        if authors is not None:
+            values[AUTHORS_FIELD] = authors
+        pipe.hset(works_key(session_id), mapping=values)
+        pipe.zadd(years_key(session_id), {str(work.id): work.year for work in works})
+        pipe.expire(works_key(session_id), settings.session_ttl_seconds)
+        pipe.expire(years_key(session_id), settings.session_ttl_seconds)
+    
+    async def get_session_data(
+        self,
+        session_id: str,
+        touch: bool = False
+    ) -> Optional[List[StoredWorkItem]]:
         """
         Retrieve timeline data from Redis.
         
+        Only the small version stamp is fetched first; when it matches the
+        worker's decoded-session cache, the cached works are returned without
+        transferring or decoding the data, in a single round trip. Sessions
+        still stored as a single legacy JSON blob are migrated to the hash
+        layout on read.
+        
         Args:
             session_id: Unique session identifier
-            
+            touch: Reset the TTL in the same round trip as the version read
+        
         Returns:
             List of StoredWorkItem objects or None if session not found
-            
+        
         Raises:
             redis.RedisError: If Redis operation fails
             ValueError: If stored data is corrupted
         """
         try:
-            # Get data from Redis
-            json_data = self.redis_client.get(f"session:{session_id}")
+            async with self.redis_client.pipeline(transaction=False) as pipe:
+                pipe.get(version_key(session_id))
+                if touch:
+                    self._queue_touch(pipe, session_id)
+                version, *_ = await pipe.execute()
+            if version is not None:
+                cached = self.decoded_cache.get(session_id, version)
+                if cached is not None:
+                    return cached
             
-            if json_data is None:
-                return None
+            # Get data and its version together so they are consistent
+            async with self.redis_client.pipeline(transaction=True) as pipe:
+                pipe.get(version_key(session_id))
+                pipe.hvals(works_key(session_id))
+                pipe.get(session_key(session_id))
+                version, raw_works, legacy_data = await pipe.execute()
             
-            # Parse JSON
-            try:
-                works_data = json.loads(json_data)
-            except json.JSONDecodeError as e:
-                raise ValueError(f"Corrupted session data: {str(e)}")
+            if version is not None:
+                works = self._decode_works(raw_works)
+                self.decoded_cache.put(session_id, version, works)
+                return works
             
-            # Convert to Pydantic models
-            works = []
-            for work_data in works_data:
-                # Convert string UUID back to UUID object
-                if 'id' in work_data and isinstance(work_data['id'], str):
-                    work_data['id'] = UUID(work_data['id'])
-                works.append(StoredWorkItem(**work_data))
+            if legacy_data is not None:
+                works = self._decode_legacy(legacy_data)
+                await self.save_session_data(session_id, works)
+                return works
             
-            return works
+            self.decoded_cache.evict(session_id)
+            return None
+        
+        except redis.RedisError as e:
+            raise redis.RedisError(f"Failed to retrieve session data: {str(e)}")
+    
+    async def get_session_works(
+        self,
+        session_id: str,
+        work_ids: List[UUID],
+        touch: bool = False
+    ) -> Optional[Dict[UUID, StoredWorkItem]]:
+        """
+        Retrieve only the requested works with a single HMGET.
+        
+        Args:
+            session_id: Unique session identifier
+            work_ids: IDs of the works to fetch
+            touch: Reset the TTL in the same round trip
+        
+        Returns:
+            Dictionary of the works found, keyed by ID, or None if session not found
+        
+        Raises:
+            redis.RedisError: If Redis operation fails
+            ValueError: If stored data is corrupted
+        """
+        if not work_ids:
+            works = await self.get_session_data(session_id, touch)
+            return None if works is None else {}
+        
+        try:
+            async with self.redis_client.pipeline(transaction=True) as pipe:
+                pipe.exists(version_key(session_id))
+                pipe.hmget(works_key(session_id), [str(work_id) for work_id in work_ids] + [AUTHORS_FIELD])
+                if touch:
+                    self._queue_touch(pipe, session_id)
+                exists, raw_works, *_ = await pipe.execute()
+        except redis.RedisError as e:
+            raise redis.RedisError(f"Failed to retrieve session data: {str(e)}")
+        
+        if not exists:
+            # Missing, or a legacy blob that get_session_data will migrate
+            works = await self.get_session_data(session_id)
+            if works is None:
+                return None
+            wanted = set(work_ids)
+            return {work.id: work for work in works if work.id in wanted}
+        
+        works = self._decode_works([raw for raw in raw_works if raw is not None])
+        return {work.id: work for work in works}
+    
+    async def get_session_documents(self, session_id: str) -> Dict[str, SourceDocument]:
+        """
+        Retrieve the source documents of a session with a single HGETALL.
+        
+        Args:
+            session_id: Unique session identifier
+        
+        Returns:
+            Documents by name; empty if the session has none
+        
+        Raises:
+            redis.RedisError: If Redis operation fails
+            ValueError: If stored data is corrupted
+        """
+        try:
+            raw_documents = await self.redis_client.hgetall(documents_key(session_id))
+        except redis.RedisError as e:
+            raise redis.RedisError(f"Failed to retrieve session documents: {str(e)}")
+        try:
+            return {
+                name: SourceDocument.model_validate_json(raw) for name, raw in raw_documents.items()
+            }
+        except ValueError as e:
+            raise ValueError(f"Corrupted session data: {str(e)}")
+    
+    async def get_timeline_page(
+        self,
+        session_id: str,
+        from_year: Optional[int] = None,
+        to_year: Optional[int] = None,
+        cursor: Optional[str] = None,
+        limit: Optional[int] = None,
+        touch: bool = False
+    ) -> Optional[Tuple[List[StoredWorkItem], Optional[str]]]:
+        """
+        Read one page of the year index with ZRANGEBYSCORE, then HMGET
+        only the works on that page.
+        
+        Equal years are ordered by UUID by the sorted set itself. The
+        cursor is "{version}:{offset}"; a cursor issued before the session
+        was replaced is rejected rather than silently skipping works.
+        
+        Args:
+            session_id: Unique session identifier
+            from_year: Inclusive lower bound on the year
+            to_year: Inclusive upper bound on the year
+            cursor: Cursor returned with the previous page
+            limit: Maximum number of works to return (None for all)
+            touch: Reset the TTL in the same round trip as the index read
+        
+        Returns:
+            Tuple of (works, next_cursor), or None if session not found
+        
+        Raises:
+            redis.RedisError: If Redis operation fails
+            InvalidCursorError: If the cursor is malformed or stale
+            ValueError: If stored data is corrupted
+        """
+        cursor_version, offset = None, 0
+        if cursor is not None:
+            cursor_version, _, raw_offset = cursor.partition(":")
+            if not cursor_version or not raw_offset.isdigit():
+                raise InvalidCursorError("Invalid timeline cursor")
+            offset = int(raw_offset)
+        
+        low = "-inf" if from_year is None else from_year
+        high = "+inf" if to_year is None else to_year
+        # Fetch one extra ID to learn whether another page follows
+        count = -1 if limit is None else limit + 1
+        
+        try:
+            async with self.redis_client.pipeline(transaction=True) as pipe:
+                pipe.get(version_key(session_id))
+                pipe.exists(years_key(session_id))
+                pipe.zrangebyscore(years_key(session_id), low, high, start=offset, num=count)
+                if touch:
+                    self._queue_touch(pipe, session_id)
+                version, indexed, ids, *_ = await pipe.execute()
+        except redis.RedisError as e:
+            raise redis.RedisError(f"Failed to retrieve session data: {str(e)}")
+        
+        if cursor_version is not None and cursor_version != version:
+            raise InvalidCursorError("Timeline cursor is stale; the session data was replaced")
+        
+        if version is None or not indexed:
+            # Missing, a legacy blob, empty, or saved before the year index existed
+            works = await self.get_session_data(session_id)
+            if works is None:
+                return None
+            if not works:
+                return [], None
+            await self.save_session_data(session_id, works)
+            return await self.get_timeline_page(session_id, from_year, to_year, None, limit)
+        
+        has_more = limit is not None and len(ids) > limit
+        ids = ids[:limit] if limit is not None else ids
+        
+        cached = self.decoded_cache.get(session_id, version)
+        if cached is not None:
+            by_id = {str(work.id): work for work in cached}
+            works = [by_id[work_id] for work_id in ids if work_id in by_id]
+        elif ids:
+            try:
+                raw_works = await self.redis_client.hmget(works_key(session_id), ids + [AUTHORS_FIELD])
+            except redis.RedisError as e:
+                raise redis.RedisError(f"Failed to retrieve session data: {str(e)}")
+            works = self._decode_works([raw for raw in raw_works if raw is not None])
+        else:
+            works = []
+        
+        next_cursor = f"{version}:{offset + len(ids)}" if has_more else None
+        return works, next_cursor
+    
+    async def get_timeline_json(
+        self,
+        session_id: str,
+        known_versions: Collection[str] = (),
+        touch: bool = False
+    ) -> Optional[Tuple[str, Optional[str]]]:
+        """
+        Fetch the timeline body rendered at save time, without decoding it
+        into works; a body stored compressed is decompressed.
+        
+        Without known_versions the version and body come back in one round
+        trip. With them, only the version is read first, so a client whose
+        copy is current costs no body transfer.
+        
+        Args:
+            session_id: Unique session identifier
+            known_versions: Versions the client already holds
+            touch: Reset the TTL in the same round trip as the first read
+        
+        Returns:
+            Tuple of (version, body or None if unchanged), or None if
+            session not found
+        
+        Raises:
+            redis.RedisError: If Redis operation fails
+            ValueError: If stored data is corrupted
+        """
+        try:
+            async with self.redis_client.pipeline(transaction=True) as pipe:
+                pipe.get(version_key(session_id))
+                if not known_versions:
+                    pipe.get(timeline_key(session_id))
+                if touch:
+                    self._queue_touch(pipe, session_id)
+                results = await pipe.execute()
+            version = results[0]
+            body = None if known_versions else results[1]
             
+            if version is not None and version in known_versions:
+                return version, None
+            if version is not None and known_versions:
+                # The client's copy is stale; read the body with its version
+                async with self.redis_client.pipeline(transaction=True) as pipe:
+                    pipe.get(version_key(session_id))
+                    pipe.get(timeline_key(session_id))
+                    version, body = await pipe.execute()
         except redis.RedisError as e:
             raise redis.RedisError(f"Failed to retrieve session data: {str(e)}")
+        
+        if version is not None and body is not None:
+            try:
+                return version, self.codec.decode_text(body)
+            except ValueError as e:
+                raise ValueError(f"Corrupted session data: {str(e)}")
+        
+        # Missing, a legacy blob, saved before the body was precomputed, or
+        # saved partway through a streaming upload
+        return await self._render_timeline_json(session_id, known_versions)
+    
+    async def _render_timeline_json(
+        self,
+        session_id: str,
+        known_versions: Collection[str]
+    ) -> Optional[Tuple[str, Optional[str]]]:
+        """
+        Render a session's timeline body from its works and store it.
+        
+        Only the timeline key is written, with SET NX, so a body stored by a
+        concurrent save is never overwritten; the version is watched from
+        before the works are read, so a body rendered from works that have
+        since changed is not stored at all.
+        
+        Raises:
+            redis.RedisError: If Redis operation fails
+            ValueError: If stored data is corrupted
+        """
+        try:
+            async with self.redis_client.pipeline(transaction=True) as pipe:
+                await pipe.watch(version_key(session_id))
+                # Version first: after a concurrent save the client may hold a
+                # newer body under an older ETag, never the other way round
+                version = await pipe.get(version_key(session_id))
+                works = await self.get_session_data(session_id)
+                if works is None:
+                    return None
+                if version is None:
+                    # A legacy blob, migrated with its body by get_session_data
+                    version, body = render_timeline(works)
+                    return version, None if version in known_versions else body
+                if version in known_versions:
+                    return version, None
+                
+                _, body = render_timeline(works)
+                pipe.multi()
+                pipe.set(timeline_key(session_id), self.codec.encode_text(body), ex=settings.session_ttl_seconds, nx=True)
+                try:
+                    await pipe.execute()
+                except redis.WatchError:
+                    # Saved meanwhile, with its own body
+                    pass
+                return version, body
+        except redis.RedisError as e:
+            raise redis.RedisError(f"Failed to retrieve session data: {str(e)}")
+    
+    async def next_quiz_questions(
+        self,
+        session_id: str,
+        count: int = 1,
+        touch: bool = False
+    ) -> Optional[List[QuizQuestion]]:
+        """
+        Pop the next questions of the session's quiz deck with a single LPOP.
+        
+        When the deck runs out (or the session predates quiz decks), new
+        decks are dealt from the session's works: the questions still
+        needed are returned and the rest pushed back.
+        
+        Args:
+            session_id: Unique session identifier
+            count: Number of questions to take
+            touch: Reset the TTL in the same round trip as the LPOP
+        
+        Returns:
+            count questions, or None if session not found or empty
+        
+        Raises:
+            redis.RedisError: If Redis operation fails
+            ValueError: If stored data is corrupted
+        """
+        try:
+            async with self.redis_client.pipeline(transaction=False) as pipe:
+                pipe.lpop(quiz_key(session_id), count)
+                if touch:
+                    self._queue_touch(pipe, session_id)
+                raw_questions, *_ = await pipe.execute()
+        except redis.RedisError as e:
+            raise redis.RedisError(f"Failed to retrieve quiz question: {str(e)}")
+        raw_questions = raw_questions or []
+        
+        if len(raw_questions) < count:
+            works = await self.get_session_data(session_id)
+            if not works:
+                return None
+            deck: List[RawValue] = []
+            while len(raw_questions) + len(deck) < count:
+                deck.extend(self._encode_deck(works))
+            needed = count - len(raw_questions)
+            raw_questions, rest = raw_questions + deck[:needed], deck[needed:]
+            if rest:
+                try:
+                    async with self.redis_client.pipeline(transaction=True) as pipe:
+                        pipe.rpush(quiz_key(session_id), *rest)
+                        pipe.expire(quiz_key(session_id), settings.session_ttl_seconds)
+                        await pipe.execute()
+                except redis.RedisError as e:
+                    raise redis.RedisError(f"Failed to refill quiz deck: {str(e)}")
+        
+        try:
+            return [self.codec.decode_question(raw) for raw in raw_questions]
+        except ValueError as e:
+            raise ValueError(f"Corrupted session data: {str(e)}")
+    
+    def _encode_deck(self, works: List[StoredWorkItem]) -> List[RawValue]:
+        """Deal a new quiz deck and encode its questions for the list."""
+        return [self.codec.encode_question(question) for question in deal_quiz_deck(works)]
+    
+    def _queue_touch(self, pipe: redis.client.Pipeline, session_id: str) -> None:
+        """
+        Queue EXPIREs resetting the TTL of every key of the session.
+        
+        The version key comes first and the legacy single-key session last,
+        so callers can tell from the replies whether the session exists.
+        """
+        keys = (
+            version_key(session_id),
+            works_key(session_id),
+            years_key(session_id),
+            timeline_key(session_id),
+            documents_key(session_id),
+            quiz_key(session_id),
+            session_key(session_id),
+        )
+        for key in keys:
+            pipe.expire(key, settings.session_ttl_seconds)
+    
+    def _decode_works(self, raw_works: List[RawValue]) -> List[StoredWorkItem]:
+        """Decode per-work values, and the author table if among them, from the session hash."""
+        try:
+            return self.codec.decode_works(raw_works)
+        except ValueError as e:
+            raise ValueError(f"Corrupted session data: {str(e)}")
+    
+    def _decode_legacy(self, json_data: str) -> List[StoredWorkItem]:
+        """Decode a session stored in the legacy single-blob format."""
+        # Parse JSON
+        try:
+            works_data = json.loads(json_data)
+        except json.JSONDecodeError as e:
+            raise ValueError(f"Corrupted session data: {str(e)}")
+        
+        # Convert to Pydantic models
+        works = []
+        for work_data in works_data:
+            # Convert string UUID back to UUID object
+            if 'id' in work_data and isinstance(work_data['id'], str):
+                work_data['id'] = UUID(work_data['id'])
+            works.append(StoredWorkItem(**work_data))
+        return works
     
-    def delete_session_data(self, session_id: str) -> bool:
+    async def delete_session_data(self, session_id: str) -> bool:
         """
         Delete session data from Redis.
         
         Args:
             session_id: Unique session identifier
-            
+        
         Returns:
             True if deletion was successful
         """
+        self.decoded_cache.evict(session_id)
         try:
-            self.redis_client.delete(f"session:{session_id}")
+            await self.redis_client.delete(
+                works_key(session_id),
+                years_key(session_id),
+                timeline_key(session_id),
+                documents_key(session_id),
+                quiz_key(session_id),
+                version_key(session_id),
+                session_key(session_id)
+            )
             return True
         except redis.RedisError:
             return False
     
-    def refresh_session_ttl(self, session_id: str) -> bool:
+    async def refresh_session_ttl(self, session_id: str) -> bool:
         """
         Reset the TTL for a session.
         
         Args:
             session_id: Unique session identifier
-            
+        
         Returns:
             True if TTL was refreshed successfully
         """
         try:
-            return self.redis_client.expire(
-                f"session:{session_id}",
-                settings.session_ttl_seconds
-            )
+            async with self.redis_client.pipeline(transaction=False) as pipe:
+                self._queue_touch(pipe, session_id)
+                version_refreshed, *_, legacy_refreshed = await pipe.execute()
+            return bool(version_refreshed or legacy_refreshed)
         except redis.RedisError:
             return False
 
@@ -0,0 +1,90 @@
+"""
+Per-request Redis command accounting.
+Counts the round trips and commands issued through the shared client inside
+a count_commands() block, so tests and benchmarks can check how often an
+endpoint talks to Redis, and records the latency of each one as a metric.
+"""
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Iterator, List, Optional
+import redis.asyncio as redis
+from redis.asyncio.client import Pipeline
+from pydantic import BaseModel
+from app.services.metrics import count_redis_commands, observe_redis_command
+
+
+class CommandStats(BaseModel):
+    """Redis traffic observed while counting was active."""
+    round_trips: int = 0
+    commands: int = 0
+
+
+_current_stats: ContextVar[Optional[CommandStats]] = ContextVar("redis_command_stats", default=None)
+
+
+@contextmanager
+def count_commands() -> Iterator[CommandStats]:
+    """
+    Count Redis traffic in the current context.
+    
+    Tasks started inside the block inherit the counter, so a request
+    handler and everything it awaits are included.
+    
+    Yields:
+        CommandStats updated in place as commands are sent
+    """
+    stats = CommandStats()
+    token = _current_stats.set(stats)
+    try:
+        yield stats
+    finally:
+        _current_stats.reset(token)
+
+
+def _record(commands: int) -> None:
+    """Add one round trip carrying the given number of commands."""
+    stats = _current_stats.get()
+    if stats is not None:
+        stats.round_trips += 1
+        stats.commands += commands
+
+
+class CountingPipeline(Pipeline):
+    """Pipeline that reports each execute() as a single round trip."""
+    
+    async def execute(self, raise_on_error: bool = True) -> List[Any]:
+        """Send the queued commands (MULTI/EXEC are not counted)."""
+        if not self.command_stack:
+            return await super().execute(raise_on_error)
+        
+        _record(len(self.command_stack))
+        # One fixed latency label keeps the series count bounded; the
+        # commands inside are counted individually instead
+        count_redis_commands(str(args[0]).upper() for args, _ in self.command_stack)
+        start = time.perf_counter()
+        try:
+            return await super().execute(raise_on_error)
+        finally:
+            observe_redis_command("pipeline", time.perf_counter() - start)
+
+
+class CountingRedis(redis.Redis):
+    """Redis client that reports every command and pipeline it sends."""
+    
+    async def execute_command(self, *args, **options) -> Any:
+        """Send a single command."""
+        _record(1)
+        command = str(args[0]).upper()
+        count_redis_commands([command])
+        start = time.perf_counter()
+        try:
+            return await super().execute_command(*args, **options)
+        finally:
+            observe_redis_command(command, time.perf_counter() - start)
+    
+    def pipeline(self, transaction: bool = True, shard_hint: Optional[str] = None) -> CountingPipeline:
+        """Return a counting pipeline on the same connection pool."""
+        return CountingPipeline(
+            self.connection_pool, self.response_callbacks, transaction, shard_hint
+        )
@@ -0,0 +1,154 @@
+"""
+Request-scoped session access.
+Binds the session store to the current session and extends the session's
+sliding TTL as part of its reads, at most once per refresh interval.
+"""
+import time
+from collections import OrderedDict
+from typing import Collection, Dict, List, Optional, Tuple
+from uuid import UUID
+from app.config import settings
+from app.models.schemas import QuizQuestion, SourceDocument, StoredWorkItem
+from app.services.session_documents import DocumentMerge
+from app.services.session_store import SessionStore, SessionUpdate
+
+
+class TouchDebouncer:
+    """
+    Per-worker record of when each session's TTL was last extended.
+    
+    A session read within interval_seconds of the previous refresh does
+    not refresh again; with a TTL of hours, expiring up to one interval
+    early is an acceptable price for skipping an EXPIRE on every click.
+    """
+    
+    def __init__(self, interval_seconds: float, max_sessions: int):
+        """
+        Initialize an empty record.
+        
+        Args:
+            interval_seconds: Minimum time between refreshes of one session
+            max_sessions: Sessions remembered; the oldest are forgotten first
+        """
+        self.interval_seconds = interval_seconds
+        self.max_sessions = max_sessions
+        self._touched: "OrderedDict[str, float]" = OrderedDict()
+    
+    def due(self, session_id: str) -> bool:
+        """True (and recorded as touched now) if the session needs a refresh."""
+        now = time.monotonic()
+        last = self._touched.get(session_id)
+        if last is not None and now - last < self.interval_seconds:
+            return False
+        self.mark(session_id, now)
+        return True
+    
+    def mark(self, session_id: str, now: Optional[float] = None) -> None:
+        """Record that the session's TTL was just set."""
+        self._touched[session_id] = time.monotonic() if now is None else now
+        self._touched.move_to_end(session_id)
+        while len(self._touched) > self.max_sessions:
+            self._touched.popitem(last=False)
+    
+    def forget(self, session_id: str) -> None:
+        """Drop the record, e.g. for a session that does not exist."""
+        self._touched.pop(session_id, None)
+
+
+class SessionAccessor:
+    """
+    One request's view of its session.
+    
+    Every read passes touch=True to the store only when the debouncer says
+    a refresh is due, so the store can fold the EXPIRE into the read's own
+    round trip instead of a separate refresh_session_ttl() call.
+    """
+    
+    def __init__(self, store: SessionStore, session_id: str, debouncer: TouchDebouncer):
+        """
+        Bind a store to a session.
+        
+        Args:
+            store: The configured session store backend
+            session_id: The current request's session ID
+            debouncer: Worker-wide refresh record
+        """
+        self.store = store
+        self.session_id = session_id
+        self.debouncer = debouncer
+    
+    async def get_data(self) -> Optional[List[StoredWorkItem]]:
+        """All works of the session, or None if it does not exist."""
+        works = await self.store.get_session_data(self.session_id, touch=self._touch())
+        return self._seen(works)
+    
+    async def get_works(self, work_ids: List[UUID]) -> Optional[Dict[UUID, StoredWorkItem]]:
+        """The requested works of the session, or None if it does not exist."""
+        works = await self.store.get_session_works(self.session_id, work_ids, touch=self._touch())
+        return self._seen(works)
+    
+    async def next_quiz_questions(self, count: int = 1) -> Optional[List[QuizQuestion]]:
+        """The next questions of the session's quiz deck, or None if it has no works."""
+        questions = await self.store.next_quiz_questions(self.session_id, count, touch=self._touch())
+        return self._seen(questions)
+    
+    async def get_documents(self) -> Dict[str, SourceDocument]:
+        """The session's source documents by name; empty if it has none."""
+        return await self.store.get_session_documents(self.session_id)
+    
+    async def get_timeline_page(
+        self,
+        from_year: Optional[int] = None,
+        to_year: Optional[int] = None,
+        cursor: Optional[str] = None,
+        limit: Optional[int] = None
+    ) -> Optional[Tuple[List[StoredWorkItem], Optional[str]]]:
+        """One year-ordered page of the session, or None if it does not exist."""
+        page = await self.store.get_timeline_page(
+            self.session_id, from_year, to_year, cursor, limit, touch=self._touch()
+        )
+        return self._seen(page)
+    
+    async def get_timeline_json(
+        self,
+        known_versions: Collection[str] = ()
+    ) -> Optional[Tuple[str, Optional[str]]]:
+        """The precomputed timeline body and version, or None if the session does not exist."""
+        timeline = await self.store.get_timeline_json(
+            self.session_id, known_versions, touch=self._touch()
+        )
+        return self._seen(timeline)
+    
+    async def save(
+        self,
+        works: List[StoredWorkItem],
+        documents: Optional[Dict[str, SourceDocument]] = None
+    ) -> bool:
+        """Replace the session's works and documents; saving also restarts the TTL."""
+        saved = await self.store.save_session_data(self.session_id, works, documents)
+        self.debouncer.mark(self.session_id)
+        return saved
+    
+    async def update(self, update: SessionUpdate) -> Optional[DocumentMerge]:
+        """Atomically apply an update to the session; saving also restarts the TTL."""
+        merge = await self.store.update_session_data(self.session_id, update)
+        if merge is not None:
+            self.debouncer.mark(self.session_id)
+        return merge
+    
+    def _touch(self) -> bool:
+        """Whether this read should extend the session's TTL."""
+        return self.debouncer.due(self.session_id)
+    
+    def _seen(self, result):
+        """Pass a read result through, forgetting sessions that do not exist."""
+        if result is None:
+            self.debouncer.forget(self.session_id)
+        return result
+
+
+# Global TTL refresh record shared by all requests of this worker
+session_touch_debouncer = TouchDebouncer(
+    interval_seconds=settings.session_ttl_refresh_interval_seconds,
+    max_sessions=settings.session_memory_max_sessions
+)
@@ -0,0 +1,316 @@
+"""
+Compact binary encoding of session data.
+Works are stored as a 16-byte binary UUID, a varint year and length-prefixed
+UTF-8 text instead of one JSON object each, with authors interned in a
+per-session table. Every encoded value starts with a marker byte that never
+begins JSON text, then a format version and its kind, so values written as
+JSON before still load. Values above a size threshold are compressed with
+zstd.
+"""
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple, Union
+from uuid import UUID
+import zstandard
+from app.models.schemas import QuizQuestion, StoredWorkItem
+
+
+# First byte of every encoded value; 0xC1 starts neither JSON text nor any UTF-8
+FORMAT_MARKER = 0xC1
+FORMAT_VERSION = 1
+MARKER = bytes((FORMAT_MARKER,))
+
+# Kinds of value, in the low bits of the third header byte
+KIND_WORK = 1
+KIND_AUTHORS = 2
+KIND_QUESTION = 3
+KIND_TEXT = 4
+FLAG_ZSTD = 0x80
+
+# Redis clients decoding replies to str must use this error handler, so
+# that binary values survive the round trip; see as_bytes()
+REDIS_ENCODING_ERRORS = "surrogateescape"
+
+RawValue = Union[str, bytes]
+
+
+def as_bytes(raw: RawValue) -> bytes:
+    """Recover the stored bytes of a value a decoding Redis client returned as str."""
+    return raw if isinstance(raw, bytes) else raw.encode("utf-8", REDIS_ENCODING_ERRORS)
+
+
+def _write_varint(out: bytearray, value: int) -> None:
+    """Append an unsigned LEB128 varint."""
+    while value > 0x7F:
+        out.append(value & 0x7F | 0x80)
+        value >>= 7
+    out.append(value)
+
+
+def _write_signed(out: bytearray, value: int) -> None:
+    """Append a zigzag varint, so years BCE stay short too."""
+    _write_varint(out, value * 2 if value >= 0 else -value * 2 - 1)
+
+
+def _write_text(out: bytearray, text: str) -> None:
+    """Append length-prefixed UTF-8."""
+    encoded = text.encode("utf-8")
+    _write_varint(out, len(encoded))
+    out += encoded
+
+
+def _read_varint(data: bytes, position: int) -> Tuple[int, int]:
+    """Read an unsigned varint; returns it and the position after it."""
+    byte = data[position]
+    value, shift = byte & 0x7F, 7
+    while byte >= 0x80:
+        position += 1
+        byte = data[position]
+        value |= (byte & 0x7F) << shift
+        shift += 7
+    return value, position + 1
+
+
+def _read_signed(data: bytes, position: int) -> Tuple[int, int]:
+    """Read a zigzag varint; returns it and the position after it."""
+    value, position = _read_varint(data, position)
+    return (value >> 1) ^ -(value & 1), position
+
+
+def _read_text(data: bytes, position: int) -> Tuple[str, int]:
+    """Read length-prefixed UTF-8; returns it and the position after it."""
+    length, position = _read_varint(data, position)
+    end = position + length
+    if end > len(data):
+        raise IndexError(end)
+    return data[position:end].decode("utf-8"), end
+
+
+class AuthorTable:
+    """
+    A session's distinct authors, each stored once.
+    
+    Works refer to their author by reference: 0 for none, otherwise the
+    author's position in the table plus one.
+    """
+    
+    def __init__(self, authors: Sequence[str] = ()):
+        self.authors = list(authors)
+        self.positions = {author: position for position, author in enumerate(self.authors)}
+    
+    def ref(self, author: Optional[str]) -> int:
+        """Reference to an author, adding it to the table if new."""
+        if author is None:
+            return 0
+        position = self.positions.get(author)
+        if position is None:
+            position = self.positions[author] = len(self.authors)
+            self.authors.append(author)
+        return position + 1
+    
+    def lookup(self, ref: int) -> Optional[str]:
+        """The author a reference stands for."""
+        if ref == 0:
+            return None
+        if ref > len(self.authors):
+            raise ValueError(f"Unknown author reference {ref}")
+        return self.authors[ref - 1]
+
+
+class SessionCodec:
+    """Encodes session values for Redis and decodes them in any format version."""
+    
+    def __init__(self, compact: bool = True, compress_min_bytes: int = 1024, compress_level: int = 3):
+        """
+        Args:
+            compact: Write the binary format; when False, values are written
+                as JSON so that workers without this codec can read them
+            compress_min_bytes: Encoded values at least this large are
+                compressed with zstd; 0 disables compression
+            compress_level: zstd compression level
+        """
+        self.compact = compact
+        self.compress_min_bytes = compress_min_bytes
+        self.compressor = zstandard.ZstdCompressor(level=compress_level)
+        self.decompressor = zstandard.ZstdDecompressor()
+    
+    def pack(self, kind: int, body: bytes) -> bytes:
+        """Prefix a body with the format header, compressing it if large."""
+        if self.compress_min_bytes and len(body) >= self.compress_min_bytes:
+            compressed = self.compressor.compress(body)
+            if len(compressed) < len(body):
+                return bytes((FORMAT_MARKER, FORMAT_VERSION, kind | FLAG_ZSTD)) + compressed
+        return bytes((FORMAT_MARKER, FORMAT_VERSION, kind)) + body
+    
+    def unpack(self, payload: bytes) -> Tuple[int, bytes]:
+        """
+        Check the header of an encoded value and return its kind and body.
+        
+        Raises:
+            ValueError: If the value has an unknown version or is corrupted
+        """
+        if len(payload) < 3:
+            raise ValueError("Truncated session value")
+        if payload[1] != FORMAT_VERSION:
+            raise ValueError(f"Unsupported session encoding version {payload[1]}")
+        kind, body = payload[2], payload[3:]
+        if kind & FLAG_ZSTD:
+            try:
+                body = self.decompressor.decompress(body)
+            except zstandard.ZstdError as e:
+                raise ValueError(f"Corrupted compressed value: {e}")
+        return kind & ~FLAG_ZSTD, body
+    
+    def encode_works(self, works: List[StoredWorkItem]) -> Tuple[Dict[str, RawValue], Optional[bytes]]:
+        """
+        Encode a session's works for its hash.
+        
+        Returns:
+            Tuple of (values keyed by work UUID, author table value or None
+            when there is nothing to intern or the JSON format is written)
+        """
+        if not self.compact:
+            return {str(work.id): work.model_dump_json() for work in works}, None
+        
+        table = AuthorTable()
+        values: Dict[str, RawValue] = {}
+        for work in works:
+            out = bytearray(work.id.bytes)
+            _write_signed(out, work.year)
+            _write_text(out, work.title)
+            _write_varint(out, table.ref(work.author_or_source))
+            values[str(work.id)] = self.pack(KIND_WORK, bytes(out))
+        
+        if not table.authors:
+            return values, None
+        out = bytearray()
+        _write_varint(out, len(table.authors))
+        for author in table.authors:
+            _write_text(out, author)
+        return values, self.pack(KIND_AUTHORS, bytes(out))
+    
+    def decode_works(self, raw_values: Iterable[RawValue]) -> List[StoredWorkItem]:
+        """
+        Decode values read from a session's hash, in any format.
+        
+        The author table may be among the values, in any position; JSON
+        values written before the binary format existed are decoded as such.
+        
+        Raises:
+            ValueError: If a value is corrupted
+        """
+        table = AuthorTable()
+        bodies: List[bytes] = []
+        works: List[StoredWorkItem] = []
+        for raw in raw_values:
+            payload = as_bytes(raw)
+            if payload[:1] != MARKER:
+                works.append(StoredWorkItem.model_validate_json(payload))
+                continue
+            kind, body = self.unpack(payload)
+            if kind == KIND_AUTHORS:
+                table = AuthorTable(self._decode_authors(body))
+            elif kind == KIND_WORK:
+                bodies.append(body)
+            else:
+                raise ValueError(f"Unexpected value of kind {kind} among works")
+        
+        try:
+            for body in bodies:
+                year, position = _read_signed(body, 16)
+                title, position = _read_text(body, position)
+                ref, _ = _read_varint(body, position)
+                works.append(StoredWorkItem(
+                    title=title,
+                    author_or_source=table.lookup(ref),
+                    year=year,
+                    id=UUID(bytes=body[:16])
+                ))
+        except IndexError:
+            raise ValueError("Truncated session value")
+        return works
+    
+    def _decode_authors(self, body: bytes) -> List[str]:
+        """Decode the body of an author table."""
+        try:
+            count, position = _read_varint(body, 0)
+            authors = []
+            for _ in range(count):
+                author, position = _read_text(body, position)
+                authors.append(author)
+            return authors
+        except IndexError:
+            raise ValueError("Truncated session value")
+    
+    def encode_question(self, question: QuizQuestion) -> RawValue:
+        """Encode a quiz question; authors are inlined so it can be read alone."""
+        if not self.compact:
+            return question.model_dump_json()
+        out = bytearray(question.work_id.bytes)
+        _write_text(out, question.title)
+        if question.author_or_source is None:
+            out.append(0)
+        else:
+            out.append(1)
+            _write_text(out, question.author_or_source)
+        _write_varint(out, len(question.year_options))
+        for year in question.year_options:
+            _write_signed(out, year)
+        return self.pack(KIND_QUESTION, bytes(out))
+    
+    def decode_question(self, raw: RawValue) -> QuizQuestion:
+        """
+        Decode a quiz question in any format.
+        
+        Raises:
+            ValueError: If the value is corrupted
+        """
+        payload = as_bytes(raw)
+        if payload[:1] != MARKER:
+            return QuizQuestion.model_validate_json(payload)
+        kind, body = self.unpack(payload)
+        if kind != KIND_QUESTION:
+            raise ValueError(f"Expected a quiz question, found a value of kind {kind}")
+        try:
+            title, position = _read_text(body, 16)
+            author = None
+            if body[position]:
+                author, position = _read_text(body, position + 1)
+            else:
+                position += 1
+            count, position = _read_varint(body, position)
+            year_options = []
+            for _ in range(count):
+                year, position = _read_signed(body, position)
+                year_options.append(year)
+        except IndexError:
+            raise ValueError("Truncated session value")
+        return QuizQuestion(
+            work_id=UUID(bytes=body[:16]),
+            title=title,
+            author_or_source=author,
+            year_options=year_options
+        )
+    
+    def encode_text(self, text: str) -> RawValue:
+        """
+        Encode a large text value such as a rendered response body.
+        
+        Text below the compression threshold is stored unchanged.
+        """
+        if not self.compact or not self.compress_min_bytes or len(text) < self.compress_min_bytes:
+            return text
+        return self.pack(KIND_TEXT, text.encode("utf-8"))
+    
+    def decode_text(self, raw: RawValue) -> str:
+        """
+        Decode a text value in any format.
+        
+        Raises:
+            ValueError: If the value is corrupted
+        """
+        payload = as_bytes(raw)
+        if payload[:1] != MARKER:
+            return payload.decode("utf-8")
+        kind, body = self.unpack(payload)
+        if kind != KIND_TEXT:
+            raise ValueError(f"Expected text, found a value of kind {kind}")
+        return body.decode("utf-8")
@@ -0,0 +1,170 @@
+"""
+Multi-document sessions.
+Records which source document contributed which works, so an appended
+upload only needs extracting when the document is new or has changed, and
+merges its works into the session without duplicating existing ones.
+"""
+import hashlib
+from typing import Collection, Dict, List, Optional, Tuple
+from uuid import UUID
+from pydantic import BaseModel
+from app.models.schemas import AIExtractedWork, SourceDocument, StoredWorkItem
+from app.services.normalization import normalize_text, title_identity
+
+
+# Name of the implicit document holding the works a session already had
+# before its first appended document, e.g. from a whole-session upload;
+# uploaded files always have a name, so it never clashes with one
+BASE_DOCUMENT = ""
+
+
+def content_hash(text: str) -> str:
+    """Hash identifying the content of a source document."""
+    return hashlib.blake2b(text.encode("utf-8"), digest_size=16).hexdigest()
+
+
+def match_key(work: AIExtractedWork) -> Tuple[str, str]:
+    """Identity of a work across documents: its normalized title and author."""
+    return title_identity(work.title), normalize_text(work.author_or_source)
+
+
+def with_base_document(
+    works: List[StoredWorkItem],
+    documents: Dict[str, SourceDocument]
+) -> Dict[str, SourceDocument]:
+    """
+    Record the works no document refers to under BASE_DOCUMENT.
+    
+    Appended documents can then claim those works too without taking them
+    along when they are removed.
+    """
+    referenced = {work_id for document in documents.values() for work_id in document.work_ids}
+    unclaimed = [work.id for work in works if work.id not in referenced]
+    if not unclaimed:
+        return documents
+    base = documents.get(BASE_DOCUMENT)
+    return {
+        **documents,
+        BASE_DOCUMENT: SourceDocument(
+            name=BASE_DOCUMENT,
+            content_hash="",
+            work_ids=(base.work_ids if base else []) + unclaimed
+        )
+    }
+
+
+class DocumentMerge(BaseModel):
+    """A session's works and documents after adding or removing a document."""
+    works: List[StoredWorkItem]
+    documents: Dict[str, SourceDocument]
+    works_added: int
+    works_removed: int
+    works_updated: int = 0  # Works whose year a changed document corrected
+
+
+def merge_document(
+    works: List[StoredWorkItem],
+    documents: Dict[str, SourceDocument],
+    name: str,
+    document_hash: str,
+    extracted: List[AIExtractedWork]
+) -> DocumentMerge:
+    """
+    Add a document's extracted works to a session, replacing any earlier
+    version of the same document.
+    
+    Extracted works are matched against the session through a dictionary
+    keyed by match_key, so merging takes O(n + m) for n session works and m
+    extracted ones. A match keeps the existing work and its ID; when no
+    other document refers to it, the new extraction's year replaces the
+    old one, so a changed document can correct it. Works only the earlier
+    version of the document contributed are dropped, while those the
+    session had before its first appended document are kept.
+    
+    Args:
+        works: The session's current works
+        documents: The session's current documents, by name
+        name: Name of the uploaded document
+        document_hash: content_hash of the uploaded document
+        extracted: Works extracted from it
+    """
+    documents = with_base_document(works, documents)
+    referenced_elsewhere = {
+        work_id
+        for other, document in documents.items() if other != name
+        for work_id in document.work_ids
+    }
+    
+    index = {match_key(work): work for work in works}
+    added: List[StoredWorkItem] = []
+    updated: Dict[UUID, StoredWorkItem] = {}
+    work_ids: Dict[UUID, None] = {}  # Ordered set; a document may mention a work twice
+    for extracted_work in extracted:
+        key = match_key(extracted_work)
+        work = index.get(key)
+        if work is None:
+            work = StoredWorkItem(**extracted_work.model_dump())
+            index[key] = work
+            added.append(work)
+        elif (
+            work.year != extracted_work.year
+            and work.id not in referenced_elsewhere
+            and work.id not in work_ids
+        ):
+            work = work.model_copy(update={"year": extracted_work.year})
+            index[key] = updated[work.id] = work
+        work_ids[work.id] = None
+    
+    previous = documents.get(name)
+    documents = {
+        **documents,
+        name: SourceDocument(name=name, content_hash=document_hash, work_ids=list(work_ids))
+    }
+    current = [updated.get(work.id, work) for work in works] if updated else works
+    merged = _drop_unreferenced(current + added, documents, previous.work_ids if previous else ())
+    return DocumentMerge(
+        works=merged,
+        documents=documents,
+        works_added=len(added),
+        works_removed=len(works) + len(added) - len(merged),
+        works_updated=len(updated)
+    )
+
+
+def remove_document(
+    works: List[StoredWorkItem],
+    documents: Dict[str, SourceDocument],
+    name: str
+) -> Optional[DocumentMerge]:
+    """
+    Drop a document and the works no other document contributed.
+    
+    Returns:
+        The session after removal, or None if it has no such document
+    """
+    previous = documents.get(name)
+    if previous is None or name == BASE_DOCUMENT:
+        return None
+    documents = {other: document for other, document in documents.items() if other != name}
+    remaining = _drop_unreferenced(works, documents, previous.work_ids)
+    return DocumentMerge(
+        works=remaining,
+        documents=documents,
+        works_added=0,
+        works_removed=len(works) - len(remaining)
+    )
+
+
+def _drop_unreferenced(
+    works: List[StoredWorkItem],
+    documents: Dict[str, SourceDocument],
+    candidate_ids: Collection[UUID]
+) -> List[StoredWorkItem]:
+    """
+    Remove the candidate works that no document refers to any more.
+    
+    Works outside candidate_ids are always kept.
+    """
+    referenced = {work_id for document in documents.values() for work_id in document.work_ids}
+    orphaned = set(candidate_ids) - referenced
+    return [work for work in works if work.id not in orphaned] if orphaned else works
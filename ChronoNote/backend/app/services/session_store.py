@@ -0,0 +1,265 @@
+"""
+Session store interface.
+Routes depend on this abstraction; RedisService and MemorySessionStore are
+the available backends, selected with the SESSION_STORE_BACKEND setting.
+"""
+import hashlib
+from abc import ABC, abstractmethod
+from typing import Callable, Collection, Dict, List, Optional, Tuple
+from uuid import UUID, uuid4
+from app.models.schemas import QuizQuestion, SourceDocument, StoredWorkItem, TimelineResponse
+from app.services.session_documents import DocumentMerge
+
+
+# Computes a session's new works and documents from its current ones (works
+# are None if the session does not exist); returns None to leave it unchanged
+SessionUpdate = Callable[[Optional[List[StoredWorkItem]], Dict[str, SourceDocument]], Optional[DocumentMerge]]
+
+
+class InvalidCursorError(ValueError):
+    """Raised when a timeline cursor is malformed or refers to replaced data."""
+
+
+def timeline_order(work: StoredWorkItem) -> Tuple[int, str]:
+    """Sort key of the timeline: year, then ID so equal years are stable."""
+    return (work.year, str(work.id))
+
+
+def render_timeline(works: List[StoredWorkItem]) -> Tuple[str, str]:
+    """
+    Build the final /api/timeline body for a session once, at save time.
+    
+    Returns:
+        Tuple of (version, body): the JSON body of the year-sorted
+        TimelineResponse and a content hash of it, used as the session's
+        version stamp and as the response's strong ETag
+    """
+    body = TimelineResponse(works=sorted(works, key=timeline_order)).model_dump_json()
+    version = hashlib.blake2b(body.encode("utf-8"), digest_size=16).hexdigest()
+    return version, body
+
+
+def partial_version() -> str:
+    """
+    Version stamp for a session saved while its upload is still running.
+    
+    Its timeline is not rendered yet, so there is no content hash to use;
+    a random stamp still tells caches, ETags and cursors that it changed.
+    """
+    return f"partial-{uuid4().hex}"
+
+
+class SessionStore(ABC):
+    """Storage for per-session timeline data with sliding expiration."""
+    
+    async def connect(self) -> bool:
+        """
+        Prepare the backend at application startup.
+        
+        Returns:
+            True if the backend is usable
+        """
+        return await self.ping()
+    
+    async def close(self) -> None:
+        """Release backend resources at application shutdown."""
+    
+    @abstractmethod
+    async def ping(self) -> bool:
+        """
+        Check that the backend is reachable.
+        
+        Returns:
+            True if the backend is usable, False otherwise
+        """
+    
+    @abstractmethod
+    async def save_session_data(
+        self,
+        session_id: str,
+        works: List[StoredWorkItem],
+        documents: Optional[Dict[str, SourceDocument]] = None
+    ) -> bool:
+        """
+        Save timeline data for a session, replacing any previous data,
+        and start its TTL.
+        
+        Args:
+            session_id: Unique session identifier
+            works: The session's works
+            documents: Source documents of an appended session, by name;
+                None for a session replaced by a single upload
+        
+        Returns:
+            True if save was successful
+        """
+    
+    @abstractmethod
+    async def update_session_data(self, session_id: str, update: SessionUpdate) -> Optional[DocumentMerge]:
+        """
+        Read a session, apply an update to it and save the result atomically.
+        
+        Concurrent updates of the same session, such as two documents
+        appended at once, are applied one after the other, so neither is
+        lost; update may therefore be called more than once.
+        
+        Args:
+            session_id: Unique session identifier
+            update: Computes the new works and documents
+        
+        Returns:
+            The update's result as saved, or None if it made no change
+        """
+    
+    @abstractmethod
+    async def save_partial_session_data(self, session_id: str, works: List[StoredWorkItem]) -> bool:
+        """
+        Save the works an upload in progress has found so far, replacing
+        any previous data, and start the session's TTL.
+        
+        Unlike save_session_data, the timeline body is not rendered and no
+        quiz deck is dealt, so frequent saves stay cheap; both are prepared
+        on first use, or by save_session_data once the upload is done.
+        
+        Args:
+            session_id: Unique session identifier
+            works: The works found so far
+        
+        Returns:
+            True if save was successful
+        """
+    
+    @abstractmethod
+    async def get_session_data(
+        self,
+        session_id: str,
+        touch: bool = False
+    ) -> Optional[List[StoredWorkItem]]:
+        """
+        Retrieve timeline data for a session.
+        
+        With touch=True the session's TTL is also reset, in the same
+        round trip where the backend allows it.
+        
+        Returns:
+            List of StoredWorkItem objects (in no guaranteed order) or None
+            if session not found or expired
+        """
+    
+    @abstractmethod
+    async def get_session_works(
+        self,
+        session_id: str,
+        work_ids: List[UUID],
+        touch: bool = False
+    ) -> Optional[Dict[UUID, StoredWorkItem]]:
+        """
+        Retrieve only the requested works of a session, resetting its TTL
+        as well when touch is True.
+        
+        Returns:
+            Dictionary of the works found, keyed by ID (unknown IDs are
+            absent), or None if session not found or expired
+        """
+    
+    @abstractmethod
+    async def get_session_documents(self, session_id: str) -> Dict[str, SourceDocument]:
+        """
+        Retrieve the source documents saved with a session's works.
+        
+        Returns:
+            Documents by name; empty if the session has none or does not exist
+        """
+    
+    @abstractmethod
+    async def get_timeline_page(
+        self,
+        session_id: str,
+        from_year: Optional[int] = None,
+        to_year: Optional[int] = None,
+        cursor: Optional[str] = None,
+        limit: Optional[int] = None,
+        touch: bool = False
+    ) -> Optional[Tuple[List[StoredWorkItem], Optional[str]]]:
+        """
+        Retrieve works in year order, optionally within a year range and
+        one page at a time.
+        
+        Works with equal years are ordered by ID, so pages are stable.
+        
+        Args:
+            session_id: Unique session identifier
+            from_year: Inclusive lower bound on the year
+            to_year: Inclusive upper bound on the year
+            cursor: Opaque cursor returned with the previous page
+            limit: Maximum number of works to return (None for all)
+            touch: Also reset the session's TTL
+        
+        Returns:
+            Tuple of (works, next_cursor), where next_cursor is None on the
+            last page, or None if session not found or expired
+        
+        Raises:
+            InvalidCursorError: If the cursor is malformed or stale
+        """
+    
+    @abstractmethod
+    async def get_timeline_json(
+        self,
+        session_id: str,
+        known_versions: Collection[str] = (),
+        touch: bool = False
+    ) -> Optional[Tuple[str, Optional[str]]]:
+        """
+        Retrieve the precomputed JSON body of the full timeline.
+        
+        Args:
+            session_id: Unique session identifier
+            known_versions: Versions the client already holds (from If-None-Match)
+            touch: Also reset the session's TTL
+        
+        Returns:
+            Tuple of (version, body), with body None when the version is one
+            of known_versions, or None if session not found or expired
+        """
+    
+    @abstractmethod
+    async def next_quiz_questions(
+        self,
+        session_id: str,
+        count: int = 1,
+        touch: bool = False
+    ) -> Optional[List[QuizQuestion]]:
+        """
+        Take the next questions from the session's quiz deck.
+        
+        The deck is dealt when the session is saved and dealt again once
+        it runs out, so no question repeats within a deck.
+        
+        Args:
+            session_id: Unique session identifier
+            count: Number of questions to take
+            touch: Also reset the session's TTL
+        
+        Returns:
+            count questions in deck order, or None if session not found,
+            expired or without works
+        """
+    
+    @abstractmethod
+    async def delete_session_data(self, session_id: str) -> bool:
+        """
+        Delete a session's data.
+        
+        Returns:
+            True if deletion was successful
+        """
+    
+    @abstractmethod
+    async def refresh_session_ttl(self, session_id: str) -> bool:
+        """
+        Reset the TTL for a session.
+        
+        Returns:
+            True if the session exists and its TTL was refreshed
+        """
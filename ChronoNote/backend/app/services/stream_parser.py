@@ -0,0 +1,113 @@
+"""
+Incremental parser for streamed Gemini responses.
+Yields each object of the {"works": [...]} envelope as soon as it is complete.
+"""
+import json
+from typing import Any, Callable, Dict, List, Optional
+
+
+class WorksStreamParser:
+    """
+    Incremental scanner for the `works` array of the AI response envelope.
+    
+    Text is fed in arbitrary pieces. The scanner skips everything up to the
+    array that follows the "works" key (including ```json fences), then
+    tracks string and brace state so each top-level object in the array is
+    decoded once its closing brace arrives.
+    """
+    
+    def __init__(self, repair: Optional[Callable[[str], Optional[Any]]] = None):
+        """
+        Initialize an empty scanner.
+        
+        Args:
+            repair: Called with the raw text of an object that is not valid
+                JSON; returns the decoded object, or None to skip it. Without
+                it, invalid objects raise ValueError.
+        """
+        self._repair = repair
+        self.skipped = 0
+        self._buffer = ""
+        self._pos = 0
+        self._in_array = False
+        self._finished = False
+        self._depth = 0
+        self._in_string = False
+        self._escaped = False
+        self._object_start = -1
+    
+    @property
+    def finished(self) -> bool:
+        """True once the closing bracket of the works array has been seen."""
+        return self._finished
+    
+    def feed(self, text: str) -> List[Dict[str, Any]]:
+        """
+        Consume the next piece of response text.
+        
+        Args:
+            text: Newly received text
+        
+        Returns:
+            Work dictionaries completed by this piece, in order
+        
+        Raises:
+            ValueError: If a completed object is not valid JSON and no
+                repair function was given
+        """
+        self._buffer += text
+        completed: List[Dict[str, Any]] = []
+        
+        if not self._in_array and not self._finished:
+            key_index = self._buffer.find('"works"')
+            if key_index == -1:
+                return completed
+            bracket_index = self._buffer.find("[", key_index)
+            if bracket_index == -1:
+                return completed
+            self._in_array = True
+            self._pos = bracket_index + 1
+        
+        while self._in_array and self._pos < len(self._buffer):
+            char = self._buffer[self._pos]
+            
+            if self._in_string:
+                if self._escaped:
+                    self._escaped = False
+                elif char == "\\":
+                    self._escaped = True
+                elif char == '"':
+                    self._in_string = False
+            elif char == '"':
+                self._in_string = True
+            elif char == "{":
+                if self._depth == 0:
+                    self._object_start = self._pos
+                self._depth += 1
+            elif char == "}":
+                self._depth -= 1
+                if self._depth == 0:
+                    raw = self._buffer[self._object_start:self._pos + 1]
+                    try:
+                        completed.append(json.loads(raw))
+                    except json.JSONDecodeError as e:
+                        if self._repair is None:
+                            raise ValueError(f"AI returned invalid JSON: {str(e)}\nItem: {raw[:200]}")
+                        repaired = self._repair(raw)
+                        if repaired is None:
+                            self.skipped += 1
+                        else:
+                            completed.append(repaired)
+                    self._object_start = -1
+            elif char == "]" and self._depth == 0:
+                self._in_array = False
+                self._finished = True
+            
+            self._pos += 1
+        
+        # Drop consumed text that no pending object refers to
+        if self._depth == 0:
+            self._buffer = self._buffer[self._pos:]
+            self._pos = 0
+        
+        return completed
@@ -0,0 +1,115 @@
+"""
+Gemini structured output and recovery of damaged JSON responses.
+Converts the Pydantic response models to the schema subset Gemini accepts,
+and salvages the valid works from responses that are truncated or contain
+malformed items.
+"""
+import json
+import re
+from typing import Any, Dict, List, Optional, Tuple, Type
+from pydantic import BaseModel, ValidationError
+from app.models.schemas import AIExtractedWork
+from app.services.stream_parser import WorksStreamParser
+
+
+# Schema keywords understood by Gemini's response_schema
+SCHEMA_KEYS = ("type", "format", "description", "nullable", "enum", "required")
+
+# A comma directly before a closing brace or bracket, e.g. {"year": 1984,}
+TRAILING_COMMA = re.compile(r",\s*([}\]])")
+
+
+def gemini_schema(model: Type[BaseModel]) -> Dict[str, Any]:
+    """
+    Response schema for a Pydantic model in the form Gemini accepts.
+    
+    Gemini supports neither $ref nor anyOf, so referenced models are
+    inlined and Optional fields become nullable.
+    """
+    schema = model.model_json_schema()
+    return _convert(schema, schema.get("$defs", {}))
+
+
+def _convert(node: Dict[str, Any], defs: Dict[str, Any]) -> Dict[str, Any]:
+    """Convert one JSON schema node, dropping keywords Gemini rejects."""
+    if "$ref" in node:
+        return _convert(defs[node["$ref"].rsplit("/", 1)[-1]], defs)
+    
+    if "anyOf" in node:
+        variants = [variant for variant in node["anyOf"] if variant.get("type") != "null"]
+        converted = _convert(variants[0], defs)
+        if len(variants) < len(node["anyOf"]):
+            converted["nullable"] = True
+        if "description" in node:
+            converted["description"] = node["description"]
+        return converted
+    
+    converted = {key: node[key] for key in SCHEMA_KEYS if key in node}
+    if "items" in node:
+        converted["items"] = _convert(node["items"], defs)
+    if "properties" in node:
+        converted["properties"] = {
+            name: _convert(prop, defs) for name, prop in node["properties"].items()
+        }
+    return converted
+
+
+def strip_code_fences(response_text: str) -> str:
+    """Remove markdown code fences if present (```json ... ```)."""
+    if response_text.startswith('```'):
+        # Find the end of the opening fence
+        first_newline = response_text.find('\n')
+        if first_newline != -1:
+            response_text = response_text[first_newline + 1:]
+        
+        # Remove the closing fence
+        if response_text.endswith('```'):
+            response_text = response_text[:-3].strip()
+    return response_text
+
+
+def repair_object(raw: str) -> Optional[Any]:
+    """Decode one JSON object, tolerating trailing commas; None if it is beyond repair."""
+    for candidate in (raw, TRAILING_COMMA.sub(r"\1", raw)):
+        try:
+            return json.loads(candidate)
+        except json.JSONDecodeError:
+            continue
+    return None
+
+
+class SalvageResult(BaseModel):
+    """Works recovered from a damaged response."""
+    works: List[AIExtractedWork]
+    complete: bool  # The works array was closed, so nothing is missing at the end
+    dropped: Dict[str, int]  # Items given up on, by schema failure reason
+
+
+def salvage_works(response_text: str) -> SalvageResult:
+    """
+    Keep every valid work of a damaged {"works": [...]} response.
+    
+    Items that cannot be decoded or validated are dropped and counted;
+    a response cut off mid-array keeps the works completed before the cut.
+    """
+    parser = WorksStreamParser(repair=repair_object)
+    items = parser.feed(response_text)
+    works: List[AIExtractedWork] = []
+    dropped = {"invalid_json": parser.skipped, "missing_year": 0, "schema_mismatch": 0}
+    for item in items:
+        work, reason = validate_work(item)
+        if work is not None:
+            works.append(work)
+        else:
+            dropped[reason] += 1
+    return SalvageResult(works=works, complete=parser.finished, dropped=dropped)
+
+
+def validate_work(item: Any) -> Tuple[Optional[AIExtractedWork], str]:
+    """Validate one work item; returns the work, or None and the failure reason."""
+    if not isinstance(item, dict) or item.get('year') is None:
+        return None, "missing_year"
+    try:
+        return AIExtractedWork(**item), ""
+    except ValidationError:
+        return None, "schema_mismatch"
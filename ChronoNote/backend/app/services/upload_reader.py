@@ -0,0 +1,94 @@
+"""
+Bounded, incremental reading of uploaded text files.
+Reads an upload in fixed-size chunks, stops as soon as it exceeds the size
+limit, and decodes UTF-8 as it goes so callers can process the text without
+holding the raw bytes and the decoded document at the same time.
+"""
+import codecs
+import io
+import time
+from typing import AsyncIterator
+from fastapi import UploadFile
+
+
+# Bytes read from the upload per step
+UPLOAD_CHUNK_BYTES = 64 * 1024
+
+
+class UploadTooLargeError(Exception):
+    """Raised as soon as an upload grows past the size limit."""
+    
+    def __init__(self, max_bytes: int):
+        super().__init__(f"Upload exceeds {max_bytes} bytes")
+        self.max_bytes = max_bytes
+
+
+class UploadEncodingError(ValueError):
+    """Raised when an upload is not valid UTF-8."""
+    
+    def __init__(self, offset: int, reason: str):
+        super().__init__(f"Invalid UTF-8 at byte offset {offset}: {reason}")
+        self.offset = offset
+        self.reason = reason
+
+
+class UploadTextReader:
+    """
+    Decodes one upload chunk by chunk.
+    
+    Line endings are normalized to LF while decoding. After iteration,
+    size_bytes holds the upload size and read_seconds / decode_seconds the
+    time spent in each step.
+    """
+    
+    def __init__(self, max_bytes: int, chunk_bytes: int = UPLOAD_CHUNK_BYTES):
+        """
+        Args:
+            max_bytes: Largest accepted upload
+            chunk_bytes: Bytes read per step
+        """
+        self.max_bytes = max_bytes
+        self.chunk_bytes = chunk_bytes
+        self.size_bytes = 0
+        self.read_seconds = 0.0
+        self.decode_seconds = 0.0
+    
+    async def iter_text(self, file: UploadFile) -> AsyncIterator[str]:
+        """
+        Yield the decoded text of an upload piece by piece.
+        
+        Raises:
+            UploadTooLargeError: Once more than max_bytes have been read
+            UploadEncodingError: At the first byte that is not valid UTF-8
+        """
+        utf8 = codecs.getincrementaldecoder("utf-8")()
+        decoder = io.IncrementalNewlineDecoder(utf8, translate=True)
+        
+        while True:
+            start = time.perf_counter()
+            chunk = await file.read(self.chunk_bytes)
+            self.read_seconds += time.perf_counter() - start
+            if not chunk:
+                break
+            
+            self.size_bytes += len(chunk)
+            if self.size_bytes > self.max_bytes:
+                raise UploadTooLargeError(self.max_bytes)
+            
+            yield self._decode(utf8, decoder, chunk, final=False)
+        
+        yield self._decode(utf8, decoder, b"", final=True)
+    
+    def _decode(self, utf8: codecs.IncrementalDecoder, decoder: io.IncrementalNewlineDecoder,
+                chunk: bytes, final: bool) -> str:
+        """Decode one chunk, translating errors to absolute byte offsets."""
+        # Bytes of an incomplete character carried over from the previous chunk
+        pending = len(utf8.getstate()[0])
+        start = time.perf_counter()
+        try:
+            return decoder.decode(chunk, final=final)
+        except UnicodeDecodeError as e:
+            offset = self.size_bytes - len(chunk) - pending + e.start
+            raise UploadEncodingError(offset, e.reason)
+        finally:
+            self.decode_seconds += time.perf_counter() - start
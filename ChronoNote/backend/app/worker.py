@@ -0,0 +1,125 @@
+"""
+Standalone extraction worker.
+Consumes the Redis Stream job queue with a configurable number of concurrent
+consumers, using the same AIService and RedisService as the API.
+
+Usage:
+    python -m app.worker
+"""
+import asyncio
+import os
+import random
+import signal
+import socket
+from typing import Dict
+from app.config import settings
+from app.log import get_logger, setup_logging, shutdown_logging
+from app.models.schemas import StoredWorkItem
+from app.services.ai_service import AIServiceBusyError
+from app.services.chunking import chunked_extractor
+from app.services.job_queue import job_queue, RUNNING, DONE
+from app.services.metrics import current_route
+from app.services.redis_service import redis_service
+
+
+# Idle consumers wake up this often to notice shutdown requests
+BLOCK_MS = 5000
+
+logger = get_logger("worker")
+
+
+async def process_job(message_id: str, fields: Dict[str, str]) -> None:
+    """
+    Extract one queued document and store the results in its session.
+    
+    Unlike API requests, jobs have nobody waiting on a 429, so they wait
+    up to job_gemini_queue_timeout_seconds for a Gemini slot. A job that
+    still found every slot taken is not a failure: it is put back in the
+    queue after a randomized backoff, without using up one of its
+    job_max_attempts, until it has been requeued job_max_busy_requeues
+    times.
+    """
+    job_id = fields["job_id"]
+    session_id = fields["session_id"]
+    logger.info("job.started", job_id=job_id, session_id=session_id)
+    
+    try:
+        await job_queue.set_status(job_id, RUNNING)
+        extracted_works = await chunked_extractor.extract(
+            fields["markdown"], settings.job_gemini_queue_timeout_seconds
+        )
+        stored_works = [StoredWorkItem(**work.model_dump()) for work in extracted_works]
+        await redis_service.save_session_data(session_id, stored_works)
+    except AIServiceBusyError as e:
+        backoff = e.retry_after * random.uniform(0.5, 1.5)
+        logger.warning("job.busy", job_id=job_id, backoff_seconds=round(backoff, 2))
+        await asyncio.sleep(backoff)
+        await job_queue.requeue(message_id, fields, str(e))
+        return
+    except Exception as e:
+        logger.error("job.failed", exc_info=True, job_id=job_id, error=str(e))
+        await job_queue.fail(message_id, fields, str(e))
+        return
+    
+    await job_queue.set_status(job_id, DONE, works_count=len(stored_works), error="")
+    await job_queue.ack(message_id)
+    logger.info("job.done", job_id=job_id, works=len(stored_works))
+
+
+async def consume(consumer: str, stop: asyncio.Event) -> None:
+    """Process jobs one at a time until asked to stop."""
+    while not stop.is_set():
+        try:
+            messages = await job_queue.read(consumer, BLOCK_MS)
+        except Exception as e:
+            logger.error("worker.read_failed", consumer=consumer, error=str(e))
+            await asyncio.sleep(1)
+            continue
+        
+        for message_id, fields in messages:
+            try:
+                await process_job(message_id, fields)
+            except Exception as e:
+                # Left pending; XAUTOCLAIM hands the message out again later
+                logger.error(
+                    "job.handling_failed", exc_info=True,
+                    consumer=consumer, message_id=message_id, error=str(e)
+                )
+
+
+async def run_worker() -> None:
+    """Start the configured number of consumers and run until SIGINT/SIGTERM."""
+    setup_logging()
+    # Metrics and logs from jobs are labeled as worker activity
+    current_route.set("worker")
+    stop = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        try:
+            loop.add_signal_handler(sig, stop.set)
+        except NotImplementedError:
+            # Windows event loops do not support signal handlers
+            pass
+    
+    await redis_service.connect()
+    await job_queue.ensure_group()
+    
+    prefix = f"{socket.gethostname()}-{os.getpid()}"
+    consumers = [
+        asyncio.ensure_future(consume(f"{prefix}-{index}", stop))
+        for index in range(settings.job_worker_concurrency)
+    ]
+    logger.info("worker.started", consumers=len(consumers), prefix=prefix)
+    
+    try:
+        # Consumers finish their current job and exit after the stop signal
+        await asyncio.gather(*consumers)
+    finally:
+        await job_queue.close()
+        await redis_service.close()
+        logger.info("worker.stopped")
+        shutdown_logging()
+
+
+if __name__ == "__main__":
+    asyncio.run(run_worker())
@@ -0,0 +1,36 @@
+"""
+Speed of the chronology scoring engine.
+Times score_chronology on tests up to full-timeline size. Its results are
+checked against brute-force references by tests/test_chrono_scoring.py.
+
+Usage:
+    python -m benchmarks.bench_chrono_scoring
+"""
+import argparse
+import random
+import time
+
+from app.services.chrono_scoring import score_chronology
+
+
+def time_scoring(seed: int) -> None:
+    rng = random.Random(seed)
+    print(f"{'items':>8} {'ms per score':>14}")
+    for size in (7, 100, 1000, 10000):
+        years = [rng.randint(1000, 2020) for _ in range(size)]
+        repeats = max(1, 2000 // size)
+        start = time.perf_counter()
+        for _ in range(repeats):
+            score_chronology(years)
+        print(f"{size:>8} {(time.perf_counter() - start) / repeats * 1000:>14.3f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+    time_scoring(args.seed)
+
+
+if __name__ == "__main__":
+    main()
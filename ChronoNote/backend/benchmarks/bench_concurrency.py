@@ -0,0 +1,76 @@
+"""
+Concurrency benchmark for the session read endpoints.
+Measures requests per second served by a single uvicorn worker.
+
+Usage:
+    uvicorn app.main:app --workers 1 --port 8000
+    python -m benchmarks.bench_concurrency --url http://localhost:8000 --concurrency 64
+
+Run it once against the previous (synchronous Redis) build and once against
+the current one to compare requests per second per worker. Requires httpx.
+"""
+import argparse
+import asyncio
+import time
+import uuid
+
+import httpx
+
+from app.config import settings
+from app.models.schemas import StoredWorkItem
+from app.services.redis_service import RedisService
+
+
+SAMPLE_WORKS = [
+    {"title": f"Work {i}", "author_or_source": f"Author {i % 7}", "year": 1500 + i}
+    for i in range(40)
+]
+
+
+async def seed_session() -> str:
+    """Write a synthetic session into Redis and return its ID."""
+    session_id = str(uuid.uuid4())
+    store = RedisService()
+    await store.save_session_data(session_id, [StoredWorkItem(**work) for work in SAMPLE_WORKS])
+    await store.close()
+    return session_id
+
+
+async def run(url: str, path: str, concurrency: int, total: int) -> None:
+    """Fire `total` requests with `concurrency` in flight and report RPS."""
+    session_id = await seed_session()
+    cookies = {settings.session_cookie_name: session_id}
+    latencies = []
+    remaining = iter(range(total))
+    
+    async with httpx.AsyncClient(base_url=url, cookies=cookies, timeout=30) as client:
+        async def worker():
+            for _ in remaining:
+                start = time.perf_counter()
+                response = await client.get(path)
+                response.raise_for_status()
+                latencies.append(time.perf_counter() - start)
+        
+        started = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+        elapsed = time.perf_counter() - started
+    
+    latencies.sort()
+    p50 = latencies[len(latencies) // 2] * 1000
+    p99 = latencies[int(len(latencies) * 0.99) - 1] * 1000
+    print(f"{path}: {total} requests, concurrency {concurrency}")
+    print(f"  {total / elapsed:.1f} req/s  p50 {p50:.2f} ms  p99 {p99:.2f} ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--url", default="http://localhost:8000")
+    parser.add_argument("--path", default="/api/timeline")
+    parser.add_argument("--concurrency", type=int, default=64)
+    parser.add_argument("--requests", type=int, default=5000)
+    args = parser.parse_args()
+    asyncio.run(run(args.url, args.path, args.concurrency, args.requests))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,169 @@
+"""
+Memory per session with the JSON and compact session encodings.
+Saves sample workloads through the Redis session store with each encoding
+and reports the bytes stored per session (and Redis' own MEMORY USAGE with
+a local redis-server), then times encoding and decoding of a full timeline.
+Round trips in every encoding are covered by tests/test_session_codec.py.
+
+Usage:
+    python -m benchmarks.bench_session_encoding --redis fake
+    python -m benchmarks.bench_session_encoding --redis local
+
+Requires fakeredis for --redis fake.
+"""
+import argparse
+import asyncio
+import random
+import sys
+import time
+import uuid
+from typing import Dict, List
+
+from app.models.schemas import StoredWorkItem
+from app.services.redis_service import (
+    RedisService, documents_key, quiz_key, timeline_key, version_key, works_key, years_key
+)
+from app.services.redis_stats import CountingRedis
+from app.services.session_codec import REDIS_ENCODING_ERRORS, SessionCodec, as_bytes
+
+
+WORDS = (
+    "the of and a in history war peace letters on nature essay treatise empire "
+    "revolution kingdom origin species principles mind light theory modern "
+    "journey voyage discourse art government society life death time memoirs"
+).split()
+
+ENCODINGS = {
+    "json": lambda: SessionCodec(compact=False),
+    "compact": lambda: SessionCodec(compress_min_bytes=0),
+    "compact+zstd": lambda: SessionCodec(),
+}
+
+# Name, works per session, distinct authors, share of works without an author
+WORKLOADS = (
+    ("lecture notes", 25, 15, 0.6),
+    ("typical upload", 40, 12, 0.1),
+    ("reading list", 150, 40, 0.05),
+    ("full timeline", 1000, 200, 0.1),
+)
+
+# Columns of the report, by session key
+KEY_GROUPS = {"works": works_key, "years": years_key, "quiz": quiz_key, "timeline": timeline_key}
+
+
+def sample_session(rng: random.Random, count: int, authors: int, anonymous: float) -> List[StoredWorkItem]:
+    """Works with title, author and year distributions like real extractions."""
+    names = [
+        f"{rng.choice(WORDS).title()} {rng.choice(WORDS).title()}{rng.choice(['', ' Jr.', ' de la Cruz'])}"
+        for _ in range(authors)
+    ]
+    return [
+        StoredWorkItem(
+            title=" ".join(rng.choice(WORDS) for _ in range(rng.randint(2, 9))).capitalize(),
+            author_or_source=None if rng.random() < anonymous else rng.choice(names),
+            year=rng.randint(-500, 2020)
+        )
+        for _ in range(count)
+    ]
+
+
+async def stored_bytes(service: RedisService, key: str) -> int:
+    """Bytes of the key name and everything stored under it."""
+    client = service.redis_client
+    kind = await client.type(key)
+    if kind == "string":
+        values = [await client.get(key)]
+    elif kind == "hash":
+        values = [part for item in (await client.hgetall(key)).items() for part in item]
+    elif kind == "list":
+        values = await client.lrange(key, 0, -1)
+    elif kind == "zset":
+        # Members plus their 8-byte scores
+        return len(key) + sum(len(as_bytes(member)) + 8 for member, _ in await client.zrange(key, 0, -1, withscores=True))
+    else:
+        return 0
+    return len(key) + sum(len(as_bytes(value)) for value in values)
+
+
+async def measure(
+    service: RedisService,
+    works: List[StoredWorkItem],
+    local: bool
+) -> Dict[str, int]:
+    """
+    Save one session and size its keys.
+    
+    Returns:
+        Bytes per key group, plus the total and Redis' MEMORY USAGE when
+        available
+    """
+    session_id = str(uuid.uuid4())
+    await service.save_session_data(session_id, works)
+    
+    sizes = {group: await stored_bytes(service, key(session_id)) for group, key in KEY_GROUPS.items()}
+    keys = [key(session_id) for key in KEY_GROUPS.values()] + [version_key(session_id), documents_key(session_id)]
+    sizes["total"] = sum([await stored_bytes(service, key) for key in keys])
+    if local:
+        sizes["redis"] = sum([await service.redis_client.memory_usage(key, samples=0) or 0 for key in keys])
+    await service.delete_session_data(session_id)
+    return sizes
+
+
+def time_codecs(works: List[StoredWorkItem], repeats: int = 20) -> None:
+    """Encode and decode a full timeline's works with each encoding."""
+    print(f"\n{len(works)} works: {'encoding':<14} {'encode us/work':>15} {'decode us/work':>15}")
+    for name, make_codec in ENCODINGS.items():
+        codec = make_codec()
+        start = time.perf_counter()
+        for _ in range(repeats):
+            values, authors = codec.encode_works(works)
+        encode = (time.perf_counter() - start) / repeats / len(works) * 1e6
+        raw = list(values.values()) + ([authors] if authors is not None else [])
+        start = time.perf_counter()
+        for _ in range(repeats):
+            codec.decode_works(raw)
+        decode = (time.perf_counter() - start) / repeats / len(works) * 1e6
+        print(f"{'':>{len(str(len(works))) + 7}}{name:<14} {encode:>15.2f} {decode:>15.2f}")
+
+
+async def run(args: argparse.Namespace) -> int:
+    service = RedisService()
+    if args.redis == "fake":
+        import fakeredis
+        fake = fakeredis.FakeAsyncRedis(decode_responses=True, encoding_errors=REDIS_ENCODING_ERRORS)
+        service.redis_client = CountingRedis(connection_pool=fake.connection_pool)
+    elif not await service.ping():
+        print("Redis not reachable; use --redis fake")
+        return 1
+    local = args.redis == "local"
+    
+    rng = random.Random(args.seed)
+    sessions = {name: sample_session(rng, *shape) for name, *shape in WORKLOADS}
+    
+    columns = list(KEY_GROUPS) + ["total"] + (["redis"] if local else [])
+    print(f"{'workload':<15} {'works':>5} {'encoding':<13}" + "".join(f"{column + ' KB':>12}" for column in columns) + f"{'B/work':>8}")
+    for name, works in sessions.items():
+        for encoding, make_codec in ENCODINGS.items():
+            service.codec = make_codec()
+            sizes = await measure(service, works, local)
+            print(
+                f"{name:<15} {len(works):>5} {encoding:<13}"
+                + "".join(f"{sizes[column] / 1024:>12.1f}" for column in columns)
+                + f"{sizes['redis' if local else 'total'] / len(works):>8.0f}"
+            )
+    
+    time_codecs(sessions["full timeline"])
+    await service.close()
+    return 0
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--redis", choices=["fake", "local"], default="fake")
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+    sys.exit(asyncio.run(run(args)))
+
+
+if __name__ == "__main__":
+    main()
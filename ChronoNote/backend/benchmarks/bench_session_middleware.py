@@ -0,0 +1,127 @@
+"""
+Per-request overhead of the session middleware.
+Calls a trivial endpoint through the ASGI interface directly, without a
+server, so the measured time is dominated by the middleware itself.
+
+Usage:
+    python -m benchmarks.bench_session_middleware --requests 20000
+
+Compares no middleware, the previous BaseHTTPMiddleware implementation
+(reproduced below as the baseline) and the pure ASGI SessionMiddleware
+with unsigned and signed cookies, for new and returning sessions.
+"""
+import argparse
+import asyncio
+import time
+import uuid
+from typing import Dict, List, Optional
+
+from fastapi import Request, Response
+from starlette.applications import Starlette
+from starlette.middleware import Middleware
+from starlette.middleware.base import BaseHTTPMiddleware
+from starlette.responses import PlainTextResponse
+from starlette.routing import Route
+
+from app.config import settings
+from app.middleware.session import SessionMiddleware, sign_session_id
+
+
+class LegacySessionMiddleware(BaseHTTPMiddleware):
+    """The BaseHTTPMiddleware implementation this benchmark compares against."""
+    
+    async def dispatch(self, request: Request, call_next):
+        session_id = request.cookies.get(settings.session_cookie_name)
+        if not session_id:
+            session_id = str(uuid.uuid4())
+            request.state.session_id = session_id
+            request.state.new_session = True
+        else:
+            request.state.session_id = session_id
+            request.state.new_session = False
+        
+        response: Response = await call_next(request)
+        
+        if request.state.new_session:
+            response.set_cookie(
+                key=settings.session_cookie_name,
+                value=session_id,
+                httponly=settings.session_cookie_httponly,
+                secure=settings.session_cookie_secure,
+                samesite=settings.session_cookie_samesite,
+                max_age=settings.session_ttl_seconds
+            )
+        return response
+
+
+async def endpoint(request: Request) -> PlainTextResponse:
+    return PlainTextResponse(getattr(request.state, "session_id", "none"))
+
+
+def build_app(middleware: Optional[type]) -> Starlette:
+    stack = [Middleware(middleware)] if middleware else []
+    return Starlette(routes=[Route("/", endpoint)], middleware=stack)
+
+
+async def time_requests(app: Starlette, cookie: Optional[str], requests: int) -> List[float]:
+    headers = [(b"host", b"bench")]
+    if cookie is not None:
+        headers.append((b"cookie", f"{settings.session_cookie_name}={cookie}".encode("latin-1")))
+    scope = {
+        "type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1",
+        "method": "GET", "scheme": "http", "path": "/", "raw_path": b"/",
+        "root_path": "", "query_string": b"", "headers": headers,
+        "client": ("127.0.0.1", 1234), "server": ("bench", 80),
+    }
+    
+    async def receive():
+        return {"type": "http.request", "body": b"", "more_body": False}
+    
+    async def send(message):
+        pass
+    
+    samples = []
+    for _ in range(requests):
+        start = time.perf_counter()
+        await app(dict(scope), receive, send)
+        samples.append(time.perf_counter() - start)
+    return sorted(samples)
+
+
+async def run(requests: int) -> None:
+    session_id = str(uuid.uuid4())
+    secret = "benchmark-secret"
+    
+    cases: Dict[str, tuple] = {}
+    for label, middleware in (
+        ("none", None),
+        ("BaseHTTPMiddleware", LegacySessionMiddleware),
+        ("pure ASGI", SessionMiddleware),
+    ):
+        cases[f"{label} / new"] = (build_app(middleware), None, "")
+        cases[f"{label} / returning"] = (build_app(middleware), session_id, "")
+    cases["pure ASGI signed / new"] = (build_app(SessionMiddleware), None, secret)
+    cases["pure ASGI signed / returning"] = (
+        build_app(SessionMiddleware), sign_session_id(session_id, secret), secret
+    )
+    
+    print(f"{'case':<32} {'p50 us':>9} {'p99 us':>9}")
+    for label, (app, cookie, secret_key) in cases.items():
+        # The middleware reads the key when the stack is built on the first call
+        settings.session_secret_key = secret_key
+        await time_requests(app, cookie, min(requests, 500))  # Warm up
+        samples = await time_requests(app, cookie, requests)
+        p50 = samples[len(samples) // 2] * 1e6
+        p99 = samples[int(len(samples) * 0.99) - 1] * 1e6
+        print(f"{label:<32} {p50:9.1f} {p99:9.1f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--requests", type=int, default=20000)
+    args = parser.parse_args()
+    asyncio.run(run(args.requests))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,87 @@
+"""
+Session store latency comparison.
+Times save/get/refresh on a realistic session for every session store
+backend. The backends' shared behaviour is covered by
+tests/test_session_store.py.
+
+Usage:
+    python -m benchmarks.bench_session_store --ops 5000
+
+The Redis backend is skipped when no Redis server is reachable.
+"""
+import argparse
+import asyncio
+import time
+import uuid
+from typing import Callable, Dict, List
+
+from app.config import settings
+from app.models.schemas import StoredWorkItem
+from app.services.memory_store import MemorySessionStore
+from app.services.redis_service import RedisService
+from app.services.session_store import SessionStore
+
+
+def sample_works(count: int = 40) -> List[StoredWorkItem]:
+    """Build a session of the size a typical upload produces."""
+    return [
+        StoredWorkItem(title=f"Work {i}", author_or_source=f"Author {i % 7}", year=1500 + i)
+        for i in range(count)
+    ]
+
+
+async def time_ops(store: SessionStore, ops: int) -> Dict[str, List[float]]:
+    """Time each operation on one 40-work session."""
+    session_id = str(uuid.uuid4())
+    works = sample_works()
+    operations: Dict[str, Callable] = {
+        "save": lambda: store.save_session_data(session_id, works),
+        "get": lambda: store.get_session_data(session_id),
+        "refresh": lambda: store.refresh_session_ttl(session_id),
+    }
+    timings: Dict[str, List[float]] = {}
+    for label, operation in operations.items():
+        samples = []
+        for _ in range(ops):
+            start = time.perf_counter()
+            await operation()
+            samples.append(time.perf_counter() - start)
+        timings[label] = sorted(samples)
+    await store.delete_session_data(session_id)
+    return timings
+
+
+def report(name: str, timings: Dict[str, List[float]]) -> None:
+    for label, samples in timings.items():
+        p50 = samples[len(samples) // 2] * 1e6
+        p99 = samples[int(len(samples) * 0.99) - 1] * 1e6
+        print(f"  {name:<7} {label:<8} p50 {p50:9.1f} us  p99 {p99:9.1f} us")
+
+
+async def run(ops: int) -> None:
+    backends: Dict[str, SessionStore] = {
+        "memory": MemorySessionStore(max_sessions=100, ttl_seconds=settings.session_ttl_seconds)
+    }
+    
+    redis_store = RedisService()
+    if await redis_store.ping():
+        backends["redis"] = redis_store
+    else:
+        print("Redis not reachable; skipping the redis backend")
+    
+    print(f"Latency ({ops} ops each)")
+    for name, store in backends.items():
+        report(name, await time_ops(store, ops))
+    
+    await redis_store.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--ops", type=int, default=5000)
+    args = parser.parse_args()
+    asyncio.run(run(args.ops))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,129 @@
+"""
+Peak memory per upload.
+Measures, with tracemalloc, the Python memory an upload needs on top of the
+already spooled file: the previous whole-file read + decode + pre-filter
+against the chunked read_markdown_upload, and how much of an oversized
+body is accepted before UploadLimitMiddleware rejects it.
+
+Usage:
+    python -m benchmarks.bench_upload_memory
+
+The reader's and the limit's behaviour is covered by
+tests/test_upload_reader.py.
+"""
+import asyncio
+import tempfile
+import tracemalloc
+from typing import Awaitable, Callable
+
+from fastapi import FastAPI, File, UploadFile
+
+from app.api.routes import read_markdown_upload
+from app.config import settings
+from app.middleware.upload_limit import UploadLimitMiddleware
+from app.services.prefilter import prefilter_markdown
+
+
+PARAGRAPHS = [
+    "Reading notes on the themes of the novel, to be revisited before the seminar. "
+    "The narrator's voice changes noticeably in the second half of the book.",
+    "\"Pride and Prejudice\" by Jane Austen was published in 1813.",
+    "Compare the treatment of class with the other assigned readings.",
+]
+
+
+def document(size: int) -> bytes:
+    """Notes-like markdown of about `size` bytes, with a few non-ASCII characters."""
+    block = "\n\n".join(PARAGRAPHS + ["Café culture in Paris, ca. 1920 — résumé."]).encode("utf-8")
+    return (block + b"\n\n") * (size // (len(block) + 2) + 1)
+
+
+def spooled_upload(data: bytes) -> UploadFile:
+    """An UploadFile as Starlette hands it to the endpoint: spooled, rewound."""
+    spool = tempfile.SpooledTemporaryFile(max_size=1024 * 1024)
+    spool.write(data)
+    spool.seek(0)
+    return UploadFile(spool, filename="notes.md")
+
+
+async def legacy_read(file: UploadFile):
+    """The former implementation: whole-file read, decode, then pre-filter."""
+    content = await file.read()
+    text = content.decode("utf-8")
+    return prefilter_markdown(text, settings.prefilter_context_paragraphs)
+
+
+async def peak_bytes(read: Callable[[UploadFile], Awaitable], data: bytes) -> int:
+    """Peak traced allocation while `read` processes one spooled upload."""
+    file = spooled_upload(data)
+    tracemalloc.start()
+    tracemalloc.reset_peak()
+    await read(file)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    await file.close()
+    return peak
+
+
+async def oversized_body(with_limit: bool, body_mb: int) -> tuple:
+    """Send a chunked multipart body; return (status, bytes the app received, peak bytes)."""
+    app = FastAPI()
+    
+    @app.post("/api/upload")
+    async def upload(file: UploadFile = File(...)):
+        return {"size": len(await file.read())}
+    
+    asgi = UploadLimitMiddleware(app) if with_limit else app
+    head = (
+        b'--bench\r\nContent-Disposition: form-data; name="file"; filename="notes.md"\r\n'
+        b"Content-Type: text/markdown\r\n\r\n"
+    )
+    chunk = document(64 * 1024)[:64 * 1024]
+    chunks = iter([head] + [chunk] * (body_mb * 16) + [b"\r\n--bench--\r\n"])
+    received = 0
+    status = None
+    
+    async def receive():
+        nonlocal received
+        body = next(chunks, None)
+        if body is None:
+            return {"type": "http.disconnect"}
+        received += len(body)
+        return {"type": "http.request", "body": body, "more_body": not body.startswith(b"\r\n--bench--")}
+    
+    async def send(message):
+        nonlocal status
+        if message["type"] == "http.response.start":
+            status = message["status"]
+    
+    scope = {
+        "type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1",
+        "method": "POST", "scheme": "http", "path": "/api/upload", "raw_path": b"/api/upload",
+        "root_path": "", "query_string": b"", "client": ("127.0.0.1", 1234), "server": ("bench", 80),
+        "headers": [(b"host", b"bench"), (b"content-type", b"multipart/form-data; boundary=bench")],
+    }
+    tracemalloc.start()
+    await asgi(scope, receive, send)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return status, received, peak
+
+
+async def run() -> None:
+    print(f"{'accepted upload':<20} {'whole-file KB':>14} {'chunked KB':>12} {'x file size':>12}")
+    for size_kb in (64, 256, 1024, settings.upload_max_size_kb - 64):
+        data = document(size_kb * 1024)[:size_kb * 1024]
+        legacy = await peak_bytes(legacy_read, data)
+        chunked = await peak_bytes(read_markdown_upload, data)
+        print(f"{size_kb:>17} KB {legacy / 1024:>14.0f} {chunked / 1024:>12.0f} {chunked / len(data):>12.2f}")
+    
+    body_mb = 4 * settings.upload_max_size_kb // 1024
+    print(f"\n{body_mb} MB chunked body, limit {settings.upload_max_size_kb} KB")
+    for with_limit in (False, True):
+        status, received, peak = await oversized_body(with_limit, body_mb)
+        label = "with UploadLimitMiddleware" if with_limit else "without middleware"
+        print(f"  {label:<28} status {status}  read {received / 2**20:6.2f} MB  peak {peak / 2**20:6.2f} MB")
+
+
+if __name__ == "__main__":
+    asyncio.run(run())
@@ -0,0 +1,227 @@
+"""
+Fake Gemini REST endpoint for offline load tests.
+Answers generateContent and streamGenerateContent the way the Gemini API
+does, extracting one work per prompt line that carries a year (per tagged
+document for batched prompts), so the app can be benchmarked without
+spending Gemini quota.
+
+Usage:
+    python -m benchmarks.fake_gemini --port 8081 --latency-ms 400 --malformed-rate 0.02
+
+Responses are wrapped in ```json fences at --fence-rate (never in JSON mode,
+i.e. when the request sets responseMimeType) and replaced by truncated JSON
+at --malformed-rate, to exercise the app's output handling.
+
+The async Gemini SDK only speaks gRPC, so the app reaches this server
+through FakeGeminiModel, which stands in for the SDK model object and
+leaves the rest of AIService (prompting, fence stripping, validation)
+unchanged. benchmarks/load_test.py installs it with install().
+"""
+import argparse
+import asyncio
+import json
+import random
+import re
+from types import SimpleNamespace
+from typing import AsyncIterator, List, Optional, Tuple
+
+import httpx
+import uvicorn
+from pydantic import BaseModel
+from starlette.applications import Starlette
+from starlette.requests import Request
+from starlette.responses import JSONResponse, StreamingResponse
+from starlette.routing import Route
+
+from app.services.prefilter import CHARS_PER_TOKEN
+
+
+YEAR_PATTERN = re.compile(r"\b(1[0-9]{3}|20[0-9]{2})\b")
+DOCUMENT_PATTERN = re.compile(r'<document id="(\d+)">\n(.*?)\n</document>', re.DOTALL)
+TEXT_MARKER = "**TEXT TO ANALYZE:**"
+
+
+class FakeGeminiConfig(BaseModel):
+    """Behaviour of the fake endpoint."""
+    latency_ms: float = 400  # Mean time to the complete response
+    jitter_ms: float = 100  # Uniform +/- spread around latency_ms
+    fence_rate: float = 0.5  # Share of responses wrapped in ```json fences
+    malformed_rate: float = 0.0  # Share of responses cut off mid-JSON
+    stream_chunk_chars: int = 64  # Characters per streamed chunk
+
+
+def extract_works(prompt: str) -> List[dict]:
+    """One work per line of the analyzed text that mentions a year."""
+    text = prompt.split(TEXT_MARKER, 1)[-1]
+    works = []
+    for line in text.splitlines():
+        match = YEAR_PATTERN.search(line)
+        if match is None:
+            continue
+        title = line[:match.start()].strip(" -*#(:,") or line.strip(" -*#")
+        works.append({"title": title[:120], "author_or_source": None, "year": int(match.group(1))})
+    return works
+
+
+def render_response(prompt: str) -> dict:
+    """The JSON the model would return: per document for batched prompts."""
+    text = prompt.split(TEXT_MARKER, 1)[-1]
+    documents = DOCUMENT_PATTERN.findall(text)
+    if documents:
+        return {"documents": [
+            {"id": int(document_id), "works": extract_works(body)} for document_id, body in documents
+        ]}
+    return {"works": extract_works(text)}
+
+
+def create_app(config: FakeGeminiConfig) -> Starlette:
+    """Build the fake Gemini ASGI app."""
+    
+    def render(prompt: str, json_mode: bool) -> str:
+        text = json.dumps(render_response(prompt))
+        if random.random() < config.malformed_rate:
+            text = text[:max(1, len(text) // 2)]
+        if not json_mode and random.random() < config.fence_rate:
+            text = f"```json\n{text}\n```"
+        return text
+    
+    def latency() -> float:
+        spread = random.uniform(-config.jitter_ms, config.jitter_ms)
+        return max(0.0, config.latency_ms + spread) / 1000
+    
+    def candidate(text: str, prompt: str) -> dict:
+        return {
+            "candidates": [{
+                "content": {"parts": [{"text": text}], "role": "model"},
+                "finishReason": "STOP",
+                "index": 0,
+            }],
+            "usageMetadata": {
+                "promptTokenCount": len(prompt) // CHARS_PER_TOKEN,
+                "candidatesTokenCount": len(text) // CHARS_PER_TOKEN,
+            },
+        }
+    
+    async def read_prompt(request: Request) -> Tuple[str, bool]:
+        """The prompt text, and whether the request asks for JSON mode."""
+        body = await request.json()
+        prompt = "".join(
+            part.get("text", "")
+            for content in body.get("contents", [])
+            for part in content.get("parts", [])
+        )
+        mime_type = body.get("generationConfig", {}).get("responseMimeType")
+        return prompt, mime_type == "application/json"
+    
+    async def generate(request: Request) -> JSONResponse:
+        prompt, json_mode = await read_prompt(request)
+        await asyncio.sleep(latency())
+        return JSONResponse(candidate(render(prompt, json_mode), prompt))
+    
+    async def stream_generate(request: Request) -> StreamingResponse:
+        prompt, json_mode = await read_prompt(request)
+        text = render(prompt, json_mode)
+        size = config.stream_chunk_chars
+        parts = [text[i:i + size] for i in range(0, len(text), size)] or [""]
+        delay = latency() / len(parts)
+        
+        # The REST transport streams a JSON array of responses
+        async def body():
+            for index, part in enumerate(parts):
+                await asyncio.sleep(delay)
+                yield ("[" if index == 0 else "\n,") + json.dumps(candidate(part, prompt))
+            yield "]"
+        
+        return StreamingResponse(body(), media_type="application/json")
+    
+    async def dispatch(request: Request):
+        method = request.path_params["method"]
+        if method == "generateContent":
+            return await generate(request)
+        if method == "streamGenerateContent":
+            return await stream_generate(request)
+        return JSONResponse({"error": {"code": 404, "message": method}}, status_code=404)
+    
+    return Starlette(routes=[
+        Route("/v1beta/models/{model}:{method}", dispatch, methods=["POST"]),
+    ])
+
+
+class FakeGeminiModel:
+    """Drop-in for genai.GenerativeModel that calls a fake Gemini endpoint."""
+    
+    def __init__(self, endpoint: str, model_name: str, response_mime_type: Optional[str] = None):
+        """
+        Args:
+            endpoint: Base URL of the fake server, e.g. http://127.0.0.1:8081
+            model_name: Model name used in the request path
+            response_mime_type: Sent as responseMimeType; application/json selects JSON mode
+        """
+        self._client = httpx.AsyncClient(base_url=endpoint, timeout=120)
+        self._path = f"/v1beta/models/{model_name}"
+        self._response_mime_type = response_mime_type
+    
+    async def generate_content_async(self, prompt: str, stream: bool = False, generation_config: Optional[dict] = None):
+        """
+        Same calling convention as the SDK: a response, or an async chunk
+        iterator when streaming. Only the MIME type of the generation config
+        is forwarded; the fake server ignores response schemas.
+        """
+        body = {"contents": [{"role": "user", "parts": [{"text": prompt}]}]}
+        mime_type = (generation_config or {}).get("response_mime_type", self._response_mime_type)
+        if mime_type:
+            body["generationConfig"] = {"responseMimeType": mime_type}
+        if stream:
+            return self._stream(body)
+        response = await self._client.post(f"{self._path}:generateContent", json=body)
+        response.raise_for_status()
+        return self._to_response(response.json())
+    
+    async def _stream(self, body: dict) -> AsyncIterator[SimpleNamespace]:
+        async with self._client.stream("POST", f"{self._path}:streamGenerateContent", json=body) as response:
+            response.raise_for_status()
+            async for line in response.aiter_lines():
+                line = line.strip().lstrip("[,").rstrip("]")
+                if line:
+                    yield self._to_response(json.loads(line))
+    
+    @staticmethod
+    def _to_response(data: dict) -> SimpleNamespace:
+        usage = data.get("usageMetadata", {})
+        return SimpleNamespace(
+            text=data["candidates"][0]["content"]["parts"][0]["text"],
+            usage_metadata=SimpleNamespace(
+                prompt_token_count=usage.get("promptTokenCount"),
+                candidates_token_count=usage.get("candidatesTokenCount")
+            )
+        )
+
+
+def install(endpoint: str) -> None:
+    """Route the app's Gemini calls to the fake endpoint."""
+    from app.config import settings
+    from app.services.ai_service import MODEL_NAME, ai_service
+    mime_type = "application/json" if settings.gemini_structured_output else None
+    ai_service.model = FakeGeminiModel(endpoint, MODEL_NAME, mime_type)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8081)
+    parser.add_argument("--latency-ms", type=float, default=400)
+    parser.add_argument("--jitter-ms", type=float, default=100)
+    parser.add_argument("--fence-rate", type=float, default=0.5)
+    parser.add_argument("--malformed-rate", type=float, default=0.0)
+    args = parser.parse_args()
+    config = FakeGeminiConfig(
+        latency_ms=args.latency_ms,
+        jitter_ms=args.jitter_ms,
+        fence_rate=args.fence_rate,
+        malformed_rate=args.malformed_rate
+    )
+    uvicorn.run(create_app(config), host=args.host, port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,292 @@
+"""
+Offline load test for the ChronoNote API.
+Boots app.main:app under uvicorn against the fake Gemini endpoint and either
+fakeredis or a local redis-server, drives a realistic mix of upload, timeline,
+chronology and quiz traffic, and checks the results against the regression
+budgets committed in benchmarks/load_budgets.json.
+
+Usage:
+    python -m benchmarks.load_test --redis fake --mix study --users 32 --duration 30
+    python -m benchmarks.load_test --redis local --mix upload-heavy --malformed-rate 0.02
+
+Reports requests per second and p50/p95/p99 latency per endpoint and exits
+with status 1 if any budget is exceeded. Budgets assume the default fake
+Gemini settings. Requires httpx and uvicorn, plus fakeredis for --redis fake.
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import subprocess
+import sys
+import time
+import uuid
+from collections import defaultdict
+from pathlib import Path
+from typing import Dict, List
+
+import httpx
+
+
+BUDGETS_FILE = Path(__file__).with_name("load_budgets.json")
+
+# Relative weight of each user action; one action may issue two requests
+MIXES: Dict[str, Dict[str, int]] = {
+    "study": {"upload": 1, "timeline": 8, "timeline_page": 4, "chrono": 4, "quiz": 10},
+    "upload-heavy": {"upload": 4, "timeline": 4, "timeline_page": 1, "chrono": 2, "quiz": 4},
+    "read-only": {"timeline": 8, "timeline_page": 4, "chrono": 4, "quiz": 10},
+}
+
+FILLER = (
+    "Notes from the lecture, to be revised before the exam. The discussion "
+    "focused on causes and consequences rather than dates.\n\n"
+)
+
+
+def generate_document(works: int) -> str:
+    """A study-notes style markdown file with `works` dated references."""
+    tag = uuid.uuid4().hex[:8]  # Unique titles keep the extraction cache cold
+    lines = [f"# Reading list {tag}\n"]
+    for i in range(works):
+        lines.append(f"- Treatise {tag}-{i} ({random.randint(1000, 2020)})")
+        if i % 5 == 4:
+            lines.append("\n" + FILLER)
+    return "\n".join(lines)
+
+
+def percentile(samples: List[float], fraction: float) -> float:
+    """Nearest-rank percentile of sorted samples."""
+    return samples[max(0, min(len(samples) - 1, int(len(samples) * fraction + 0.5) - 1))]
+
+
+class LoadRecorder:
+    """Latencies and failures per endpoint."""
+    
+    def __init__(self):
+        self.latencies: Dict[str, List[float]] = defaultdict(list)
+        self.errors: Dict[str, int] = defaultdict(int)
+        self.rejected: Dict[str, int] = defaultdict(int)
+    
+    async def request(self, client: httpx.AsyncClient, method: str, path: str, label: str, **kwargs):
+        """Send one request and record it under `label`; returns the response or None."""
+        start = time.perf_counter()
+        try:
+            response = await client.request(method, path, **kwargs)
+        except httpx.HTTPError:
+            self.errors[label] += 1
+            return None
+        self.latencies[label].append(time.perf_counter() - start)
+        if response.status_code == 429:
+            self.rejected[label] += 1
+        elif response.status_code >= 400:
+            self.errors[label] += 1
+        return response
+
+
+async def upload(client: httpx.AsyncClient, recorder: LoadRecorder, works: int) -> bool:
+    files = {"file": ("notes.md", generate_document(works), "text/markdown")}
+    response = await recorder.request(client, "POST", "/api/upload", "POST /api/upload", files=files)
+    return response is not None and response.status_code == 200
+
+
+async def timeline(client: httpx.AsyncClient, recorder: LoadRecorder) -> None:
+    await recorder.request(client, "GET", "/api/timeline", "GET /api/timeline")
+
+
+async def timeline_page(client: httpx.AsyncClient, recorder: LoadRecorder) -> None:
+    start = random.randint(1000, 1900)
+    params = {"from_year": start, "to_year": start + 100, "limit": 20}
+    await recorder.request(client, "GET", "/api/timeline", "GET /api/timeline?range", params=params)
+
+
+async def chrono(client: httpx.AsyncClient, recorder: LoadRecorder) -> None:
+    response = await recorder.request(client, "GET", "/api/chrono-test", "GET /api/chrono-test")
+    if response is None or response.status_code != 200:
+        return
+    ids = [work["id"] for work in response.json()["works"]]
+    random.shuffle(ids)
+    await recorder.request(
+        client, "POST", "/api/chrono-check", "POST /api/chrono-check", json={"ordered_ids": ids}
+    )
+
+
+async def quiz(client: httpx.AsyncClient, recorder: LoadRecorder) -> None:
+    response = await recorder.request(client, "GET", "/api/date-quiz/next", "GET /api/date-quiz/next")
+    if response is None or response.status_code != 200:
+        return
+    question = response.json()
+    answer = {"work_id": question["work_id"], "selected_year": random.choice(question["year_options"])}
+    await recorder.request(client, "POST", "/api/date-quiz/check", "POST /api/date-quiz/check", json=answer)
+
+
+async def virtual_user(url: str, mix: Dict[str, int], deadline: float, works: int, recorder: LoadRecorder) -> None:
+    """One browser session: upload notes, then study until the deadline."""
+    actions = list(mix)
+    weights = [mix[action] for action in actions]
+    async with httpx.AsyncClient(base_url=url, timeout=60) as client:
+        # Every session needs data before it can read; retry while uploads are shed
+        while not await upload(client, recorder, works):
+            if time.perf_counter() >= deadline:
+                return
+            await asyncio.sleep(0.5)
+        while time.perf_counter() < deadline:
+            action = random.choices(actions, weights)[0]
+            if action == "upload":
+                await upload(client, recorder, works)
+            elif action == "timeline":
+                await timeline(client, recorder)
+            elif action == "timeline_page":
+                await timeline_page(client, recorder)
+            elif action == "chrono":
+                await chrono(client, recorder)
+            else:
+                await quiz(client, recorder)
+
+
+def report(recorder: LoadRecorder, elapsed: float, budget: dict) -> bool:
+    """Print per-endpoint results and return False if a budget is exceeded."""
+    failures = []
+    endpoint_budgets = budget.get("endpoints", {})
+    print(f"{'endpoint':<30} {'count':>7} {'rps':>8} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'err':>5} {'429':>5}")
+    
+    total = 0
+    total_errors = 0
+    for label in sorted(recorder.latencies):
+        samples = sorted(recorder.latencies[label])
+        p50, p95, p99 = (percentile(samples, f) * 1000 for f in (0.50, 0.95, 0.99))
+        errors = recorder.errors[label]
+        total += len(samples)
+        total_errors += errors
+        print(
+            f"{label:<30} {len(samples):>7} {len(samples) / elapsed:>8.1f} "
+            f"{p50:>8.1f} {p95:>8.1f} {p99:>8.1f} {errors:>5} {recorder.rejected[label]:>5}"
+        )
+        for key, value in (("p50_ms", p50), ("p95_ms", p95), ("p99_ms", p99)):
+            limit = endpoint_budgets.get(label, {}).get(key)
+            if limit is not None and value > limit:
+                failures.append(f"{label} {key} {value:.1f} > {limit}")
+    
+    rps = total / elapsed
+    error_rate = total_errors / total if total else 1.0
+    print(f"{'total':<30} {total:>7} {rps:>8.1f}   error rate {error_rate:.2%}")
+    if rps < budget.get("min_total_rps", 0):
+        failures.append(f"total rps {rps:.1f} < {budget['min_total_rps']}")
+    if error_rate > budget.get("max_error_rate", 1.0):
+        failures.append(f"error rate {error_rate:.2%} > {budget['max_error_rate']:.2%}")
+    
+    for failure in failures:
+        print(f"FAIL: {failure}")
+    return not failures
+
+
+def serve(args: argparse.Namespace) -> None:
+    """Run the app under uvicorn with the offline Gemini and Redis stand-ins (child process)."""
+    import uvicorn
+    from benchmarks.fake_gemini import install
+    
+    if args.redis == "fake":
+        import fakeredis
+        from app.services.redis_service import redis_service
+        from app.services.redis_stats import CountingRedis
+        from app.services.session_codec import REDIS_ENCODING_ERRORS
+        fake = fakeredis.FakeAsyncRedis(decode_responses=True, encoding_errors=REDIS_ENCODING_ERRORS)
+        redis_service.redis_client = CountingRedis(connection_pool=fake.connection_pool)
+    
+    from app.main import app
+    install(f"http://127.0.0.1:{args.gemini_port}")
+    uvicorn.run(app, host="127.0.0.1", port=args.port, log_level="warning")
+
+
+async def wait_until_ready(url: str, processes: List[subprocess.Popen], timeout: float = 30) -> None:
+    """Poll /health until the app answers."""
+    deadline = time.perf_counter() + timeout
+    async with httpx.AsyncClient(base_url=url, timeout=2) as client:
+        while time.perf_counter() < deadline:
+            if any(process.poll() is not None for process in processes):
+                raise RuntimeError("A server process exited during startup")
+            try:
+                if (await client.get("/health")).status_code == 200:
+                    return
+            except httpx.HTTPError:
+                pass
+            await asyncio.sleep(0.2)
+    raise RuntimeError(f"App did not become ready within {timeout:.0f}s")
+
+
+async def drive(args: argparse.Namespace, url: str) -> bool:
+    recorder = LoadRecorder()
+    mix = MIXES[args.mix]
+    if "upload" not in mix:
+        # Read-only mixes still need one upload per session
+        mix = {**mix, "upload": 0}
+    
+    started = time.perf_counter()
+    deadline = started + args.duration
+    await asyncio.gather(*(
+        virtual_user(url, mix, deadline, args.works, recorder) for _ in range(args.users)
+    ))
+    elapsed = time.perf_counter() - started
+    
+    async with httpx.AsyncClient(base_url=url) as client:
+        health = (await client.get("/health")).json()
+    batching = health.get("gemini_batching")
+    
+    budgets = json.loads(BUDGETS_FILE.read_text())
+    print(
+        f"mix {args.mix}, {args.users} users, {elapsed:.1f}s, redis {args.redis}, "
+        f"fake Gemini {args.latency_ms:.0f} ms, malformed {args.malformed_rate:.0%}"
+    )
+    if batching:
+        print(f"Gemini batching: {batching}")
+    print(f"Gemini output: {health.get('gemini_output')}")
+    return report(recorder, elapsed, budgets.get(args.mix, {}))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--redis", choices=["fake", "local"], default="fake")
+    parser.add_argument("--mix", choices=sorted(MIXES), default="study")
+    parser.add_argument("--users", type=int, default=32, help="Concurrent browser sessions")
+    parser.add_argument("--duration", type=float, default=30, help="Seconds of load")
+    parser.add_argument("--works", type=int, default=40, help="Dated references per uploaded file")
+    parser.add_argument("--port", type=int, default=8090)
+    parser.add_argument("--gemini-port", type=int, default=8091)
+    parser.add_argument("--latency-ms", type=float, default=400)
+    parser.add_argument("--jitter-ms", type=float, default=100)
+    parser.add_argument("--fence-rate", type=float, default=0.5)
+    parser.add_argument("--malformed-rate", type=float, default=0.0)
+    parser.add_argument("--serve", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    
+    if args.serve:
+        serve(args)
+        return
+    
+    env = {**os.environ, "GEMINI_API_KEY": os.environ.get("GEMINI_API_KEY", "offline-load-test")}
+    gemini = subprocess.Popen([
+        sys.executable, "-m", "benchmarks.fake_gemini",
+        "--port", str(args.gemini_port),
+        "--latency-ms", str(args.latency_ms),
+        "--jitter-ms", str(args.jitter_ms),
+        "--fence-rate", str(args.fence_rate),
+        "--malformed-rate", str(args.malformed_rate),
+    ], env=env)
+    app = subprocess.Popen([
+        sys.executable, "-m", "benchmarks.load_test", "--serve",
+        "--redis", args.redis, "--port", str(args.port), "--gemini-port", str(args.gemini_port),
+    ], env=env, stdout=subprocess.DEVNULL)
+    
+    url = f"http://127.0.0.1:{args.port}"
+    try:
+        asyncio.run(wait_until_ready(url, [gemini, app]))
+        ok = asyncio.run(drive(args, url))
+    finally:
+        for process in (app, gemini):
+            process.terminate()
+            process.wait()
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == "__main__":
+    main()
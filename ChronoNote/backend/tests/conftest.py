@@ -0,0 +1,103 @@
+"""
+Shared test fixtures.
+Tests run against fakeredis and a scripted Gemini model, so the suite needs
+neither a Redis server nor a Gemini API key.
+"""
+import json
+import os
+import re
+from typing import Any, List
+
+os.environ.setdefault("GEMINI_API_KEY", "test")
+
+import fakeredis
+import pytest
+from fastapi.testclient import TestClient
+
+from app.config import settings
+from app.services.ai_service import ai_service
+from app.services.decoded_cache import DecodedSessionCache
+from app.services.redis_service import redis_service
+from app.services.redis_stats import CountingRedis
+from app.services.session_codec import REDIS_ENCODING_ERRORS
+
+
+# Quoted titles followed by a year on the same line, e.g. "Emma" (1815)
+QUOTED_WORK = re.compile(r'"([^"]+)"[^.\n]*?(\d{3,4})')
+
+
+class ScriptedResponse:
+    """Stand-in for a Gemini response or stream chunk."""
+    
+    def __init__(self, text: str):
+        self.text = text
+        self.usage_metadata = None
+
+
+class ScriptedStream:
+    """Stand-in for a streamed Gemini response, delivered in small pieces."""
+    
+    def __init__(self, text: str, piece_chars: int = 7):
+        self.pieces = [text[start:start + piece_chars] for start in range(0, len(text), piece_chars)]
+    
+    async def __aiter__(self):
+        for piece in self.pieces:
+            yield ScriptedResponse(piece)
+
+
+class ScriptedModel:
+    """
+    Gemini model stand-in.
+    
+    By default every quoted title followed by a year in the prompt's text
+    is returned as a work; set `responses` to script raw response texts,
+    consumed in order.
+    """
+    
+    def __init__(self):
+        self.prompts: List[str] = []
+        self.responses: List[str] = []
+    
+    def extract(self, prompt: str) -> str:
+        text = prompt.split("**TEXT TO ANALYZE:**")[-1]
+        works = [
+            {"title": match.group(1), "author_or_source": None, "year": int(match.group(2))}
+            for match in QUOTED_WORK.finditer(text)
+        ]
+        return json.dumps({"works": works})
+    
+    async def generate_content_async(self, prompt: str, stream: bool = False, **kwargs: Any):
+        self.prompts.append(prompt)
+        text = self.responses.pop(0) if self.responses else self.extract(prompt)
+        return ScriptedStream(text) if stream else ScriptedResponse(text)
+
+
+@pytest.fixture
+def anyio_backend() -> str:
+    return "asyncio"
+
+
+@pytest.fixture(autouse=True)
+def fake_redis(monkeypatch) -> CountingRedis:
+    """Point the shared Redis client at a fresh in-memory server for each test."""
+    fake = fakeredis.FakeAsyncRedis(decode_responses=True, encoding_errors=REDIS_ENCODING_ERRORS)
+    client = CountingRedis(connection_pool=fake.connection_pool)
+    monkeypatch.setattr(redis_service, "redis_client", client)
+    monkeypatch.setattr(redis_service, "decoded_cache", DecodedSessionCache(settings.session_decode_cache_max_works))
+    return client
+
+
+@pytest.fixture
+def model(monkeypatch) -> ScriptedModel:
+    """Replace the Gemini model with a scripted one."""
+    scripted = ScriptedModel()
+    monkeypatch.setattr(ai_service, "model", scripted)
+    return scripted
+
+
+@pytest.fixture
+def client(model):
+    """Test client for the app, with a scripted Gemini model."""
+    from app.main import app
+    with TestClient(app) as test_client:
+        yield test_client
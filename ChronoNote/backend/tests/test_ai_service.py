@@ -0,0 +1,91 @@
+"""
+Tests for recovering from cut-off and unusual Gemini responses.
+"""
+import json
+
+import pytest
+
+from app.config import settings
+from app.services.ai_service import ai_service
+from tests.conftest import ScriptedResponse
+
+
+pytestmark = pytest.mark.anyio
+
+DOCUMENT = "\n\n".join([
+    "Jane Austen's Pride & Prejudice came out in 1813.",
+    "Moby-Dick; or, The Whale was published in 1851.",
+    '"Dracula" dates from 1897.',
+    '"Ulysses" appeared in 1922.',
+])
+
+# Titles cleaned up by the model, cut off in the middle of the third work
+CUT_OFF = (
+    '{"works": [{"title": "Pride and Prejudice", "author_or_source": "Jane Austen", "year": 1813}, '
+    '{"title": "Moby Dick", "author_or_source": null, "year": 1851}, {"title": "Dra'
+)
+
+
+def retried_text(model) -> str:
+    return model.prompts[-1].split("**TEXT TO ANALYZE:**")[-1]
+
+
+@pytest.fixture(autouse=True)
+def one_retry(monkeypatch):
+    monkeypatch.setattr(settings, "gemini_repair_max_retries", 1)
+
+
+async def test_cut_off_response_retries_from_the_last_recovered_work(model):
+    model.responses = [CUT_OFF]
+    
+    works = await ai_service.extract_historical_works(DOCUMENT, queue_timeout=1)
+    
+    assert [work.title for work in works] == ["Pride and Prejudice", "Moby Dick", "Dracula", "Ulysses"]
+    assert "Pride" not in retried_text(model)
+    assert "Moby-Dick" in retried_text(model)
+
+
+async def test_cut_off_stream_retries_from_the_last_recovered_work(model):
+    model.responses = [CUT_OFF]
+    
+    works = [work async for work in ai_service.stream_historical_works(DOCUMENT)]
+    
+    assert [work.title for work in works] == ["Pride and Prejudice", "Moby Dick", "Dracula", "Ulysses"]
+    assert "Pride" not in retried_text(model)
+    assert "Moby-Dick" in retried_text(model)
+
+
+async def test_cut_off_response_without_known_years_retries_everything(model):
+    model.responses = ['{"works": [{"title": "Something", "author_or_source": null, "year": 1700}, {"ti']
+    
+    await ai_service.extract_historical_works(DOCUMENT, queue_timeout=1)
+    
+    assert "Pride" in retried_text(model)
+
+
+class PartlessChunk:
+    """A stream chunk without parts, whose text accessor raises like Gemini's."""
+    usage_metadata = None
+    
+    @property
+    def text(self) -> str:
+        raise ValueError("The `response.text` quick accessor requires the response to contain a valid `Part`")
+
+
+async def test_stream_chunks_without_parts_are_skipped(model, monkeypatch):
+    works_json = json.dumps({"works": [{"title": "Ulysses", "author_or_source": None, "year": 1922}]})
+    
+    class Stream:
+        async def __aiter__(self):
+            yield ScriptedResponse(works_json)
+            yield PartlessChunk()
+    
+    async def generate(prompt, stream=False, **kwargs):
+        return Stream()
+    monkeypatch.setattr(model, "generate_content_async", generate)
+    outcomes = []
+    
+    works = [work async for work in ai_service.stream_historical_works(DOCUMENT, outcomes.append)]
+    
+    assert [work.title for work in works] == ["Ulysses"]
+    assert outcomes == ["ok"]
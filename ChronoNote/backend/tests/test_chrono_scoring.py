@@ -0,0 +1,80 @@
+"""
+Tests for the chronology scoring engine against brute-force references.
+"""
+import itertools
+import random
+from typing import List, Sequence
+
+import pytest
+
+from app.services.chrono_scoring import count_inversions, longest_ordered_subsequence, score_chronology
+
+
+def brute_force_inversions(values: Sequence[int]) -> int:
+    """Every pair compared directly, O(n^2)."""
+    return sum(1 for i, j in itertools.combinations(range(len(values)), 2) if values[i] > values[j])
+
+
+def brute_force_longest(values: Sequence[int]) -> int:
+    """Length of the longest non-decreasing subsequence by O(n^2) dynamic programming."""
+    lengths: List[int] = []
+    for j, value in enumerate(values):
+        lengths.append(1 + max((lengths[i] for i in range(j) if values[i] <= value), default=0))
+    return max(lengths, default=0)
+
+
+def random_orders(seed: int, trials: int) -> List[List[int]]:
+    """Shuffled tests whose years repeat often enough to exercise ties; every third nearly sorted."""
+    rng = random.Random(seed)
+    orders = []
+    for trial in range(trials):
+        size = rng.randint(0, 40)
+        span = rng.choice([1, 3, size or 1, 500])
+        years = [rng.randint(1900, 1900 + span) for _ in range(size)]
+        if trial % 3 == 0 and years:
+            years.sort()
+            for _ in range(rng.randint(0, 3)):
+                i, j = rng.randrange(size), rng.randrange(size)
+                years[i], years[j] = years[j], years[i]
+        orders.append(years)
+    return orders
+
+
+SEEDS = range(5)
+
+
+@pytest.mark.parametrize("seed", SEEDS)
+def test_inversions_match_brute_force(seed):
+    for years in random_orders(seed, trials=200):
+        assert count_inversions(years) == brute_force_inversions(years), years
+
+
+@pytest.mark.parametrize("seed", SEEDS)
+def test_subsequence_is_a_longest_ordered_one(seed):
+    for years in random_orders(seed, trials=200):
+        subsequence = longest_ordered_subsequence(years)
+        
+        assert len(subsequence) == brute_force_longest(years), years
+        assert subsequence == sorted(set(subsequence)), years
+        assert all(years[a] <= years[b] for a, b in zip(subsequence, subsequence[1:])), years
+
+
+@pytest.mark.parametrize("seed", SEEDS)
+def test_score_partitions_the_positions(seed):
+    for years in random_orders(seed, trials=200):
+        score = score_chronology(years)
+        
+        assert score.correct == (brute_force_inversions(years) == 0), years
+        assert 0.0 <= score.score <= 1.0, years
+        assert sorted(score.in_order + score.out_of_place) == list(range(len(years))), years
+
+
+@pytest.mark.parametrize("years,expected", [
+    ([], 1.0),
+    ([1900, 1900, 1900], 1.0),
+    ([1900, 1950, 2000], 1.0),
+    ([2000, 1950, 1900], 0.0),
+    ([1950, 1900, 2000], 2 / 3),
+])
+def test_score_values(years, expected):
+    assert score_chronology(years).score == pytest.approx(expected)
@@ -0,0 +1,74 @@
+"""
+Tests for chunked extraction under the global Gemini slot cap.
+"""
+import asyncio
+
+import pytest
+
+from app.config import settings
+from app.services.ai_service import AIServiceBusyError, ai_service
+from app.services.chunking import chunked_extractor
+
+
+pytestmark = pytest.mark.anyio
+
+DOCUMENT = '"Emma" was published in 1815.\n\n"Ulysses" was published in 1922.\n\n"Beloved" was published in 1987.'
+
+
+@pytest.fixture
+def slow_model(model, monkeypatch):
+    """Scripted model whose calls take long enough for chunks to contend for slots."""
+    generate = model.generate_content_async
+    
+    async def slow_generate(prompt, **kwargs):
+        await asyncio.sleep(0.1)
+        return await generate(prompt, **kwargs)
+    
+    monkeypatch.setattr(model, "generate_content_async", slow_generate)
+    return model
+
+
+@pytest.fixture(autouse=True)
+def one_slot(monkeypatch):
+    """One chunk per paragraph, all started together, sharing a single Gemini slot."""
+    monkeypatch.setattr(settings, "extraction_chunk_max_chars", 40)
+    monkeypatch.setattr(settings, "extraction_chunk_overlap_chars", 0)
+    monkeypatch.setattr(settings, "extraction_chunk_concurrency", 2)
+    monkeypatch.setattr(settings, "gemini_queue_timeout_seconds", 0)
+    monkeypatch.setattr(ai_service, "_slots", asyncio.Semaphore(1))
+
+
+async def test_later_chunks_wait_for_a_slot(slow_model):
+    works = await chunked_extractor.extract(DOCUMENT)
+    
+    assert [work.title for work in works] == ["Emma", "Ulysses", "Beloved"]
+    assert len(slow_model.prompts) == 3
+
+
+async def test_upload_is_turned_away_before_any_chunk_is_sent(slow_model):
+    await ai_service._slots.acquire()
+    
+    with pytest.raises(AIServiceBusyError):
+        await chunked_extractor.extract(DOCUMENT)
+    assert slow_model.prompts == []
+
+
+async def test_retry_after_busy_reuses_chunks_already_paid_for(slow_model, monkeypatch):
+    monkeypatch.setattr(settings, "extraction_chunk_queue_timeout_seconds", 0.01)
+    
+    with pytest.raises(AIServiceBusyError):
+        await chunked_extractor.extract(DOCUMENT)
+    assert len(slow_model.prompts) == 1
+    
+    monkeypatch.setattr(settings, "extraction_chunk_queue_timeout_seconds", 30)
+    works = await chunked_extractor.extract(DOCUMENT)
+    
+    assert [work.title for work in works] == ["Emma", "Ulysses", "Beloved"]
+    assert len(slow_model.prompts) == 3
+
+
+async def test_stream_later_chunks_wait_for_a_slot(slow_model):
+    works = [work async for work in chunked_extractor.stream(DOCUMENT)]
+    
+    assert sorted(work.title for work in works) == ["Beloved", "Emma", "Ulysses"]
+    assert len(slow_model.prompts) == 3
@@ -0,0 +1,53 @@
+"""
+Tests for appending documents to a session.
+"""
+import asyncio
+
+import pytest
+
+from app.api.routes import append_document
+from app.models.schemas import AIExtractedWork
+from app.services.memory_store import MemorySessionStore
+from app.services.redis_service import redis_service
+from app.services.session_documents import content_hash
+
+
+pytestmark = pytest.mark.anyio
+
+FIRST = [AIExtractedWork(title="Emma", author_or_source="Jane Austen", year=1815)]
+SECOND = [AIExtractedWork(title="Ulysses", author_or_source="James Joyce", year=1922)]
+
+
+@pytest.fixture(params=["redis", "memory"])
+def store(request, monkeypatch):
+    """Each store backend, with reads slowed so concurrent appends interleave."""
+    store = redis_service if request.param == "redis" else MemorySessionStore(max_sessions=10, ttl_seconds=3600)
+    read = store.get_session_data
+    
+    async def slow_read(*args, **kwargs):
+        works = await read(*args, **kwargs)
+        await asyncio.sleep(0.01)
+        return works
+    monkeypatch.setattr(store, "get_session_data", slow_read)
+    return store
+
+
+async def test_concurrent_appends_keep_both_documents(store):
+    await asyncio.gather(
+        append_document(store, "s1", "first.md", content_hash("first"), FIRST),
+        append_document(store, "s1", "second.md", content_hash("second"), SECOND)
+    )
+    
+    works = await store.get_session_data("s1")
+    documents = await store.get_session_documents("s1")
+    assert sorted(work.title for work in works) == ["Emma", "Ulysses"]
+    assert set(documents) == {"first.md", "second.md"}
+
+
+async def test_append_replaces_the_earlier_version_of_a_document(store):
+    await append_document(store, "s1", "notes.md", content_hash("first"), FIRST)
+    response = await append_document(store, "s1", "notes.md", content_hash("second"), SECOND)
+    
+    works = await store.get_session_data("s1")
+    assert [work.title for work in works] == ["Ulysses"]
+    assert response.works_count == 1
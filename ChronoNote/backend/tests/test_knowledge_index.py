@@ -0,0 +1,63 @@
+"""
+Tests for resolving known works without calling Gemini.
+"""
+import pytest
+
+from app.config import settings
+from app.models.schemas import AIExtractedWork
+from app.services.knowledge_index import TITLES_KEY, KnowledgeIndex
+
+
+GATSBY = AIExtractedWork(title="The Great Gatsby", author_or_source="F. Scott Fitzgerald", year=1925)
+
+pytestmark = pytest.mark.anyio
+
+
+async def learned_index(*works: AIExtractedWork) -> KnowledgeIndex:
+    """An index that has seen each work often enough to trust it."""
+    index = KnowledgeIndex()
+    for _ in range(settings.knowledge_min_confirmations):
+        await index.record(list(works))
+    return index
+
+
+async def test_paragraph_of_known_works_is_resolved():
+    index = await learned_index(GATSBY)
+    
+    resolution = await index.resolve("The Great Gatsby by F. Scott Fitzgerald was published in 1925.")
+    
+    assert resolution.known_works == [GATSBY]
+    assert resolution.unresolved_text == ""
+    assert resolution.paragraphs_resolved == 1
+
+
+async def test_unknown_work_sharing_a_year_is_still_sent():
+    gatsby = GATSBY.model_copy(update={"author_or_source": None})
+    index = await learned_index(gatsby)
+    paragraph = "The Great Gatsby (1925) ... Mrs Dalloway (1925)"
+    
+    resolution = await index.resolve(paragraph)
+    
+    assert resolution.known_works == [gatsby]
+    assert resolution.unresolved_text == paragraph
+    assert resolution.paragraphs_unresolved == 1
+
+
+async def test_untrusted_work_is_not_resolved():
+    index = KnowledgeIndex()
+    await index.record([GATSBY])
+    
+    resolution = await index.resolve("The Great Gatsby by F. Scott Fitzgerald was published in 1925.")
+    
+    assert resolution.known_works == []
+    assert resolution.paragraphs_unresolved == 1
+
+
+async def test_title_lookup_set_is_capped(fake_redis, monkeypatch):
+    monkeypatch.setattr(settings, "knowledge_max_titles", 3)
+    index = KnowledgeIndex()
+    
+    for year in range(1900, 1905):
+        await index.record([AIExtractedWork(title=f"Work {year}", author_or_source=None, year=year)])
+    
+    assert await fake_redis.zrange(TITLES_KEY, 0, -1) == ["work 1902", "work 1903", "work 1904"]
@@ -0,0 +1,73 @@
+"""
+Recall tests for the pre-filter on the sample notes.
+"""
+import re
+from pathlib import Path
+from typing import List, Tuple
+
+import pytest
+
+from app.services.prefilter import prefilter_markdown, split_paragraphs, year_values
+
+
+SAMPLE_PATH = Path(__file__).resolve().parents[2] / "sample_history.md"
+
+COMMENTARY = (
+    "These notes are a mix of reading reflections and reminders to myself. "
+    "I want to revisit the themes of class and marriage, and compare the narrators' voices. "
+    "Remember to bring the annotated copy to the seminar next week."
+)
+
+# Every work in the sample notes, as a title phrase and the year it is given
+EXPECTED_WORKS: List[Tuple[str, int]] = [
+    ("Pride and Prejudice", 1813),
+    ("The Great Gatsby", 1925),
+    ("special relativity", 1905),
+    ("first successful airplane flight", 1903),
+    ("fall of the Berlin Wall", 1989),
+    ("World War I", 1914),
+    ("Mona Lisa", 1503),
+    ("first iPhone", 2007),
+    ("World Wide Web", 1989),
+    ("Great Pyramid of Giza", -2560),
+    ("Julius Caesar", -44),
+    ("Symphony No. 9", 1824),
+    ("Guernica", 1937),
+    ("Apollo 11", 1969),
+    ("Voyager 1", 1977),
+    ("To Kill a Mockingbird", 1960),
+    ("1984", 1949),
+    ("Discourse on the Method", 1637),
+    ("Eiffel Tower", 1889),
+    ("Taj Mahal", 1653),
+]
+
+
+def sample() -> str:
+    return SAMPLE_PATH.read_text(encoding="utf-8")
+
+
+def with_commentary(markdown: str) -> str:
+    """Interleave commentary to mimic typical notes, where most text has no year."""
+    return "\n\n".join(f"{COMMENTARY}\n\n{paragraph}" for paragraph in re.split(r"\n\s*\n", markdown))
+
+
+@pytest.mark.parametrize("context_paragraphs", [0, 1])
+@pytest.mark.parametrize("commented", [False, True])
+@pytest.mark.parametrize("title,year", EXPECTED_WORKS)
+def test_sample_work_survives_with_its_year(title, year, commented, context_paragraphs):
+    markdown = with_commentary(sample()) if commented else sample()
+    
+    result = prefilter_markdown(markdown, context_paragraphs)
+    
+    assert any(
+        title.lower() in paragraph.lower() and year in year_values(paragraph)
+        for paragraph in split_paragraphs(result.text)
+    )
+
+
+def test_commentary_is_dropped():
+    result = prefilter_markdown(with_commentary(sample()))
+    
+    assert COMMENTARY not in result.text
+    assert result.reduction > 0.5
@@ -0,0 +1,76 @@
+"""
+Redis round trips per request, counted on fakeredis through CountingRedis.
+"""
+import uuid
+from typing import List
+
+import httpx
+import pytest
+
+from app.config import settings
+from app.main import app
+from app.models.schemas import StoredWorkItem
+from app.services.redis_service import redis_service
+from app.services.redis_stats import CommandStats, count_commands
+
+
+pytestmark = pytest.mark.anyio
+
+UPLOAD = '"Emma" was published in 1815.\n\n"Moby Dick" followed in 1851.'
+
+
+def sample_works(count: int = 40) -> List[StoredWorkItem]:
+    return [
+        StoredWorkItem(title=f"Work {i}", author_or_source=f"Author {i % 7}", year=1500 + i)
+        for i in range(count)
+    ]
+
+
+@pytest.fixture
+async def session_client():
+    """Client bound to a fresh session cookie."""
+    transport = httpx.ASGITransport(app=app)
+    cookies = {settings.session_cookie_name: str(uuid.uuid4())}
+    async with httpx.AsyncClient(transport=transport, base_url="http://test", cookies=cookies) as client:
+        yield client
+
+
+async def counted(client: httpx.AsyncClient, method: str, path: str, **kwargs) -> CommandStats:
+    with count_commands() as stats:
+        response = await client.request(method, path, **kwargs)
+    assert response.status_code == 200
+    return stats
+
+
+READS = [
+    ("GET", "/api/timeline", None),
+    ("GET", "/api/timeline?from_year=1510&limit=10", None),
+    ("GET", "/api/chrono-test", None),
+    ("POST", "/api/chrono-check", lambda works: {"ordered_ids": [str(work.id) for work in works[:5]]}),
+    ("GET", "/api/date-quiz/next", None),
+    ("POST", "/api/date-quiz/check", lambda works: {"work_id": str(works[0].id), "selected_year": 1500}),
+]
+
+
+@pytest.mark.parametrize("method,path,body", READS, ids=[f"{method} {path}" for method, path, _ in READS])
+async def test_read_takes_one_round_trip(session_client, method, path, body):
+    session_id = session_client.cookies[settings.session_cookie_name]
+    works = sample_works()
+    await redis_service.save_session_data(session_id, works)
+    json_body = body(works) if body is not None else None
+    
+    # The first read refreshes the TTL in the same round trip; the repeat skips it
+    first = await counted(session_client, method, path, json=json_body)
+    repeat = await counted(session_client, method, path, json=json_body)
+    
+    assert first.round_trips == 1
+    assert repeat.round_trips == 1
+
+
+async def test_upload_round_trips(model, session_client):
+    stats = await counted(session_client, "POST", "/api/upload", files={"file": ("notes.md", UPLOAD.encode())})
+    
+    # Knowledge index lookup, extraction cache read, knowledge index record,
+    # extraction cache write and the session save
+    assert stats.round_trips == 5
+    assert stats.commands == 26
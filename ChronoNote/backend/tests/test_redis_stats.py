@@ -0,0 +1,35 @@
+"""
+Tests for the Redis command metrics.
+"""
+import pytest
+from prometheus_client import REGISTRY
+
+from app.services.metrics import current_route
+
+
+pytestmark = pytest.mark.anyio
+
+
+def sample(name: str, command: str) -> float:
+    return REGISTRY.get_sample_value(name, {"route": current_route.get(), "command": command}) or 0
+
+
+async def test_pipelines_share_one_latency_label(fake_redis):
+    before = {
+        command: sample("chrononote_redis_commands_total", command) for command in ("GET", "HMGET", "SET")
+    }
+    pipelines = sample("chrononote_redis_command_seconds_count", "pipeline")
+    
+    async with fake_redis.pipeline(transaction=True) as pipe:
+        pipe.get("a").get("b").hmget("c", ["x"])
+        await pipe.execute()
+    async with fake_redis.pipeline(transaction=False) as pipe:
+        pipe.get("a").set("b", "1")
+        await pipe.execute()
+    await fake_redis.get("a")
+    
+    assert sample("chrononote_redis_command_seconds_count", "pipeline") == pipelines + 2
+    assert sample("chrononote_redis_command_seconds_count", "MULTI[GET,HMGET]") == 0
+    assert sample("chrononote_redis_commands_total", "GET") == before["GET"] + 4
+    assert sample("chrononote_redis_commands_total", "HMGET") == before["HMGET"] + 1
+    assert sample("chrononote_redis_commands_total", "SET") == before["SET"] + 1
@@ -0,0 +1,96 @@
+"""
+Round-trip tests for the session value codec, alone and through the Redis store.
+"""
+import uuid
+from typing import List
+
+import pytest
+
+from app.models.schemas import QuizQuestion, StoredWorkItem
+from app.services.redis_service import redis_service, works_key
+from app.services.session_codec import FORMAT_VERSION, KIND_WORK, MARKER, SessionCodec
+
+
+ENCODINGS = {
+    "json": lambda: SessionCodec(compact=False),
+    "compact": lambda: SessionCodec(compress_min_bytes=0),
+    "compact+zstd": lambda: SessionCodec(compress_min_bytes=1),
+}
+
+
+def sample_works(count: int = 50) -> List[StoredWorkItem]:
+    """Non-ASCII titles, BC years and works without an author."""
+    return [
+        StoredWorkItem(
+            title=f"Wörk — {i} “quoted”",
+            author_or_source=None if i % 5 == 0 else f"Auteur {i % 7}",
+            year=-300 + i * 37
+        )
+        for i in range(count)
+    ]
+
+
+def by_id(works: List[StoredWorkItem]) -> List[StoredWorkItem]:
+    return sorted(works, key=lambda work: str(work.id))
+
+
+@pytest.fixture(params=list(ENCODINGS))
+def codec(request) -> SessionCodec:
+    return ENCODINGS[request.param]()
+
+
+def test_works_round_trip(codec):
+    works = sample_works()
+    
+    values, authors = codec.encode_works(works)
+    raw = list(values.values()) + ([authors] if authors is not None else [])
+    
+    assert by_id(codec.decode_works(raw)) == by_id(works)
+
+
+def test_question_round_trip(codec):
+    for author in (None, "Auteur"):
+        question = QuizQuestion(
+            work_id=uuid.uuid4(), title="Wörk", author_or_source=author, year_options=[-44, 79, 1066, 1984]
+        )
+        
+        assert codec.decode_question(codec.encode_question(question)) == question
+
+
+def test_text_round_trip(codec):
+    text = '{"works": ["Wörk — ' + "x" * 5000 + '"]}'
+    
+    assert codec.decode_text(codec.encode_text(text)) == text
+
+
+def test_compact_codec_reads_json_values():
+    works = sample_works(5)
+    values, _ = ENCODINGS["json"]().encode_works(works)
+    
+    assert by_id(SessionCodec().decode_works(values.values())) == by_id(works)
+
+
+@pytest.mark.parametrize("value", [
+    MARKER + bytes((FORMAT_VERSION, KIND_WORK)),
+    MARKER + bytes((FORMAT_VERSION + 1, KIND_WORK)) + b"\x00" * 20,
+    MARKER + bytes((FORMAT_VERSION, KIND_WORK | 0x80)) + b"not zstd",
+])
+def test_corrupted_values_are_rejected(value):
+    with pytest.raises(ValueError):
+        SessionCodec().decode_works([value])
+
+
+@pytest.mark.anyio
+@pytest.mark.parametrize("encoding", list(ENCODINGS))
+async def test_session_round_trips_through_redis(encoding, monkeypatch):
+    monkeypatch.setattr(redis_service, "codec", ENCODINGS[encoding]())
+    session_id = str(uuid.uuid4())
+    works = sample_works()
+    
+    await redis_service.save_session_data(session_id, works)
+    redis_service.decoded_cache.evict(session_id)
+    
+    assert by_id(await redis_service.get_session_data(session_id)) == by_id(works)
+    assert await redis_service.get_session_works(session_id, [works[3].id]) == {works[3].id: works[3]}
+    stored = await redis_service.redis_client.hget(works_key(session_id), str(works[0].id))
+    assert stored.startswith("{") == (encoding == "json")
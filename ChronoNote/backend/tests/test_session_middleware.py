@@ -0,0 +1,92 @@
+"""
+Tests for the session cookie middleware.
+"""
+import uuid
+
+import pytest
+from starlette.applications import Starlette
+from starlette.middleware import Middleware
+from starlette.requests import Request
+from starlette.responses import PlainTextResponse, StreamingResponse
+from starlette.routing import Route
+from starlette.testclient import TestClient
+
+from app.config import settings
+from app.middleware.session import SessionMiddleware, sign_session_id, verify_session_cookie
+
+
+SECRET = "test-secret"
+
+
+async def session(request: Request) -> PlainTextResponse:
+    return PlainTextResponse(f"{request.state.session_id} {request.state.new_session}")
+
+
+async def stream(request: Request) -> StreamingResponse:
+    async def body():
+        for part in ("a", "b", "c"):
+            yield part
+    return StreamingResponse(body())
+
+
+@pytest.fixture(params=["", SECRET], ids=["unsigned", "signed"])
+def secret_key(request, monkeypatch) -> str:
+    monkeypatch.setattr(settings, "session_secret_key", request.param)
+    return request.param
+
+
+@pytest.fixture
+def app_client(secret_key) -> TestClient:
+    app = Starlette(
+        routes=[Route("/session", session), Route("/stream", stream)],
+        middleware=[Middleware(SessionMiddleware)]
+    )
+    return TestClient(app)
+
+
+def test_new_session_gets_a_cookie(app_client, secret_key):
+    response = app_client.get("/session")
+    
+    session_id, new_session = response.text.split()
+    cookie = response.cookies[settings.session_cookie_name]
+    assert new_session == "True"
+    assert verify_session_cookie(cookie, secret_key) == session_id
+    assert "httponly" in response.headers["set-cookie"].lower()
+
+
+def test_returning_session_keeps_its_id_without_a_new_cookie(app_client, secret_key):
+    session_id = str(uuid.uuid4())
+    cookie = sign_session_id(session_id, secret_key) if secret_key else session_id
+    app_client.cookies.set(settings.session_cookie_name, cookie)
+    
+    response = app_client.get("/session")
+    
+    assert response.text == f"{session_id} False"
+    assert "set-cookie" not in response.headers
+
+
+@pytest.mark.parametrize("cookie", ["not-a-uuid", str(uuid.uuid4()).upper(), f"{uuid.uuid4()}.forged"])
+def test_invalid_cookie_starts_a_new_session(app_client, cookie):
+    app_client.cookies.set(settings.session_cookie_name, cookie)
+    
+    response = app_client.get("/session")
+    
+    session_id, new_session = response.text.split()
+    assert new_session == "True"
+    assert session_id != cookie.partition(".")[0]
+
+
+def test_unsigned_cookie_is_rejected_when_signing_is_enabled(app_client, secret_key):
+    session_id = str(uuid.uuid4())
+    app_client.cookies.set(settings.session_cookie_name, session_id)
+    
+    response = app_client.get("/session")
+    
+    assert response.text.split()[1] == ("True" if secret_key else "False")
+
+
+def test_streaming_response_passes_through(app_client):
+    response = app_client.get("/stream")
+    
+    assert response.text == "abc"
+    assert settings.session_cookie_name in response.cookies
@@ -0,0 +1,279 @@
+"""
+Conformance tests run against every session store backend.
+"""
+import asyncio
+import json
+import uuid
+from typing import List
+
+import pytest
+
+from app.config import settings
+from app.models.schemas import AIExtractedWork, StoredWorkItem, TimelineResponse
+from app.services.memory_store import MemorySessionStore
+from app.services.redis_service import documents_key, quiz_key, redis_service, session_key, timeline_key, version_key
+from app.services.session_documents import merge_document, remove_document, with_base_document
+from app.services.session_store import InvalidCursorError
+
+
+pytestmark = pytest.mark.anyio
+
+
+def sample_works(count: int) -> List[StoredWorkItem]:
+    return [
+        StoredWorkItem(title=f"Work {i}", author_or_source=f"Author {i % 7}", year=1500 + i)
+        for i in range(count)
+    ]
+
+
+def by_id(works: List[StoredWorkItem]) -> List[StoredWorkItem]:
+    return sorted(works, key=lambda work: str(work.id))
+
+
+def timeline_order(works: List[StoredWorkItem]) -> List[StoredWorkItem]:
+    return sorted(works, key=lambda work: (work.year, str(work.id)))
+
+
+def new_id() -> str:
+    return str(uuid.uuid4())
+
+
+@pytest.fixture(params=["redis", "memory"])
+def store(request):
+    if request.param == "redis":
+        return redis_service
+    return MemorySessionStore(max_sessions=100, ttl_seconds=settings.session_ttl_seconds)
+
+
+@pytest.fixture
+def timeline() -> List[StoredWorkItem]:
+    """Nine works, two per year, so ordering within a year is exercised."""
+    return [work.model_copy(update={"year": 1500 + i // 2}) for i, work in enumerate(sample_works(9))]
+
+
+async def test_unknown_session(store):
+    session_id = new_id()
+    
+    assert await store.get_session_data(session_id) is None
+    assert not await store.refresh_session_ttl(session_id)
+    assert await store.get_session_works(session_id, [uuid.uuid4()]) is None
+    assert await store.get_timeline_page(session_id) is None
+    assert await store.get_timeline_json(session_id) is None
+    assert await store.next_quiz_questions(session_id) is None
+    assert await store.get_session_documents(session_id) == {}
+
+
+async def test_save_and_read_back(store):
+    session_id = new_id()
+    works = sample_works(5)
+    
+    await store.save_session_data(session_id, works)
+    
+    assert by_id(await store.get_session_data(session_id)) == by_id(works)
+    assert await store.refresh_session_ttl(session_id)
+    assert await store.get_session_works(session_id, [works[1].id, uuid.uuid4()]) == {works[1].id: works[1]}
+
+
+async def test_save_replaces_and_delete_removes(store):
+    session_id = new_id()
+    works = sample_works(5)
+    await store.save_session_data(session_id, works)
+    
+    await store.save_session_data(session_id, works[:2])
+    assert by_id(await store.get_session_data(session_id)) == by_id(works[:2])
+    
+    await store.delete_session_data(session_id)
+    assert await store.get_session_data(session_id) is None
+
+
+async def test_empty_session(store):
+    session_id = new_id()
+    
+    await store.save_session_data(session_id, [])
+    
+    assert await store.get_session_data(session_id) == []
+    assert await store.get_timeline_page(session_id) == ([], None)
+    assert await store.next_quiz_questions(session_id) is None
+
+
+async def test_timeline_order_and_range(store, timeline):
+    session_id = new_id()
+    expected = timeline_order(timeline)
+    await store.save_session_data(session_id, timeline)
+    
+    assert await store.get_timeline_page(session_id) == (expected, None)
+    ranged, _ = await store.get_timeline_page(session_id, from_year=1501, to_year=1503)
+    assert ranged == [work for work in expected if 1501 <= work.year <= 1503]
+
+
+async def test_timeline_pages_concatenate_to_the_range(store, timeline):
+    session_id = new_id()
+    await store.save_session_data(session_id, timeline)
+    
+    pages, cursor = [], None
+    while True:
+        page, cursor = await store.get_timeline_page(session_id, from_year=1501, cursor=cursor, limit=2)
+        pages.extend(page)
+        if cursor is None:
+            break
+    
+    assert pages == [work for work in timeline_order(timeline) if work.year >= 1501]
+
+
+async def test_invalid_cursors_are_rejected(store, timeline):
+    session_id = new_id()
+    await store.save_session_data(session_id, timeline)
+    
+    with pytest.raises(InvalidCursorError):
+        await store.get_timeline_page(session_id, cursor="not-a-cursor", limit=2)
+    
+    _, stale_cursor = await store.get_timeline_page(session_id, limit=2)
+    await store.save_session_data(session_id, timeline[:-1])
+    with pytest.raises(InvalidCursorError):
+        await store.get_timeline_page(session_id, cursor=stale_cursor, limit=2)
+
+
+async def test_timeline_json(store, timeline):
+    session_id = new_id()
+    await store.save_session_data(session_id, timeline)
+    
+    version, body = await store.get_timeline_json(session_id)
+    
+    assert body == TimelineResponse(works=timeline_order(timeline)).model_dump_json()
+    assert await store.get_timeline_json(session_id, [version]) == (version, None)
+
+
+async def test_quiz_deck(store):
+    session_id = new_id()
+    works = sample_works(5)
+    years = {work.id: work.year for work in works}
+    await store.save_session_data(session_id, works)
+    
+    deck = await store.next_quiz_questions(session_id, count=len(works))
+    
+    assert sorted(str(question.work_id) for question in deck) == sorted(str(work.id) for work in works)
+    assert all(question.year_options.count(years[question.work_id]) == 1 for question in deck)
+    # An exhausted deck is dealt again
+    assert len(await store.next_quiz_questions(session_id, count=2)) == 2
+
+
+async def test_partial_save(store, timeline):
+    session_id = new_id()
+    await store.save_session_data(session_id, sample_works(1))
+    
+    await store.save_partial_session_data(session_id, timeline[:4])
+    
+    expected = timeline_order(timeline[:4])
+    assert await store.get_timeline_page(session_id) == (expected, None)
+    _, body = await store.get_timeline_json(session_id)
+    assert body == TimelineResponse(works=expected).model_dump_json()
+    deck = await store.next_quiz_questions(session_id, count=4)
+    assert sorted(str(question.work_id) for question in deck) == sorted(str(work.id) for work in timeline[:4])
+
+
+async def test_timeline_json_after_partial_save_keeps_the_version(store, timeline):
+    session_id = new_id()
+    await store.save_partial_session_data(session_id, timeline)
+    version, *_ = await store.get_timeline_json(session_id, ["unknown"])
+    
+    assert await store.get_timeline_json(session_id) == (
+        version, TimelineResponse(works=timeline_order(timeline)).model_dump_json()
+    )
+    assert await store.get_timeline_json(session_id, [version]) == (version, None)
+    assert await store.get_timeline_page(session_id) == (timeline_order(timeline), None)
+
+
+async def test_documents(store):
+    session_id = new_id()
+    works = sample_works(5)
+    await store.save_session_data(session_id, works[:2])
+    base_works = await store.get_session_data(session_id)
+    extracted = [
+        AIExtractedWork(title=work.title, author_or_source=work.author_or_source, year=work.year)
+        for work in works[1:4]
+    ]
+    
+    merge = merge_document(base_works, with_base_document(base_works, {}), "notes.md", "hash", extracted)
+    await store.save_session_data(session_id, merge.works, merge.documents)
+    documents = await store.get_session_documents(session_id)
+    assert documents == merge.documents
+    assert len(await store.get_session_data(session_id)) == 4
+    assert merge.works_added == 2
+    
+    removal = remove_document(await store.get_session_data(session_id), documents, "notes.md")
+    await store.save_session_data(session_id, removal.works, removal.documents)
+    assert by_id(await store.get_session_data(session_id)) == by_id(base_works)
+    assert "notes.md" not in await store.get_session_documents(session_id)
+    
+    await store.delete_session_data(session_id)
+    assert await store.get_session_documents(session_id) == {}
+
+
+async def test_session_expires_after_its_ttl(monkeypatch):
+    monkeypatch.setattr(settings, "session_ttl_seconds", 1)
+    stores = [redis_service, MemorySessionStore(max_sessions=100, ttl_seconds=1)]
+    session_id = new_id()
+    for store in stores:
+        await store.save_session_data(session_id, sample_works(2))
+    
+    await asyncio.sleep(1.5)
+    
+    for store in stores:
+        assert await store.get_session_data(session_id) is None
+
+
+async def test_memory_store_evicts_the_least_recently_used_session():
+    store = MemorySessionStore(max_sessions=3, ttl_seconds=60)
+    ids = [new_id() for _ in range(4)]
+    for session_id in ids[:3]:
+        await store.save_session_data(session_id, sample_works(1))
+    
+    await store.get_session_data(ids[0])
+    await store.save_session_data(ids[3], sample_works(1))
+    
+    assert await store.get_session_data(ids[0]) is not None
+    assert await store.get_session_data(ids[1]) is None
+
+
+async def test_redis_timeline_fallback_writes_only_the_timeline_key(fake_redis, timeline):
+    session_id = new_id()
+    await redis_service.save_partial_session_data(session_id, timeline)
+    version = await fake_redis.get(version_key(session_id))
+    
+    _, body = await redis_service.get_timeline_json(session_id)
+    
+    assert await fake_redis.get(version_key(session_id)) == version
+    assert redis_service.codec.decode_text(await fake_redis.get(timeline_key(session_id))) == body
+    assert 0 < await fake_redis.ttl(timeline_key(session_id)) <= settings.session_ttl_seconds
+    assert not await fake_redis.exists(quiz_key(session_id), documents_key(session_id))
+
+
+async def test_redis_timeline_fallback_keeps_a_concurrent_save(fake_redis, timeline, monkeypatch):
+    session_id = new_id()
+    await redis_service.save_partial_session_data(session_id, timeline[:4])
+    get_session_data = redis_service.get_session_data
+    
+    async def save_while_reading(session_id):
+        works = await get_session_data(session_id)
+        await redis_service.save_session_data(session_id, timeline)
+        return works
+    
+    with monkeypatch.context() as patch:
+        patch.setattr(redis_service, "get_session_data", save_while_reading)
+        _, body = await redis_service.get_timeline_json(session_id)
+    
+    assert body == TimelineResponse(works=timeline_order(timeline[:4])).model_dump_json()
+    assert await redis_service.get_timeline_json(session_id) == (
+        await fake_redis.get(version_key(session_id)),
+        TimelineResponse(works=timeline_order(timeline)).model_dump_json()
+    )
+
+
+async def test_redis_timeline_of_a_legacy_session(fake_redis, timeline):
+    session_id = new_id()
+    await fake_redis.set(session_key(session_id), json.dumps([work.model_dump(mode="json") for work in timeline]))
+    
+    version, body = await redis_service.get_timeline_json(session_id)
+    
+    assert body == TimelineResponse(works=timeline_order(timeline)).model_dump_json()
+    assert await redis_service.get_timeline_json(session_id) == (version, body)
@@ -0,0 +1,149 @@
+"""
+Tests for bounded, incremental upload reading and the upload size limit.
+"""
+import tempfile
+import tracemalloc
+
+import pytest
+from fastapi import FastAPI, File, UploadFile
+
+from app.api.routes import read_markdown_upload
+from app.config import settings
+from app.middleware.upload_limit import MULTIPART_OVERHEAD_BYTES, UploadLimitMiddleware
+from app.services.prefilter import prefilter_markdown
+from app.services.upload_reader import UploadEncodingError, UploadTextReader, UploadTooLargeError
+
+
+pytestmark = pytest.mark.anyio
+
+PARAGRAPHS = [
+    "Reading notes on the themes of the novel, to be revisited before the seminar.",
+    "\"Pride and Prejudice\" by Jane Austen was published in 1813.",
+    "Café culture in Paris, ca. 1920 — résumé.",
+]
+
+
+def document(size: int) -> bytes:
+    """Notes-like markdown of exactly `size` bytes, with non-ASCII characters."""
+    block = "\n\n".join(PARAGRAPHS).encode("utf-8") + b"\n\n"
+    return (block * (size // len(block) + 1))[:size]
+
+
+def upload(data: bytes) -> UploadFile:
+    """An UploadFile as Starlette hands it to the endpoint: spooled, rewound."""
+    spool = tempfile.SpooledTemporaryFile(max_size=1024 * 1024)
+    spool.write(data)
+    spool.seek(0)
+    return UploadFile(spool, filename="notes.md")
+
+
+async def read_all(reader: UploadTextReader, data: bytes) -> str:
+    return "".join([text async for text in reader.iter_text(upload(data))])
+
+
+@pytest.mark.parametrize("chunk_bytes", [1, 2, 3, 5, 64 * 1024])
+async def test_text_decodes_across_chunk_boundaries(chunk_bytes):
+    data = "Café — résumé\r\nnext line\rlast line\n".encode("utf-8")
+    
+    text = await read_all(UploadTextReader(1024, chunk_bytes), data)
+    
+    assert text == "Café — résumé\nnext line\nlast line\n"
+
+
+async def test_too_large_upload_stops_at_the_limit():
+    reader = UploadTextReader(max_bytes=10, chunk_bytes=4)
+    
+    with pytest.raises(UploadTooLargeError):
+        await read_all(reader, b"x" * 100)
+    
+    assert reader.size_bytes == 12
+
+
+@pytest.mark.parametrize("data,chunk_bytes,offset", [
+    (b"abc\xffdef", 2, 3),
+    (b"ab\xe2\x82Xcd", 3, 2),
+    (b"ab\xe2\x82", 1, 2),
+])
+async def test_invalid_utf8_reports_its_byte_offset(data, chunk_bytes, offset):
+    with pytest.raises(UploadEncodingError) as error:
+        await read_all(UploadTextReader(1024, chunk_bytes), data)
+    
+    assert error.value.offset == offset
+
+
+async def test_chunked_read_matches_the_whole_file_prefilter():
+    data = document(300 * 1024)
+    
+    result = await read_markdown_upload(upload(data))
+    
+    expected = prefilter_markdown(data.decode("utf-8"), settings.prefilter_context_paragraphs)
+    assert result.text == expected.text
+    assert result.original_bytes == len(data)
+
+
+async def test_chunked_read_needs_less_memory_than_a_whole_file_read():
+    data = document(1024 * 1024)
+    
+    async def whole_file_read(file: UploadFile):
+        return prefilter_markdown((await file.read()).decode("utf-8"), settings.prefilter_context_paragraphs)
+    
+    peaks = []
+    for read in (whole_file_read, read_markdown_upload):
+        file = upload(data)
+        tracemalloc.start()
+        await read(file)
+        peaks.append(tracemalloc.get_traced_memory()[1])
+        tracemalloc.stop()
+    
+    whole_file, chunked = peaks
+    assert chunked < whole_file
+
+
+async def test_oversized_chunked_body_is_rejected_while_it_arrives():
+    app = FastAPI()
+    
+    @app.post("/api/upload")
+    async def endpoint(file: UploadFile = File(...)):
+        return {"size": len(await file.read())}
+    
+    limit = settings.upload_max_size_kb * 1024
+    head = (
+        b'--test\r\nContent-Disposition: form-data; name="file"; filename="notes.md"\r\n'
+        b"Content-Type: text/markdown\r\n\r\n"
+    )
+    chunk = document(64 * 1024)
+    body = iter([head] + [chunk] * (4 * limit // len(chunk)) + [b"\r\n--test--\r\n"])
+    received = 0
+    statuses = []
+    
+    async def receive():
+        nonlocal received
+        message = next(body, None)
+        if message is None:
+            return {"type": "http.disconnect"}
+        received += len(message)
+        return {"type": "http.request", "body": message, "more_body": not message.startswith(b"\r\n--test--")}
+    
+    async def send(message):
+        if message["type"] == "http.response.start":
+            statuses.append(message["status"])
+    
+    scope = {
+        "type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1",
+        "method": "POST", "scheme": "http", "path": "/api/upload", "raw_path": b"/api/upload",
+        "root_path": "", "query_string": b"", "client": ("127.0.0.1", 1234), "server": ("test", 80),
+        "headers": [(b"host", b"test"), (b"content-type", b"multipart/form-data; boundary=test")],
+    }
+    await UploadLimitMiddleware(app)(scope, receive, send)
+    
+    assert statuses == [413]
+    assert received <= limit + MULTIPART_OVERHEAD_BYTES + len(chunk)
+
+
+def test_declared_oversized_upload_is_rejected(client, model):
+    data = document(settings.upload_max_size_kb * 1024 + MULTIPART_OVERHEAD_BYTES + 1)
+    
+    response = client.post("/api/upload", files={"file": ("notes.md", data)})
+    
+    assert response.status_code == 413
+    assert model.prompts == []
@@ -0,0 +1,59 @@
+"""
+Tests for the streaming upload endpoint.
+"""
+import json
+from typing import List
+
+import pytest
+
+from tests.conftest import ScriptedResponse
+
+
+FIRST_UPLOAD = '"Emma" was published in 1815.\n\n"Moby Dick" followed in 1851.'
+SECOND_UPLOAD = '"Ulysses" appeared in 1922.\n\n"Dracula" dates from 1897.'
+
+
+class FailingStream:
+    """A streamed response that breaks off with an error after one work."""
+    
+    async def __aiter__(self):
+        yield ScriptedResponse('{"works": [{"title": "Ulysses", "author_or_source": null, "year": 1922},')
+        raise RuntimeError("connection reset")
+
+
+def stream_upload(client, text: str) -> List[dict]:
+    """Upload through /upload/stream and return the decoded events."""
+    with client.stream("POST", "/api/upload/stream", files={"file": ("notes.md", text.encode())}) as response:
+        assert response.status_code == 200
+        return [json.loads(line) for line in response.iter_lines() if line]
+
+
+def timeline_titles(client) -> List[str]:
+    return sorted(work["title"] for work in client.get("/api/timeline").json()["works"])
+
+
+def test_stream_replaces_the_timeline(client):
+    client.post("/api/upload", files={"file": ("first.md", FIRST_UPLOAD.encode())})
+    
+    events = stream_upload(client, SECOND_UPLOAD)
+    
+    assert events[-1]["event"] == "done"
+    assert timeline_titles(client) == ["Dracula", "Ulysses"]
+
+
+@pytest.mark.parametrize("has_previous_session", [True, False])
+def test_failed_stream_restores_the_previous_session(client, model, monkeypatch, has_previous_session):
+    if has_previous_session:
+        client.post("/api/upload", files={"file": ("first.md", FIRST_UPLOAD.encode())})
+    
+    async def failing(prompt, stream=False, **kwargs):
+        return FailingStream()
+    monkeypatch.setattr(model, "generate_content_async", failing)
+    events = stream_upload(client, SECOND_UPLOAD)
+    
+    assert [event["event"] for event in events] == ["progress", "work", "progress", "error"]
+    assert events[-1]["partial_data"] is False
+    if has_previous_session:
+        assert timeline_titles(client) == ["Emma", "Moby Dick"]
+    else:
+        assert client.get("/api/timeline").status_code == 404
@@ -0,0 +1,60 @@
+"""
+Tests for the extraction worker.
+"""
+import asyncio
+import time
+
+import pytest
+
+from app.config import settings
+from app.services.ai_service import ai_service
+from app.services.job_queue import DEAD_LETTER_KEY, FAILED, RETRYING, job_queue
+from app.services.redis_service import redis_service
+from app.worker import process_job
+
+
+pytestmark = pytest.mark.anyio
+
+DOCUMENT = '"Emma" was published in 1815.'
+
+
+async def next_job():
+    messages = await job_queue.read("test-consumer", 10)
+    assert len(messages) == 1
+    return messages[0]
+
+
+@pytest.fixture
+async def queued_job():
+    await job_queue.ensure_group()
+    return await job_queue.enqueue("s1", DOCUMENT)
+
+
+async def test_job_runs_and_saves_the_session(model, queued_job):
+    await process_job(*await next_job())
+    
+    status = await job_queue.get_status(queued_job)
+    works = await redis_service.get_session_data("s1")
+    assert status.status == "done"
+    assert [work.title for work in works] == ["Emma"]
+
+
+async def test_busy_job_waits_for_a_slot_then_is_requeued_and_finally_dead_lettered(model, queued_job, monkeypatch):
+    monkeypatch.setattr(ai_service, "_slots", asyncio.Semaphore(0))
+    monkeypatch.setattr(settings, "job_gemini_queue_timeout_seconds", 0.05)
+    monkeypatch.setattr(settings, "gemini_retry_after_seconds", 0)
+    monkeypatch.setattr(settings, "job_max_busy_requeues", 1)
+    api_timeout = settings.gemini_queue_timeout_seconds
+    
+    start = time.perf_counter()
+    await process_job(*await next_job())
+    assert time.perf_counter() - start >= 0.05
+    assert (await job_queue.get_status(queued_job)).status == RETRYING
+    assert settings.gemini_queue_timeout_seconds == api_timeout
+    
+    await process_job(*await next_job())
+    status = await job_queue.get_status(queued_job)
+    assert status.status == FAILED
+    assert status.attempts == 0
+    assert await redis_service.redis_client.xlen(DEAD_LETTER_KEY) == 1
+    assert model.prompts == []
@@ -78,7 +78,7 @@ export const FileDropzone: React.FC<FileDropzoneProps> = ({ onFileSelect, isUplo
                     or click to browse
                 </p>
                 <p className="font-mono text-xs text-brass-500 mt-4">
-                    Accepted formats: .md, .txt, .markdown (Max 50KB)
+                    Accepted formats: .md, .txt, .markdown (Max 2MB)
                 </p>
             </div>
 